@@ -0,0 +1,193 @@
+# statistikk over alle pollene (topplister, totaler per dag) uten å regne over hele polls-tabellen hver gang.
+# sammendragstabellene holdes oppdatert av triggere på polls, så de oppdateres av akkurat de samme
+# skrivingene som save_poll_record gjør. spørringene under leser bare noen få rader via indekser.
+
+import sqlite3
+from typing import Dict, List
+
+import polls_db
+
+_STATS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS poll_stats (
+    poll_id TEXT PRIMARY KEY,
+    caption TEXT NOT NULL,
+    yes INTEGER NOT NULL DEFAULT 0,
+    no INTEGER NOT NULL DEFAULT 0,
+    meh INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    yes_ratio REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS poll_stats_total ON poll_stats (total DESC);
+CREATE INDEX IF NOT EXISTS poll_stats_yes_ratio ON poll_stats (yes_ratio DESC, total DESC);
+
+CREATE TABLE IF NOT EXISTS daily_totals (
+    day TEXT PRIMARY KEY,
+    yes INTEGER NOT NULL DEFAULT 0,
+    no INTEGER NOT NULL DEFAULT 0,
+    meh INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS stats_totals (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    polls INTEGER NOT NULL DEFAULT 0,
+    yes INTEGER NOT NULL DEFAULT 0,
+    no INTEGER NOT NULL DEFAULT 0,
+    meh INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0
+);
+
+-- en poll som hentes tilbake fra arkivet settes inn i polls på nytt, men har fortsatt en rad i poll_stats.
+-- derfor regnes totalene som differansen mot den raden (0 for en helt ny poll), før raden skrives over
+DROP TRIGGER IF EXISTS stats_poll_insert;
+CREATE TRIGGER stats_poll_insert AFTER INSERT ON polls
+BEGIN
+    INSERT INTO daily_totals (day, yes, no, meh, total)
+    SELECT date('now', 'localtime'),
+           NEW.score_a - COALESCE(old.yes, 0),
+           NEW.score_b - COALESCE(old.no, 0),
+           NEW.score_meh - COALESCE(old.meh, 0),
+           (NEW.score_a + NEW.score_b + NEW.score_meh) - COALESCE(old.total, 0)
+    FROM (SELECT 1) LEFT JOIN poll_stats AS old ON old.poll_id = NEW.id
+    WHERE true
+    ON CONFLICT(day) DO UPDATE SET
+        yes = yes + excluded.yes,
+        no = no + excluded.no,
+        meh = meh + excluded.meh,
+        total = total + excluded.total;
+    UPDATE stats_totals SET
+        polls = polls + 1 - (SELECT COUNT(*) FROM poll_stats WHERE poll_id = NEW.id),
+        yes = yes + NEW.score_a - COALESCE((SELECT yes FROM poll_stats WHERE poll_id = NEW.id), 0),
+        no = no + NEW.score_b - COALESCE((SELECT no FROM poll_stats WHERE poll_id = NEW.id), 0),
+        meh = meh + NEW.score_meh - COALESCE((SELECT meh FROM poll_stats WHERE poll_id = NEW.id), 0),
+        total = total + (NEW.score_a + NEW.score_b + NEW.score_meh)
+            - COALESCE((SELECT total FROM poll_stats WHERE poll_id = NEW.id), 0)
+    WHERE id = 1;
+    INSERT INTO poll_stats (poll_id, caption, yes, no, meh, total, yes_ratio)
+    VALUES (
+        NEW.id, NEW.caption, NEW.score_a, NEW.score_b, NEW.score_meh,
+        NEW.score_a + NEW.score_b + NEW.score_meh,
+        CAST(NEW.score_a AS REAL) / MAX(NEW.score_a + NEW.score_b + NEW.score_meh, 1)
+    )
+    ON CONFLICT(poll_id) DO UPDATE SET
+        caption = excluded.caption,
+        yes = excluded.yes,
+        no = excluded.no,
+        meh = excluded.meh,
+        total = excluded.total,
+        yes_ratio = excluded.yes_ratio;
+END;
+
+CREATE TRIGGER IF NOT EXISTS stats_poll_update AFTER UPDATE OF caption, score_a, score_b, score_meh ON polls
+WHEN NEW.caption IS NOT OLD.caption
+    OR NEW.score_a IS NOT OLD.score_a
+    OR NEW.score_b IS NOT OLD.score_b
+    OR NEW.score_meh IS NOT OLD.score_meh
+BEGIN
+    INSERT INTO poll_stats (poll_id, caption, yes, no, meh, total, yes_ratio)
+    VALUES (
+        NEW.id, NEW.caption, NEW.score_a, NEW.score_b, NEW.score_meh,
+        NEW.score_a + NEW.score_b + NEW.score_meh,
+        CAST(NEW.score_a AS REAL) / MAX(NEW.score_a + NEW.score_b + NEW.score_meh, 1)
+    )
+    ON CONFLICT(poll_id) DO UPDATE SET
+        caption = excluded.caption,
+        yes = excluded.yes,
+        no = excluded.no,
+        meh = excluded.meh,
+        total = excluded.total,
+        yes_ratio = excluded.yes_ratio;
+    INSERT INTO daily_totals (day, yes, no, meh, total)
+    VALUES (
+        date('now', 'localtime'),
+        NEW.score_a - OLD.score_a,
+        NEW.score_b - OLD.score_b,
+        NEW.score_meh - OLD.score_meh,
+        (NEW.score_a + NEW.score_b + NEW.score_meh) - (OLD.score_a + OLD.score_b + OLD.score_meh)
+    )
+    ON CONFLICT(day) DO UPDATE SET
+        yes = yes + excluded.yes,
+        no = no + excluded.no,
+        meh = meh + excluded.meh,
+        total = total + excluded.total;
+    UPDATE stats_totals SET
+        yes = yes + NEW.score_a - OLD.score_a,
+        no = no + NEW.score_b - OLD.score_b,
+        meh = meh + NEW.score_meh - OLD.score_meh,
+        total = total + (NEW.score_a + NEW.score_b + NEW.score_meh) - (OLD.score_a + OLD.score_b + OLD.score_meh)
+    WHERE id = 1;
+END;
+"""
+
+# fyller sammendragene fra polls første gang. stemmer fra før dette fordeles på dagen pollen sist ble endret
+_BACKFILL = """
+DELETE FROM poll_stats;
+DELETE FROM daily_totals;
+INSERT INTO poll_stats (poll_id, caption, yes, no, meh, total, yes_ratio)
+SELECT id, caption, score_a, score_b, score_meh,
+       score_a + score_b + score_meh,
+       CAST(score_a AS REAL) / MAX(score_a + score_b + score_meh, 1)
+FROM polls;
+INSERT INTO daily_totals (day, yes, no, meh, total)
+SELECT date(updated_at, 'localtime'), SUM(score_a), SUM(score_b), SUM(score_meh),
+       SUM(score_a + score_b + score_meh)
+FROM polls
+GROUP BY date(updated_at, 'localtime');
+INSERT INTO stats_totals (id, polls, yes, no, meh, total)
+SELECT 1, COUNT(*), COALESCE(SUM(score_a), 0), COALESCE(SUM(score_b), 0), COALESCE(SUM(score_meh), 0),
+       COALESCE(SUM(score_a + score_b + score_meh), 0)
+FROM polls;
+"""
+
+TOP_ORDERINGS = {
+    "votes": "total DESC",
+    "yes_ratio": "yes_ratio DESC, total DESC",
+}
+
+
+def init_stats() -> None:
+    """Create the summary tables and triggers, backfilling them the first time."""
+    with sqlite3.connect(polls_db.DB_PATH) as conn:
+        conn.executescript(_STATS_SCHEMA)
+        has_totals = conn.execute("SELECT 1 FROM stats_totals WHERE id = 1").fetchone()
+        if not has_totals:
+            conn.executescript("BEGIN;" + _BACKFILL + "COMMIT;")
+
+
+def _rows(cursor: sqlite3.Cursor) -> List[Dict]:
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def summary() -> Dict:
+    with sqlite3.connect(polls_db.DB_PATH) as conn:
+        cursor = conn.execute("SELECT polls, yes, no, meh, total FROM stats_totals WHERE id = 1")
+        rows = _rows(cursor)
+    return rows[0] if rows else {"polls": 0, "yes": 0, "no": 0, "meh": 0, "total": 0}
+
+
+#topplister. begge sorteringene har egen indeks, så det leses bare `limit` rader uansett hvor stort arkivet er
+def top_polls(by: str = "votes", limit: int = 10, min_votes: int = 0) -> List[Dict]:
+    if by not in TOP_ORDERINGS:
+        raise ValueError(f"Ukjent sortering '{by}'. Bruk {', '.join(TOP_ORDERINGS)}.")
+    with sqlite3.connect(polls_db.DB_PATH) as conn:
+        cursor = conn.execute(
+            f"""
+            SELECT poll_id AS id, caption, yes, no, meh, total, yes_ratio
+            FROM poll_stats
+            WHERE total >= ?
+            ORDER BY {TOP_ORDERINGS[by]}
+            LIMIT ?
+            """,
+            (min_votes, limit),
+        )
+        return _rows(cursor)
+
+
+def daily(days: int = 30) -> List[Dict]:
+    with sqlite3.connect(polls_db.DB_PATH) as conn:
+        cursor = conn.execute(
+            "SELECT day, yes, no, meh, total FROM daily_totals ORDER BY day DESC LIMIT ?",
+            (days,),
+        )
+        return _rows(cursor)
@@ -0,0 +1,78 @@
+# animasjon av søylene i resultatvisningen. i stedet for å regne ut en easing-funksjon med flyttall
+# hver frame slår vi opp i en ferdig utregnet tabell med heltall. søyler som ikke beveger seg gjør ingenting,
+# og når alle har kommet fram er det ingen grunn til å tegne noe i det hele tatt.
+
+from typing import List, Sequence
+
+EASE_STEPS = 256
+EASE_SCALE = 1 << 12  # tabellverdiene går fra 0 til EASE_SCALE
+
+
+def _build_table(ease, steps: int = EASE_STEPS) -> tuple:
+    return tuple(int(round(ease(i / (steps - 1)) * EASE_SCALE)) for i in range(steps))
+
+
+EASE_OUT_CUBIC = _build_table(lambda t: 1 - (1 - t) ** 3)
+
+
+class BarTween:
+    """Integer pixel height of one bar, eased from ``start`` towards ``target``."""
+
+    __slots__ = ("start", "target", "current", "started_at", "duration_ms", "table")
+
+    def __init__(self, value: int = 0, duration_ms: int = 450, table: tuple = EASE_OUT_CUBIC):
+        self.start = value
+        self.target = value
+        self.current = value
+        self.started_at = 0
+        self.duration_ms = duration_ms
+        self.table = table
+
+    def retarget(self, target: int, now_ms: int) -> None:
+        if target == self.target:
+            return
+        # start fra der søylen er akkurat nå, så en ny stemme midt i en animasjon ikke hopper
+        self.start = self.current
+        self.target = target
+        self.started_at = now_ms
+
+    def step(self, now_ms: int) -> bool:
+        """Advance the tween. Returns True if the pixel height changed."""
+        if self.current == self.target:
+            return False
+        elapsed = now_ms - self.started_at
+        if elapsed >= self.duration_ms:
+            value = self.target
+        else:
+            eased = self.table[elapsed * (EASE_STEPS - 1) // self.duration_ms]
+            value = self.start + (self.target - self.start) * eased // EASE_SCALE
+        if value == self.current:
+            return False
+        self.current = value
+        return True
+
+    @property
+    def animating(self) -> bool:
+        return self.current != self.target
+
+
+class BarAnimator:
+    """A group of bar tweens that reports which bars need to be redrawn."""
+
+    def __init__(self, count: int, duration_ms: int = 450):
+        self.tweens = [BarTween(0, duration_ms) for _ in range(count)]
+
+    def set_targets(self, targets: Sequence[int], now_ms: int) -> None:
+        for tween, target in zip(self.tweens, targets):
+            tween.retarget(target, now_ms)
+
+    def step(self, now_ms: int) -> List[int]:
+        """Advance every bar and return the indices whose height changed."""
+        return [index for index, tween in enumerate(self.tweens) if tween.step(now_ms)]
+
+    def heights(self) -> List[int]:
+        return [tween.current for tween in self.tweens]
+
+    @property
+    def animating(self) -> bool:
+        return any(tween.current != tween.target for tween in self.tweens)
@@ -10,37 +10,69 @@ men det fungerer.
 """
 
 #importer alt mulig. vi hadde nok ram til å ikke tenke for mye på dette.
+import csv
+import io
+import json
 import os
-import shutil
+import socket
 import sys
 import threading
 import uuid
+from datetime import datetime
 from enum import Enum
 from pathlib import Path
 from time import sleep
-from typing import Optional
+from typing import Dict, List, Optional
 
 import pygame
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
 import uvicorn
 
 from polls_db import (
+    EXPORT_COLUMNS,
+    catalog_version,
     fetch_all_polls,
+    fetch_changes,
     fetch_poll_by_caption,
     fetch_poll,
+    import_poll_records,
     init_db,
+    iter_poll_rows,
     save_poll_record,
+    save_poll_records,
+    search_polls,
     update_image_path,
 )
+import analytics
+from archive import PollArchiver, archive_cold_polls
+from backup import stream_backup
+from cpu_plan import CpuPlan
+from animation import BarAnimator
+from display_layers import LayerCompositor, qr_surface
+from display_mirror import BOUNDARY, DisplayMirror
+from frame_scheduler import AdaptiveFrameScheduler, WAKE_EVENT
+from loop_profiler import InputLatency, LoopProfiler
+from media_store import HASH_DIR_NAME, MediaStore
+from poll_record import Poll
+from playlist import Playlist, Prefetched
+from poll_state import PollState
+from rate_limit import RateLimitMiddleware, RateLimiter
+from response_cache import CachedJson
+from server_profile import describe, server_options
+from sessions import SessionError, SessionManager
+from static_assets import AssetManifest, MediaCache, is_content_addressed, media_response, resolve_media_path
+from surface_cache import SurfaceCache
+from vote_intake import VoteIntake
 
 #dette er for lagring av bilder
 BASE_DIR = Path(__file__).resolve().parent
 MEDIA_DIR = BASE_DIR / "media"
 MEDIA_DIR.mkdir(parents=True, exist_ok=True)
+#ferdig skalerte bilder, så de slipper å dekodes på nytt etter en omstart
+surface_cache = SurfaceCache(BASE_DIR / "surface_cache")
 
 # dette er for å endre mellom bildefremvisning og resultatfremvisning med pygame
 class DisplayMode(Enum):
@@ -81,6 +113,14 @@ os.environ.setdefault('SDL_VIDEODRIVER', 'kmsdrm')
 #håndtering av hardware knappene koblet til pien
 DISABLE_GPIO = os.environ.get("DISABLE_GPIO") == "1"
 RUN_DISPLAY = os.environ.get("DISABLE_DISPLAY") != "1"
+#uvicorn-innstillingene (SERVER_PROFILE=standard/fast/lean). leses her, så en feil profil stopper oppstarten
+SERVER_OPTIONS = server_options()
+#speiling av skjermen som mjpeg på /display/stream. av som standard
+DISPLAY_STREAM = os.environ.get("DISPLAY_STREAM") == "1"
+#hvilke kjerner og hvilken prioritet trådene får (CPU_PINNING/CPU_PLAN/CPU_NICE, se cpu_plan.py).
+#hovedtråden starter som input, så gpio-trådene og poll_state arver det. den blir render når alt er startet
+cpu_plan = CpuPlan.from_env()
+cpu_plan.pin_current("input")
 
 
 #håndtering av knapper
@@ -97,51 +137,69 @@ else:
 # -------------------------
 # GPIO Button Setup
 # -------------------------
-#globale variabler <3
-yes_count = 0
-no_count =  0
-meh_count = 0
-
 
 #knapper
+DISPLAY_BUTTON_PINS = {"yes": 16, "no": 26, "meh": 12}
 if not DISABLE_GPIO and Button:
-    button_yes = Button(16, bounce_time=0.04)
-    button_no = Button(26, bounce_time=0.04)
-    button_meh = Button(12, bounce_time=0.04)
+    button_yes = Button(DISPLAY_BUTTON_PINS["yes"], bounce_time=0.04)
+    button_no = Button(DISPLAY_BUTTON_PINS["no"], bounce_time=0.04)
+    button_meh = Button(DISPLAY_BUTTON_PINS["meh"], bounce_time=0.04)
 else:
     button_yes = button_no = button_meh = None
 combo_toggle_active = False
 
-#global count slik at det er superenkelt og samhandle mellom server og pygame
+# settes når pygame er startet. da kan knapper og api vekke skjermløkka når den går på lavt turtall
+frame_scheduler: Optional[AdaptiveFrameScheduler] = None
+# tidsmåling av skjermløkka. D viser panelet, C tar opp en cProfile-profil
+loop_profiler: Optional[LoopProfiler] = None
+# tid fra knappetrykk til ny stilling på skjermen. måles alltid, vises i /display/frame_stats
+input_latency = InputLatency()
+
+
+def notify_display():
+    if frame_scheduler:
+        frame_scheduler.request_wake()
+
+
+display_mirror = None
+if DISPLAY_STREAM and RUN_DISPLAY:
+    display_mirror = DisplayMirror(
+        max_fps=float(os.environ.get("DISPLAY_STREAM_FPS", "10")),
+        max_width=int(os.environ.get("DISPLAY_STREAM_WIDTH", "960")),
+        on_demand=notify_display,
+    )
+    display_mirror.start()
+
+
+# skjermen tegnes bare når noe har endret seg. denne settes når alt må tegnes på nytt (nytt bilde, ny modus)
+redraw_requested = True
+
+
+def request_redraw():
+    global redraw_requested
+    redraw_requested = True
+    notify_display()
+
+#knappene legger bare stemmen i køen til poll_state. skjermen vekkes når den nye stillingen er publisert
 def add_one_yes():
-    global yes_count
-    yes_count += 1
-    print("YES:", yes_count)
+    print("YES")
+    input_latency.press(poll_state.snapshot)
+    poll_state.vote("yes")
 
 def add_one_no():
-    global no_count
-    no_count += 1
-    print("NO:", no_count)
+    print("NO")
+    input_latency.press(poll_state.snapshot)
+    poll_state.vote("no")
     
 def add_one_meh():
-    global meh_count
-    meh_count += 1
-    print("MEH", meh_count)
-
-if button_yes:
-    button_yes.when_released = add_one_yes
-if button_no:
-    button_no.when_pressed = add_one_no
-if button_meh:
-    button_meh.when_pressed = add_one_meh
+    print("MEH")
+    input_latency.press(poll_state.snapshot)
+    poll_state.vote("meh")
 
 # -------------------------
 # Pygame Setup
 # -------------------------
 
-score_a = 40 
-score_b = 20
-score_meh = 10
 current_display_mode = DisplayMode.RESULTS
 current_image_surface = None
 loaded_image_path = None
@@ -150,6 +208,7 @@ loaded_image_path = None
 def mark_image_dirty():
     global loaded_image_path
     loaded_image_path = None
+    request_redraw()
 
 
 def toggle_display_mode(explicit: Optional[DisplayMode] = None):
@@ -163,6 +222,7 @@ def toggle_display_mode(explicit: Optional[DisplayMode] = None):
             else DisplayMode.RESULTS
         )
     print(f"Visningsmodus: {current_display_mode.value}")
+    request_redraw()
 
 #viktig for å kunne endre mellom bilde og poll
 def check_button_combo_toggle():
@@ -179,42 +239,60 @@ def check_button_combo_toggle():
         combo_toggle_active = False
 
 init_db()
+analytics.init_stats()
 # -------------------------
 # Shared data mellom FastAPI og Pygame
 # -------------------------
 
 #håndtering av dataene. generering av egne ider. (kunne kanskje vært gjort direkte av sqlite3?
-shared_data = {
-    "id": uuid.uuid4().hex[:8],
-    "caption": "Live Duel",  # default caption
-    "score_a": score_a,
-    "score_b": score_b,
-    "score_meh": score_meh,
-    "image_path": None,
-}
-
-last_persisted_poll = {
-    "id": None,
-    "caption": None,
-    "score_a": None,
-    "score_b": None,
-    "score_meh": None,
-    "image_path": None,
-}
-
-existing_polls = fetch_all_polls()
+existing_polls = fetch_all_polls(limit=1)
 if existing_polls:
-    latest_poll = existing_polls[0]
-    shared_data.update(latest_poll)
-    shared_data.setdefault("image_path", None)
-    yes_count = latest_poll["score_a"]
-    no_count = latest_poll["score_b"]
-    meh_count = latest_poll["score_meh"]
-    score_a = yes_count
-    score_b = no_count
-    score_meh = meh_count
-    for key in last_persisted_poll:
-        last_persisted_poll[key] = latest_poll.get(key)
+    initial_poll = existing_polls[0]
+else:
+    initial_poll = Poll(uuid.uuid4().hex[:8], "Live Duel", 40, 20, 10)  # default caption
+
+#pollen på skjermen eies av én tråd. api, knapper og mobiler sender kommandoer dit, og alle som
+#bare skal lese bruker poll_state.snapshot (et uforanderlig bilde som byttes ut i én operasjon)
+poll_state = PollState(
+    initial_poll,
+    persist=save_poll_record,
+    persisted=bool(existing_polls),
+    on_publish=notify_display,
+)
+poll_state.start()
+
+#trykk og slipp som ikke teller stemmer vekker også løkka, ellers merkes ikke alle-knappene-kombinasjonen når den er i hvilemodus
+if button_yes:
+    button_yes.when_pressed = notify_display
+    button_yes.when_released = add_one_yes
+if button_no:
+    button_no.when_pressed = add_one_no
+    button_no.when_released = notify_display
+if button_meh:
+    button_meh.when_pressed = add_one_meh
+    button_meh.when_released = notify_display
+
+#stemmer fra mobilen samles her. første stemme i en tom buffer ber poll_state hente dem ut
+vote_intake = VoteIntake(on_vote=lambda: poll_state.post(apply_phone_votes))
+
+#ekstra stasjoner med egne knapper og egne poller. pollen på skjermen styres fortsatt av poll_state
+session_manager = SessionManager(
+    button_factory=(lambda pin: Button(pin, bounce_time=0.04)) if not DISABLE_GPIO and Button else None,
+    reserved_pins=DISPLAY_BUTTON_PINS.values(),
+)
+session_manager.start_flusher()
+
+
+def active_poll_ids():
+    return [poll_state.snapshot.id] + [session.poll.id for session in session_manager.sessions()]
+
+
+#poller som ikke er rørt på ARCHIVE_AFTER_DAYS dager flyttes til polls_archive.db én gang i døgnet
+poll_archiver = PollArchiver(
+    days=int(os.environ.get("ARCHIVE_AFTER_DAYS", "90")),
+    keep=active_poll_ids,
+)
+poll_archiver.start()
 
 # -------------------------
 # FastAPI Setup
@@ -223,6 +301,15 @@ if existing_polls:
 #fastAPI er den beste webservern som finnes.!!!!
 app = FastAPI(title="Caption & Score API")
 
+#tokenbøtter per klient-ip. legges til før cors, så 429-svarene også får cors-headere
+rate_limiter = RateLimiter(max_uploads=int(os.environ.get("MAX_CONCURRENT_UPLOADS", "2")))
+if os.environ.get("DISABLE_RATE_LIMIT") != "1":
+    app.add_middleware(
+        RateLimitMiddleware,
+        limiter=rate_limiter,
+        exempt=[host for host in os.environ.get("RATE_LIMIT_EXEMPT", "").split(",") if host],
+    )
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -231,39 +318,7 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-return_data = {
-    "id": 1, 
-    "navn": "caption",
-    "score_a": score_a,
-    "score_b": score_b,
-    "score_meh": score_meh
-}
-
 #her er det funksjoner som henter ting i databasen og som senere kalles på av hvert enkelt endpoint
-def save_poll(force: bool = False):
-    poll_copy = {
-        "id": shared_data.get("id"),
-        "caption": shared_data.get("caption"),
-        "score_a": shared_data.get("score_a", 0),
-        "score_b": shared_data.get("score_b", 0),
-        "score_meh": shared_data.get("score_meh", 0),
-        "image_path": shared_data.get("image_path")
-    }
-    poll_id = poll_copy["id"]
-    if not poll_id:
-        return
-
-    has_changed = any(
-        last_persisted_poll.get(key) != poll_copy.get(key)
-        for key in last_persisted_poll
-    )
-    if not force and not has_changed:
-        return
-
-    save_poll_record(poll_copy)
-    last_persisted_poll.update(poll_copy)
-
-
 def find_poll(poll_id: str):
     """Hent en poll ut fra id."""
     return fetch_poll(poll_id)
@@ -275,12 +330,12 @@ def resolve_poll_target(poll_id: Optional[str], poll_name: Optional[str]):
     if poll_id:
         poll = find_poll(poll_id)
         if poll:
-            resolved_id = poll["id"]
+            resolved_id = poll.id
             return poll, resolved_id
     if poll_name:
         poll = fetch_poll_by_caption(poll_name)
         if poll:
-            resolved_id = poll["id"]
+            resolved_id = poll.id
             return poll, resolved_id
     return None, None
 
@@ -297,63 +352,122 @@ class ImageAttachment(BaseModel):
     name: Optional[str] = None
     image_path: Optional[str] = None
 
+
+class SessionRequest(BaseModel):
+    id: str
+    buttons: Dict[str, int] = {}
+
+
+class PlaylistRequest(BaseModel):
+    ids: List[str]
+    interval: float = 30.0
+    autostart: bool = True
+
+
+class VoteRequest(BaseModel):
+    choice: str
+    poll_id: Optional[str] = None
+    device_id: Optional[str] = None
+
 # sier til fastapi hvor tingene mine ligger lagret
 STATIC_DIR = os.path.join(os.path.dirname(__file__), "static")
-app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
-app.mount("/media", StaticFiles(directory=MEDIA_DIR), name="media")
+# alt i static/ leses inn, får fingeravtrykk og komprimeres én gang ved oppstart
+static_manifest = AssetManifest(STATIC_DIR)
 
 #her har vi root endpoint gir oss selvfølgerlig bare htmlen
 #htmlen kaller på de andre endpointsa ettersom hva frontenden trenger
 @app.get("/")
-def index():
-    return FileResponse(os.path.join(STATIC_DIR, "index.html"))
-
-@app.post("/update_caption/")
-def update_caption(caption: Caption):
-    global yes_count, no_count, meh_count
+def index(request: Request):
+    response = static_manifest.index_response(request)
+    if response is None:
+        raise HTTPException(status_code=404, detail="index.html mangler")
+    return response
+
+
+@app.get("/vote")
+def vote_page(request: Request):
+    response = static_manifest.static_response("vote.html", request)
+    if response is None:
+        raise HTTPException(status_code=404, detail="vote.html mangler")
+    return response
+
+
+#service workeren må ligge på roten for å gjelde hele siden, derfor ikke under /static/
+@app.get("/sw.js")
+def service_worker(request: Request):
+    response = static_manifest.service_worker_response(request)
+    if response is None:
+        raise HTTPException(status_code=404, detail="sw.js mangler")
+    return response
+
+
+@app.get("/static/{name:path}")
+def static_file(name: str, request: Request):
+    response = static_manifest.static_response(name, request)
+    if response is None:
+        raise HTTPException(status_code=404, detail="Fant ikke filen")
+    return response
+
+
+#små bilder (miniatyrer o.l.) ligger i minnet, store sendes med sendfile eller fra en mmap
+media_cache = MediaCache()
+
+#ikke async: oppslaget, stat() og lesingen av små filer kan vente på sd-kortet, og skal ikke stoppe
+#event-loopen. selve sendingen (sendfile eller mmap) skjer fortsatt fra loopen, uten en tråd per bit
+@app.get("/media/{name:path}")
+def media_file(name: str, request: Request):
+    path = resolve_media_path(MEDIA_DIR, name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Fant ikke bildet")
+    return media_response(path, request, immutable=is_content_addressed(MEDIA_DIR, path, HASH_DIR_NAME),
+                          cache=media_cache)
+
+#kjøres av poll_state, som eier pollen på skjermen. endepunktet venter bare på at den er ferdig
+def switch_caption(state: PollState, caption: Caption):
     print("id cap", caption.id)
 
     incoming_id = (caption.id or "").strip() or uuid.uuid4().hex[:8]
-    current_id = shared_data.get("id")
+    current_id = state.poll.id
     is_new_request = bool(caption.name)
 
     if current_id == incoming_id:
-        shared_data["caption"] = caption.text
-        shared_data["score_a"] = yes_count
-        shared_data["score_b"] = no_count
-        shared_data["score_meh"] = meh_count
-        save_poll(force=True)
-        return {"message": "Oppdatert aktiv poll", "data": shared_data}
+        state.poll.update(caption=caption.text)
+        state.persist_now()
+        return {"message": "Oppdatert aktiv poll", "data": state.poll.to_dict()}
 
     if current_id and current_id != incoming_id:
-        save_poll(force=True)
+        state.persist_now()
 
     existing = find_poll(incoming_id)
     if existing:
-        result = update_old_polls(incoming_id)
-        if caption.text and caption.text != shared_data["caption"]:
-            shared_data["caption"] = caption.text
-            save_poll(force=True)
+        result = update_old_polls(state, incoming_id)
+        if caption.text and state.poll.update(caption=caption.text):
+            state.persist_now()
             result["data"]["caption"] = caption.text
         return result
     if not is_new_request:
         raise HTTPException(status_code=404, detail=f"Poll {incoming_id} finnes ikke i databasen.")
 
     # 🔹 deretter oppdater ny poll
-    shared_data["caption"] = caption.text
-    shared_data["id"] = incoming_id
-    shared_data["image_path"] = None
+    state.replace(Poll(incoming_id, caption.text))
     mark_image_dirty()
 
-    yes_count = no_count = meh_count = 0
-    shared_data["score_a"] = yes_count
-    shared_data["score_b"] = no_count
-    shared_data["score_meh"] = meh_count
+    state.persist_now()
+    return {"message": "Ny caption lagret!", "data": state.poll.to_dict()}
+
+
+@app.post("/update_caption/")
+async def update_caption(caption: Caption):
+    return await poll_state.call_async(switch_caption, caption)
 
-    save_poll(force=True)
 
-    # 🔹 do NOT save again here
-    return {"message": "Ny caption lagret!", "data": shared_data}
+#bytter bilde på pollen på skjermen, hvis det er den som ble endret
+def set_image_if_current(state: PollState, poll_id: str, image_path: Optional[str]):
+    if state.poll.id != poll_id:
+        return
+    state.poll.update(image_path=image_path)
+    mark_image_dirty()
+    state.persist_now()
 
 
 @app.post("/attach_image/")
@@ -371,14 +485,15 @@ def attach_image(payload: ImageAttachment):
             raise HTTPException(status_code=400, detail=f"Bilde ikke funnet: {exc}")
 
     update_image_path(target_id, normalized_path)
-    target_poll["image_path"] = normalized_path
+    target_poll.update(image_path=normalized_path)
+    poll_state.call(set_image_if_current, target_id, normalized_path)
 
-    if shared_data.get("id") == target_id:
-        shared_data["image_path"] = normalized_path
-        mark_image_dirty()
-        save_poll(force=True)
+    return {"message": "Oppdatert bilde for poll", "data": target_poll.to_dict()}
 
-    return {"message": "Oppdatert bilde for poll", "data": target_poll}
+
+#bildene lagres etter innhold, så samme bilde lastet opp til flere poller bare ligger én gang på sd-kortet
+media_store = MediaStore(BASE_DIR, MEDIA_DIR)
+media_store.start_collector()
 
 
 def store_uploaded_image(poll_id: str, upload: UploadFile) -> str:
@@ -388,16 +503,10 @@ def store_uploaded_image(poll_id: str, upload: UploadFile) -> str:
         raise HTTPException(status_code=400, detail="Kun bildefiler er tillatt.")
 
     suffix = Path(upload.filename).suffix.lower() or ".png"
-    dest_dir = MEDIA_DIR / poll_id
-    dest_dir.mkdir(parents=True, exist_ok=True)
-    filename = f"{uuid.uuid4().hex}{suffix}"
-    target_path = dest_dir / filename
-
-    upload.file.seek(0)
-    with target_path.open("wb") as out_file:
-        shutil.copyfileobj(upload.file, out_file)
-
-    return str(target_path.relative_to(BASE_DIR))
+    relative_path, written = media_store.store(upload.file, suffix)
+    if not written:
+        print(f"Bildet til {poll_id} fantes allerede: {relative_path}")
+    return relative_path
 
 
 @app.post("/upload_image/")
@@ -413,14 +522,10 @@ async def upload_image(
 
     relative_path = store_uploaded_image(target_id, file)
     update_image_path(target_id, relative_path)
-    target_poll["image_path"] = relative_path
-
-    if shared_data.get("id") == target_id:
-        shared_data["image_path"] = relative_path
-        mark_image_dirty()
-        save_poll(force=True)
+    target_poll.update(image_path=relative_path)
+    await poll_state.call_async(set_image_if_current, target_id, relative_path)
 
-    return {"message": "Bilde lastet opp", "data": target_poll}
+    return {"message": "Bilde lastet opp", "data": target_poll.to_dict()}
 
 
 #fjerna en broke funksjon
@@ -450,46 +555,420 @@ async def upload_image(
 
 
 
-@app.get("/get_scores/")
-def get_scores():
+#dashboardet spør etter disse hvert sekund, så svarene lagres ferdig som bytes til dataene endrer seg
+scores_cache = CachedJson()
+old_polls_cache = CachedJson()
+
+
+def build_scores(poll: Poll):
     return {
-        "score_a": shared_data["score_a"],
-        "score_b": shared_data["score_b"],
-        "score_meh": shared_data["score_meh"],
-        "id": shared_data["id"],
-        "image_path": shared_data.get("image_path"),
+        "score_a": poll.score_a,
+        "score_b": poll.score_b,
+        "score_meh": poll.score_meh,
+        "id": poll.id,
+        "caption": poll.caption,
+        "image_path": poll.image_path,
     }
 
+
+@app.get("/get_scores/")
+def get_scores():
+    # øyeblikksbildet er uforanderlig, så det kan brukes direkte som nøkkel
+    poll = poll_state.snapshot
+    body = scores_cache.get(poll, lambda: build_scores(poll))
+    return Response(content=body, media_type="application/json")
+
 @app.get("/get_old_polls")
-def get_old_polls(): 
-    return fetch_all_polls()
+def get_old_polls(include_archived: bool = False):
+    body = old_polls_cache.get(
+        (catalog_version(), include_archived),
+        lambda: [poll.to_dict() for poll in fetch_all_polls(include_archived=include_archived)],
+    )
+    return Response(content=body, media_type="application/json")
+
+#endringer siden revisjon `since`, så dashboardet bare henter det som er nytt siden sist.
+#since=0 (eller en revisjon fra en annen database) gir hele katalogen med full=true
+@app.get("/polls/sync")
+def sync_polls(since: int = Query(0, ge=0)):
+    return fetch_changes(since)
+
+#sikkerhetskopi mens kiosken kjører: databasene og bildene de peker på, strømmet som en tar
+@app.get("/admin/backup")
+def admin_backup(media: bool = True):
+    filename = f"polls-backup-{datetime.now():%Y%m%d-%H%M%S}.tar"
+    return StreamingResponse(
+        stream_backup(BASE_DIR, include_media=media),
+        media_type="application/x-tar",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+#kjør arkiveringen med en gang i stedet for å vente på neste runde
+@app.post("/admin/archive")
+def run_archive(days: int = Query(poll_archiver.days, ge=0)):
+    moved = archive_cold_polls(days, keep=active_poll_ids())
+    return {"archived": moved, "days": days}
+
+#eksport av hele arkivet. strømmes rad for rad fra databasen så verken serveren eller nettleseren må holde alt i minnet
+EXPORT_FORMATS = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+
+def stream_polls_csv(flush_every: int = 256):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for count, row in enumerate(iter_poll_rows(), start=1):
+        writer.writerow(row)
+        if count % flush_every == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def stream_polls_ndjson():
+    for row in iter_poll_rows():
+        yield json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False) + "\n"
+
+
+@app.get("/export")
+def export_polls(fmt: str = Query("csv", alias="format")):
+    fmt = fmt.lower()
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Ukjent format '{fmt}'. Bruk csv eller ndjson.")
+    # pass på at den aktive pollen er med med de siste tallene
+    poll_state.call(PollState.persist_now)
+    body = stream_polls_csv() if fmt == "csv" else stream_polls_ndjson()
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="polls.{fmt}"'},
+    )
+
+
+def parse_import_rows(upload: UploadFile, fmt: str):
+    upload.file.seek(0)
+    text = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+    try:
+        if fmt == "csv":
+            yield from csv.DictReader(text)
+        else:
+            for line_no, line in enumerate(text, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as exc:
+                    raise ValueError(f"linje {line_no}: {exc.msg}")
+    finally:
+        # ikke la TextIOWrapper lukke selve opplastingsfila
+        text.detach()
+
+
+#motparten til /export. laster inn en hel sesong med poller i én transaksjon
+@app.post("/import")
+def import_polls(
+    file: UploadFile = File(...),
+    fmt: Optional[str] = Form(None, alias="format"),
+):
+    fmt = (fmt or Path(file.filename or "").suffix.lstrip(".") or "csv").lower()
+    if fmt in ("jsonl", "json"):
+        fmt = "ndjson"
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Ukjent format '{fmt}'. Bruk csv eller ndjson.")
+
+    try:
+        imported = import_poll_records(parse_import_rows(file, fmt))
+    except (ValueError, TypeError, AttributeError) as exc:
+        raise HTTPException(status_code=400, detail=f"Kunne ikke importere: {exc}")
+
+    return {"message": "Poller importert", "imported": imported}
+
+#hvor mye cpu skjermløkka bruker, og hvor mye den sparer på å gå saktere når ingen stemmer
+@app.get("/display/frame_stats")
+def display_frame_stats():
+    if not frame_scheduler:
+        return {"running": False}
+    stats = {"running": True, **frame_scheduler.report()}
+    if loop_profiler and loop_profiler.active:
+        stats["profiler"] = loop_profiler.summary()
+    stats["input_latency"] = input_latency.summary()
+    stats["image_cache"] = surface_cache.stats()
+    if display_mirror:
+        stats["mirror"] = display_mirror.stats()
+    return stats
+
+#hvor mange som har fått 429, og hvor mange klienter som huskes. async, så den kjører på samme loop som begrensningen
+@app.get("/admin/limits")
+async def rate_limit_stats():
+    return rate_limiter.stats()
+
+@app.get("/admin/media_cache")
+def media_cache_stats():
+    return media_cache.stats()
+
+#hvilke kjerner og hvilken nice hver tråd faktisk har
+@app.get("/admin/threads")
+def thread_stats():
+    return cpu_plan.stats()
+
+#det kiosken viser, som mjpeg. åpnes rett i nettleseren eller med vlc
+@app.get("/display/stream")
+async def display_stream():
+    if not display_mirror:
+        raise HTTPException(status_code=404, detail="Skjermspeiling er av. Start med DISPLAY_STREAM=1.")
+    return StreamingResponse(
+        display_mirror.stream(),
+        media_type=f"multipart/x-mixed-replace; boundary={BOUNDARY}",
+        headers={"Cache-Control": "no-store"},
+    )
+
+#adressen qr-koden på skjermen peker til. VOTE_URL kan settes hvis pien har et navn på nettet
+def default_vote_url(port: int = 8000) -> str:
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as probe:
+            # ingen pakker sendes, dette finner bare hvilken adresse pien har ut mot nettverket
+            probe.connect(("10.255.255.255", 1))
+            address = probe.getsockname()[0]
+    except OSError:
+        address = "127.0.0.1"
+    return f"http://{address}:{port}/vote"
+
+
+VOTE_URL = os.environ.get("VOTE_URL") or default_vote_url(SERVER_OPTIONS["port"])
+VOTE_COOKIE = "vote_device"
+
+
+#stemme fra mobilen. uten poll_id gjelder den pollen på skjermen. hver enhet får stemme én gang per poll
+@app.post("/vote")
+async def vote(payload: VoteRequest, request: Request, response: Response):
+    displayed_id = poll_state.snapshot.id
+    poll_id = payload.poll_id or displayed_id
+    session = session_manager.get(poll_id)
+    if poll_id != displayed_id and not session:
+        raise HTTPException(status_code=409, detail="Pollen er ikke åpen for stemmer.")
+
+    device_id = payload.device_id or request.cookies.get(VOTE_COOKIE)
+    if not device_id:
+        device_id = uuid.uuid4().hex
+        response.set_cookie(VOTE_COOKIE, device_id, max_age=365 * 24 * 3600, samesite="lax")
+
+    try:
+        if session:
+            # stasjonene har egne tellere med egen lås, og lagres samlet av økt-flusheren
+            counted = vote_intake.check(poll_id, device_id, payload.choice)
+            if counted:
+                session.vote(payload.choice)
+        else:
+            counted = vote_intake.submit(poll_id, device_id, payload.choice)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return {"status": "counted" if counted else "duplicate", "poll_id": poll_id}
+
+
+@app.get("/vote/stats")
+def vote_stats():
+    return vote_intake.stats()
+
+
+#legger stemmene fra mobilene inn i pollen. kjøres av poll_state, så alt som har samlet seg blir én endring
+def apply_phone_votes(state: PollState):
+    pending = vote_intake.drain()
+    if not pending:
+        return
+    stale = []
+    for poll_id, counts in pending.items():
+        if poll_id == state.poll.id:
+            for choice, amount in counts.items():
+                if amount:
+                    state.poll.add_vote(choice, amount)
+            continue
+        # har pollen en økt på en stasjon går stemmene dit. ellers ville neste lagring fra økta skrevet over dem
+        session = session_manager.get(poll_id)
+        if session:
+            for choice, amount in counts.items():
+                if amount:
+                    session.vote(choice, amount)
+            continue
+        # pollen på skjermen ble byttet før stemmene ble hentet. de skrives rett til databasen
+        poll = fetch_poll(poll_id)
+        if poll:
+            for choice, amount in counts.items():
+                if amount:
+                    poll.add_vote(choice, amount)
+            stale.append(poll)
+    if stale:
+        save_poll_records(stale)
+
+#stasjoner: start en økt for en poll med egne gpio-pinner, f.eks. {"yes": 5, "no": 6, "meh": 13}
+@app.post("/sessions")
+def start_session(request: SessionRequest):
+    if request.id == poll_state.snapshot.id:
+        raise HTTPException(status_code=409, detail="Pollen vises allerede på skjermen.")
+    poll = find_poll(request.id)
+    if not poll:
+        raise HTTPException(status_code=404, detail=f"Poll {request.id} finnes ikke i databasen.")
+    try:
+        session = session_manager.start(poll, request.buttons)
+    except SessionError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    return {"message": "Økt startet", "data": session.to_dict()}
+
+
+@app.get("/sessions")
+def list_sessions():
+    return [session.to_dict() for session in session_manager.sessions()]
+
+
+@app.delete("/sessions/{poll_id}")
+def stop_session(poll_id: str):
+    final = session_manager.stop(poll_id)
+    if not final:
+        raise HTTPException(status_code=404, detail=f"Ingen aktiv økt for poll {poll_id}.")
+    return {"message": "Økt avsluttet", "data": final.to_dict()}
+
+
+#søk i captions med prefiks-matching, f.eks. /polls/search?q=quiz
+@app.get("/polls/search")
+def polls_search(q: str = "", limit: int = Query(20, ge=1, le=200)):
+    return [poll.to_dict() for poll in search_polls(q, limit)]
+
+
+#hvor lenge kommandoene til poll_state venter, og hvor mange som kommer samtidig
+@app.get("/state/stats")
+def state_stats():
+    return poll_state.stats()
+
 
-def update_old_polls(id: str):
+#tallene for én poll, uansett om den er på skjermen, i en økt eller bare i databasen
+@app.get("/polls/{poll_id}/scores")
+def poll_scores(poll_id: str):
+    session = session_manager.get(poll_id)
+    if session:
+        poll = session.snapshot()
+    elif poll_state.snapshot.id == poll_id:
+        poll = poll_state.snapshot
+    else:
+        poll = find_poll(poll_id)
+    if not poll:
+        raise HTTPException(status_code=404, detail=f"Poll {poll_id} finnes ikke.")
+    return build_scores(poll)
+
+#statistikk for arrangørene. leses fra sammendragstabeller, så det går like fort med 10 som 10 000 poller
+@app.get("/stats/summary")
+def stats_summary():
+    return analytics.summary()
+
+
+@app.get("/stats/top")
+def stats_top(
+    by: str = "votes",
+    limit: int = Query(10, ge=1, le=100),
+    min_votes: int = Query(0, ge=0),
+):
+    try:
+        return analytics.top_polls(by, limit, min_votes)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+@app.get("/stats/daily")
+def stats_daily(days: int = Query(30, ge=1, le=366)):
+    return analytics.daily(days)
+
+#kjøres av poll_state. setter en poll som er hentet fra databasen inn på skjermen
+def activate_poll(state: PollState, poll: Poll):
+    # kjører pollen som en egen økt må den avsluttes først, ellers telles den to steder
+    final = session_manager.stop(poll.id)
+    state.replace(final or poll, persisted=True)
+    mark_image_dirty()
+
+#kjøres av poll_state (via switch_caption)
+def update_old_polls(state: PollState, id: str):
     poll = find_poll(id)
     if not poll:
         return {"error": "Poll ikke funnet"}
 
-    global shared_data, yes_count, no_count, meh_count
-    shared_data = poll.copy()
-    shared_data.setdefault("image_path", None)
+    activate_poll(state, poll)
 
-    yes_count = shared_data["score_a"]
-    no_count = shared_data["score_b"]
-    meh_count = shared_data["score_meh"]
-    for key in last_persisted_poll:
-        last_persisted_poll[key] = shared_data.get(key)
-    mark_image_dirty()
+    return {"message": "Gjenopptok gammel poll", "data": state.poll.to_dict()}
 
-    return {"message": "Gjenopptok gammel poll", "data": shared_data}
+#kjøres av poll_state når spillelista bytter. pollen og bildet er hentet på forhånd
+def show_prefetched(state: PollState, ready: Prefetched):
+    if state.poll.id == ready.poll.id:
+        return
+    poll = ready.poll
+    # noe er skrevet til databasen siden pollen ble hentet. å slå opp id-en igjen er billig, det er bildet som tar tid
+    if catalog_version() != ready.catalog:
+        poll = find_poll(poll.id) or poll
+    state.persist_now()
+    activate_poll(state, poll)
+
+#fylles inn av skjermløkka, som vet hvor stort bildet skal være
+image_prefetcher = None
+
+def prefetch_image(poll: Poll):
+    if image_prefetcher:
+        image_prefetcher(poll)
+
+#spilleliste som bytter poll på skjermen av seg selv
+playlist = Playlist(show=lambda ready: poll_state.call(show_prefetched, ready), warm=prefetch_image)
+playlist.start()
+
+@app.get("/playlist")
+def playlist_status():
+    return playlist.status()
+
+@app.put("/playlist")
+def set_playlist(request: PlaylistRequest):
+    if request.interval < 1:
+        raise HTTPException(status_code=400, detail="interval må være minst 1 sekund.")
+    missing = [poll_id for poll_id in request.ids if not find_poll(poll_id)]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Finnes ikke i databasen: {', '.join(missing)}")
+    playlist.set(request.ids, request.interval, request.autostart)
+    return playlist.status()
+
+@app.delete("/playlist")
+def clear_playlist():
+    playlist.clear()
+    return playlist.status()
+
+@app.post("/playlist/next")
+def playlist_next():
+    poll = playlist.next()
+    return {"data": poll.to_dict() if poll else None, **playlist.status()}
+
+@app.post("/playlist/previous")
+def playlist_previous():
+    poll = playlist.previous()
+    return {"data": poll.to_dict() if poll else None, **playlist.status()}
+
+@app.post("/playlist/pause")
+def playlist_pause():
+    playlist.pause()
+    return playlist.status()
+
+@app.post("/playlist/resume")
+def playlist_resume():
+    playlist.resume()
+    return playlist.status()
 
                 
 #hoster den via uvicorn. kan gjøres mye penere dersom det gjøres via flere files. men her er alt i ett som gjør datahåndtering lettere (ikke ryddigere)
 def run_api():
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    #før uvicorn starter, ellers arver event-loopen og de første trådpool-trådene input fra hovedtråden
+    cpu_plan.pin_current("api")
+    print(f"Starter api-et: {describe(SERVER_OPTIONS)}")
+    uvicorn.run(app, **SERVER_OPTIONS)
 
 
 # Start FastAPI i egen tråd
-threading.Thread(target=run_api, daemon=True).start() #dette er magien bak alt!
+threading.Thread(target=run_api, name="api", daemon=True).start() #dette er magien bak alt!
+#alle de faste trådene finnes nå. hovedtråden blir render, og pygame-trådene arver det. api-tråden har
+#allerede plassert seg selv i run_api
+cpu_plan.place_threads()
+print(f"CPU-plan: {cpu_plan.describe()}")
 #her har vi starten på hva som får skjermen til å fungere. (pygamer hovedløkke) dette er hvorfor serveren får sin egen tråd.
 #hadde den trengt det i python3.15?
 if RUN_DISPLAY:
@@ -511,12 +990,13 @@ if RUN_DISPLAY:
     MEH_COLOR = (240, 200,0 )
     TEXT_COLOR = (255, 255, 255)
     GRID_COLOR = (60, 65, 80)
+    # endres noen av disse lages de ferdigtegnede lagene på nytt
+    DISPLAY_THEME = (BG, GRID_COLOR, TEXT_COLOR, VOTE_URL)
 
     # --- fonter ---
     font_large = pygame.font.Font(None, int(HEIGHT * 0.1))
     font_small = pygame.font.Font(None, int(HEIGHT * 0.05))
 
-    clock = pygame.time.Clock()
     running = True
 
     # --- layout ---
@@ -532,10 +1012,29 @@ if RUN_DISPLAY:
     BOTTOM_MARGIN = HEIGHT * 0.2
     font_hint = pygame.font.Font(None, int(HEIGHT * 0.035))
 
-    
-    def ensure_image_surface_loaded():
+    # bildet skal dekke maks 90 % av bredden og 80 % av høyden
+    IMAGE_BOX = (int(WIDTH * 0.9), int(HEIGHT * 0.8))
+
+    def fit_image(img):
+        img_w, img_h = img.get_size()
+        scale = max(min(IMAGE_BOX[0] / img_w, IMAGE_BOX[1] / img_h), 0.1)
+        target_size = (max(1, int(img_w * scale)), max(1, int(img_h * scale)))
+        if target_size == (img_w, img_h):
+            return img
+        return pygame.transform.smoothscale(img, target_size)
+
+    #spillelista laster neste bilde i bakgrunnen, så det ligger klart når pollen byttes
+    def warm_image(poll):
+        absolute = absolute_image_path(poll.image_path)
+        if absolute and absolute.exists():
+            surface_cache.warm(absolute, IMAGE_BOX, fit_image)
+
+    image_prefetcher = warm_image
+
+    #bildet hentes ferdig skalert fra surface_cache, og dekodes bare første gang det vises
+    def ensure_image_surface_loaded(snap):
         global current_image_surface, loaded_image_path
-        target_path = shared_data.get("image_path")
+        target_path = snap.image_path
         if target_path == loaded_image_path:
             return
         loaded_image_path = target_path
@@ -547,87 +1046,141 @@ if RUN_DISPLAY:
             current_image_surface = None
             return
         try:
-            current_image_surface = pygame.image.load(str(absolute)).convert()
+            current_image_surface = surface_cache.get(absolute, IMAGE_BOX, fit_image)
         except Exception as exc:
             print(f"Kunne ikke laste bilde {absolute}: {exc}")
             current_image_surface = None
 
-    # mye matte for å tegne dette fint.
-    def draw_results_view():
-        max_score = max(score_a, score_b, score_meh, 1)
-        scores = [score_a, score_meh, score_b]
+    CHART_HEIGHT = int(HEIGHT * 0.6)
+    CHART_BOTTOM = int(HEIGHT - BOTTOM_MARGIN)
+    # øverste punkt en søyle med tallet over seg kan nå. alt over dette rører vi ikke når en søyle endres
+    COLUMN_TOP = CHART_BOTTOM - CHART_HEIGHT - font_large.get_height() - 10
+
+    bar_animator = BarAnimator(len(CATEGORIES))
+    # det som sist ble tegnet i hver kolonne, så vi vet hva som må tegnes på nytt
+    shown_scores = [None] * len(CATEGORIES)
+    value_text_cache = [None] * len(CATEGORIES)
+
+    # høydene regnes i hele piksler, så animasjonen bare tegner når en søyle faktisk flytter seg
+    def bar_targets(snap):
+        scores = [snap.score_a, snap.score_meh, snap.score_b]
+        max_score = max(snap.score_a, snap.score_b, snap.score_meh, 1)
+        return scores, [score * CHART_HEIGHT // max_score for score in scores]
 
-        screen.fill(BG)
+    def column_rect(i):
+        return pygame.Rect(int(MARGIN_X + i * SPACING), COLUMN_TOP, int(SPACING), CHART_BOTTOM - COLUMN_TOP + 1)
+
+    def draw_grid(surface):
         for i in range(6):
             y = HEIGHT - BOTTOM_MARGIN - (i * (HEIGHT * 0.6 / 5))
-            pygame.draw.line(screen, GRID_COLOR, (MARGIN_X * 0.8, y), (WIDTH - MARGIN_X * 0.8, y), 1)
-
-        for i, (label, color) in enumerate(CATEGORIES):
-            x_center = MARGIN_X + i * SPACING + SPACING / 2
-            score_value = scores[i]
-            bar_height = (score_value / max_score) * (HEIGHT * 0.6)
-            rect = pygame.Rect(0, 0, BAR_WIDTH, bar_height)
-            rect.centerx = x_center
-            rect.bottom = HEIGHT - BOTTOM_MARGIN
-            pygame.draw.rect(screen, color, rect, border_radius=20)
+            pygame.draw.line(surface, GRID_COLOR, (MARGIN_X * 0.8, y), (WIDTH - MARGIN_X * 0.8, y), 1)
 
-            txt_value = font_large.render(str(score_value), True, TEXT_COLOR)
-            screen.blit(txt_value, (x_center - txt_value.get_width()/2, rect.top - txt_value.get_height() - 10))
+    #for at teksten øverst i hjørnet skal vises. hjar en motsatt funksjon for å bytte tilbake.
+    def draw_mode_hint(surface):
+        hint_text = "Trykk alle knappene samtidig for å bytte bilde!"
+        hint = font_hint.render(hint_text, True, TEXT_COLOR)
+        surface.blit(hint, (MARGIN_X * 0.1, 20))
 
+    # det som står fast i resultatvisningen: bakgrunn, rutenett, navnene under søylene og hinten
+    def paint_results_layer(surface):
+        surface.fill(BG)
+        draw_grid(surface)
+        for i, (label, _) in enumerate(CATEGORIES):
+            x_center = MARGIN_X + i * SPACING + SPACING / 2
             txt_label = font_small.render(label, True, TEXT_COLOR)
-            screen.blit(txt_label, (x_center - txt_label.get_width()/2, HEIGHT - BOTTOM_MARGIN + 20))
-
-        caption_text = font_small.render(shared_data["caption"], True, TEXT_COLOR)
+            surface.blit(txt_label, (x_center - txt_label.get_width()/2, HEIGHT - BOTTOM_MARGIN + 20))
+        draw_mode_hint(surface)
+        draw_vote_qr(surface)
+
+    # qr-kode nederst til høyre som leder publikum til stemmesiden på mobilen
+    def draw_vote_qr(surface):
+        qr = qr_surface(VOTE_URL, module_px=max(3, HEIGHT // 200))
+        if qr is None:
+            return
+        qr_rect = qr.get_rect(bottomright=(WIDTH - 20, HEIGHT - 20))
+        surface.blit(qr, qr_rect)
+        hint = font_hint.render("Stem fra mobilen", True, TEXT_COLOR)
+        surface.blit(hint, (qr_rect.centerx - hint.get_width()/2, qr_rect.top - hint.get_height() - 8))
+
+    def paint_image_layer(surface):
+        surface.fill(BG)
+        draw_mode_hint(surface)
+
+    layers = LayerCompositor()
+    layers.register("results", paint_results_layer)
+    layers.register("image", paint_image_layer)
+
+    # tegner bare én kolonne (søyle og tall oppå det ferdigtegnede laget) og returnerer området som ble endret
+    def draw_bar_column(i, score_value, bar_height):
+        _, color = CATEGORIES[i]
+        area = column_rect(i)
+        layers.restore(screen, "results", DISPLAY_THEME, area)
+
+        x_center = MARGIN_X + i * SPACING + SPACING / 2
+        rect = pygame.Rect(0, 0, BAR_WIDTH, bar_height)
+        rect.centerx = x_center
+        rect.bottom = CHART_BOTTOM
+        pygame.draw.rect(screen, color, rect, border_radius=20)
+
+        cached = value_text_cache[i]
+        if cached is None or cached[0] != score_value:
+            cached = (score_value, font_large.render(str(score_value), True, TEXT_COLOR))
+            value_text_cache[i] = cached
+        txt_value = cached[1]
+        screen.blit(txt_value, (x_center - txt_value.get_width()/2, rect.top - txt_value.get_height() - 10))
+        shown_scores[i] = score_value
+        return area
+
+    # mye matte for å tegne dette fint. det faste ligger ferdig i laget, her tegnes bare søyler og tekst
+    def draw_results_view(snap, scores, heights):
+        layers.blit(screen, "results", DISPLAY_THEME)
+
+        for i in range(len(CATEGORIES)):
+            draw_bar_column(i, scores[i], heights[i])
+
+        caption_text = font_small.render(snap.caption, True, TEXT_COLOR)
         screen.blit(caption_text, (WIDTH/2 - caption_text.get_width()/2, HEIGHT - caption_text.get_height() - 10))
 
     # passe på at bildet passer.
-    def draw_image_view():
-        ensure_image_surface_loaded()
-        screen.fill(BG)
+    def draw_image_view(snap):
+        ensure_image_surface_loaded(snap)
+        layers.blit(screen, "image", DISPLAY_THEME)
 
         if current_image_surface:
-            img = current_image_surface
-            img_w, img_h = img.get_size()
-            max_w = WIDTH * 0.9
-            max_h = HEIGHT * 0.8
-            scale = min(max_w / img_w, max_h / img_h)
-            scale = max(scale, 0.1)
-            target_size = (int(img_w * scale), int(img_h * scale))
-            if target_size[0] > 0 and target_size[1] > 0:
-                if target_size != (img_w, img_h):
-                    display_img = pygame.transform.smoothscale(img, target_size)
-                else:
-                    display_img = img
-                rect = display_img.get_rect(center=(WIDTH/2, HEIGHT/2))
-                screen.blit(display_img, rect)
+            rect = current_image_surface.get_rect(center=(WIDTH/2, HEIGHT/2))
+            screen.blit(current_image_surface, rect)
         else:
             msg = "Ingen bilde knyttet til denne pollen"
             placeholder = font_small.render(msg, True, TEXT_COLOR)
             screen.blit(placeholder, (WIDTH/2 - placeholder.get_width()/2, HEIGHT/2 - placeholder.get_height()/2))
 
-        caption_text = font_small.render(shared_data["caption"], True, TEXT_COLOR)
+        caption_text = font_small.render(snap.caption, True, TEXT_COLOR)
         screen.blit(caption_text, (WIDTH/2 - caption_text.get_width()/2, HEIGHT - caption_text.get_height() - 10))
 
-    #for at teksten øverst i hjørnet skal vises. hjar en motsatt funksjon for å bytte tilbake.
-    def draw_mode_hint():
-        hint_text = "Trykk alle knappene samtidig for å bytte bilde!"
-        hint = font_hint.render(hint_text, True, TEXT_COLOR)
-        screen.blit(hint, (MARGIN_X * 0.1, 20))
+    frame_scheduler = AdaptiveFrameScheduler()
+    loop_profiler = LoopProfiler()
+    font_profiler = pygame.font.Font(None, 24)
+    woken_events = []
+    last_frame_key = None
 
     #hovedfunksjonen.
     while running:
-        for e in pygame.event.get():
+        loop_profiler.begin_frame()
+        for e in woken_events + pygame.event.get():
             if e.type == pygame.QUIT:
                 running = False
+            elif e.type == WAKE_EVENT:
+                frame_scheduler.mark_active()
             elif e.type == pygame.KEYDOWN:
+                frame_scheduler.mark_active()
                 if e.key == pygame.K_ESCAPE:
                     running = False
                 elif e.key == pygame.K_y:
-                    yes_count += 1
+                    poll_state.vote("yes")
                 elif e.key == pygame.K_m:
-                    meh_count += 1
+                    poll_state.vote("meh")
                 elif e.key == pygame.K_n:
-                    no_count += 1
+                    poll_state.vote("no")
                 elif e.key == pygame.K_p:
                     toggle_display_mode()
                     #her endrer den mellom modusene
@@ -635,28 +1188,78 @@ if RUN_DISPLAY:
                     toggle_display_mode(DisplayMode.RESULTS)
                 elif e.key == pygame.K_i:
                     toggle_display_mode(DisplayMode.IMAGE)
+                elif e.key == pygame.K_d:
+                    if not loop_profiler.toggle():
+                        redraw_requested = True  # tegn over panelet igjen
+                elif e.key == pygame.K_c:
+                    profile_path = loop_profiler.toggle_capture()
+                    print(f"Profil lagret i {profile_path}" if profile_path else "Profilerer skjermløkka...")
+        loop_profiler.lap("events")
 
         check_button_combo_toggle()
-
-        # --- oppdater score fra GPIO-knapper ---
-        score_a = yes_count
-        score_b = no_count
-        score_meh = meh_count
-        shared_data["score_a"] = score_a
-        shared_data["score_b"] = score_b
-        shared_data["score_meh"] = score_meh
-        save_poll()
-
-        if current_display_mode == DisplayMode.RESULTS:
-            draw_results_view()
+        loop_profiler.lap("combo")
+
+        # --- siste stilling fra knapper, mobiler og api. løkka leser bare, poll_state lagrer ---
+        snap = poll_state.snapshot
+        loop_profiler.lap("state")
+
+        now_ms = pygame.time.get_ticks()
+        scores, targets = bar_targets(snap)
+        bar_animator.set_targets(targets, now_ms)
+        moved_bars = bar_animator.step(now_ms)
+        heights = bar_animator.heights()
+
+        # hele skjermen tegnes bare ved ny modus, ny poll eller ny tekst. ellers bare kolonnene som endret seg
+        frame_key = (current_display_mode, snap.id, snap.caption)
+        if redraw_requested or frame_key != last_frame_key:
+            redraw_requested = False
+            last_frame_key = frame_key
+            if current_display_mode == DisplayMode.RESULTS:
+                draw_results_view(snap, scores, heights)
+            else:
+                draw_image_view(snap)
+            loop_profiler.draw(screen, font_profiler)
+            loop_profiler.lap("draw")
+            pygame.display.flip()
+            frame_drawn = True
         else:
-            draw_image_view()
-
-        draw_mode_hint()
-
-        pygame.display.flip()
-        clock.tick(60)
+            dirty = []
+            if current_display_mode == DisplayMode.RESULTS:
+                dirty = [
+                    draw_bar_column(i, scores[i], heights[i])
+                    for i in range(len(scores))
+                    if i in moved_bars or scores[i] != shown_scores[i]
+                ]
+            overlay = loop_profiler.draw(screen, font_profiler)
+            if overlay:
+                dirty.append(overlay)
+            loop_profiler.lap("draw")
+            if dirty:
+                pygame.display.update(dirty)
+            frame_drawn = bool(dirty)
+        loop_profiler.lap("flip")
+
+        # stemmer vises bare i resultatvisningen. i bildemodus går målingene ut på tid i stedet
+        if frame_drawn and current_display_mode == DisplayMode.RESULTS:
+            input_latency.presented(snap)
+
+        if display_mirror:
+            display_mirror.offer(screen, frame_drawn)
+        loop_profiler.lap("mirror")
+        loop_profiler.end_frame()
+
+        #profileringspanelet tegnes bare når løkka går. når den står stille oppdateres det én gang i sekundet
+        woken_events = frame_scheduler.wait(
+            animating=bar_animator.animating,
+            max_wait=1.0 if loop_profiler.enabled else None,
+        )
 
+    print("Skjermløkka:", frame_scheduler.report())
+    if display_mirror:
+        display_mirror.stop()
+    playlist.stop()
+    poll_state.stop()
+    session_manager.shutdown()
     pygame.quit()
 else:
     print("Display disabled; keeping API thread alive.")
@@ -664,4 +1267,6 @@ else:
         while True:
             sleep(1)
     except KeyboardInterrupt:
-        pass
+        playlist.stop()
+        poll_state.stop()
+        session_manager.shutdown()
@@ -0,0 +1,155 @@
+# arkivering av gamle poller. polls.db vokste for alltid, og både /get_old_polls og backup måtte gjennom alt.
+# poller som ikke er endret på N dager flyttes over i polls_archive.db, som bare skrives av denne jobben
+# og ellers åpnes skrivebeskyttet. etterpå kjøres VACUUM så polls.db faktisk krymper på sd-kortet.
+# fetch_poll, fetch_poll_by_caption og fetch_all_polls(include_archived=True) finner fortsatt de arkiverte.
+
+import argparse
+import sqlite3
+import threading
+from typing import Callable, Iterable, Optional
+
+import polls_db
+
+DEFAULT_DAYS = 90
+
+# samme kolonner som polls, så de samme spørringene virker mot begge filene
+_ARCHIVE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS archive.polls (
+    id TEXT PRIMARY KEY,
+    caption TEXT NOT NULL,
+    score_a INTEGER NOT NULL DEFAULT 0,
+    score_b INTEGER NOT NULL DEFAULT 0,
+    score_meh INTEGER NOT NULL DEFAULT 0,
+    image_path TEXT,
+    updated_at TEXT NOT NULL,
+    archived_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS archive.polls_updated_at ON polls (updated_at);
+CREATE INDEX IF NOT EXISTS archive.polls_caption ON polls (caption COLLATE NOCASE);
+"""
+
+# bildene til arkiverte poller skal ikke ryddes bort. slettingen fra polls trekker fra i media.refcount
+# via triggeren, så referansene legges til igjen her (og trekkes fra når en poll hentes tilbake)
+_ADJUST_REFCOUNT = """
+UPDATE media SET refcount = refcount + ? * (
+    SELECT COUNT(*) FROM temp.{table} AS t WHERE t.image_path = media.path
+)
+WHERE path IN (SELECT image_path FROM temp.{table})
+"""
+
+
+def archive_cold_polls(days: int = DEFAULT_DAYS, keep: Iterable[str] = (), vacuum: bool = True) -> int:
+    """Move polls not updated for ``days`` days into the archive database. Returns the number moved."""
+    keep = [poll_id for poll_id in keep if poll_id]
+    conn = sqlite3.connect(polls_db.DB_PATH, isolation_level=None)
+    try:
+        conn.execute("ATTACH DATABASE ? AS archive", (polls_db.ARCHIVE_PATH,))
+        conn.executescript(_ARCHIVE_SCHEMA)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # poller som er lagret på nytt etter at de ble arkivert lever i polls igjen. arkivkopien er utdatert
+            conn.execute(
+                "CREATE TEMP TABLE revived AS "
+                "SELECT a.id, a.image_path FROM archive.polls AS a JOIN main.polls AS p ON p.id = a.id"
+            )
+            conn.execute(_ADJUST_REFCOUNT.format(table="revived"), (-1,))
+            conn.execute("DELETE FROM archive.polls WHERE id IN (SELECT id FROM temp.revived)")
+
+            keep_clause = f"AND id NOT IN ({','.join('?' for _ in keep)})" if keep else ""
+            conn.execute(
+                f"""
+                CREATE TEMP TABLE cold AS
+                SELECT id, image_path FROM main.polls
+                WHERE updated_at < datetime('now', ?) {keep_clause}
+                """,
+                [f"-{int(days)} days", *keep],
+            )
+            moved = conn.execute("SELECT COUNT(*) FROM temp.cold").fetchone()[0]
+            if moved:
+                conn.execute(
+                    """
+                    INSERT INTO archive.polls (id, caption, score_a, score_b, score_meh, image_path, updated_at)
+                    SELECT id, caption, score_a, score_b, score_meh, image_path, updated_at
+                    FROM main.polls WHERE id IN (SELECT id FROM temp.cold)
+                    ON CONFLICT(id) DO UPDATE SET
+                        caption=excluded.caption,
+                        score_a=excluded.score_a,
+                        score_b=excluded.score_b,
+                        score_meh=excluded.score_meh,
+                        image_path=excluded.image_path,
+                        updated_at=excluded.updated_at,
+                        archived_at=CURRENT_TIMESTAMP
+                    """
+                )
+                conn.execute("DELETE FROM main.polls WHERE id IN (SELECT id FROM temp.cold)")
+                conn.execute(_ADJUST_REFCOUNT.format(table="cold"), (1,))
+            conn.execute("DROP TABLE temp.revived")
+            conn.execute("DROP TABLE temp.cold")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("DETACH DATABASE archive")
+
+        if moved and vacuum:
+            conn.execute("VACUUM")
+            with sqlite3.connect(polls_db.ARCHIVE_PATH) as archive_conn:
+                archive_conn.execute("VACUUM")
+            archive_conn.close()
+    finally:
+        conn.close()
+
+    if moved:
+        polls_db._bump_catalog_version()
+    return moved
+
+
+class PollArchiver:
+    """Runs archive_cold_polls in the background every ``interval`` seconds."""
+
+    def __init__(self, days: int = DEFAULT_DAYS, interval: float = 24 * 3600.0,
+                 keep: Optional[Callable[[], Iterable[str]]] = None):
+        self.days = days
+        self.interval = interval
+        # poller som er i bruk akkurat nå (skjermen, aktive økter) arkiveres aldri
+        self.keep = keep or (lambda: ())
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self) -> int:
+        return archive_cold_polls(self.days, keep=self.keep())
+
+    def start(self) -> None:
+        if self._thread:
+            return
+
+        def run():
+            while not self._stop.wait(self.interval):
+                try:
+                    moved = self.run_once()
+                    if moved:
+                        print(f"Arkiverte {moved} gamle poller")
+                except Exception as exc:
+                    print(f"Arkivering av poller feilet: {exc}")
+
+        self._thread = threading.Thread(target=run, name="poll-archiver", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Flytt gamle poller over i polls_archive.db.")
+    parser.add_argument("--days", type=int, default=DEFAULT_DAYS,
+                        help="arkiver poller som ikke er endret på så mange dager")
+    parser.add_argument("--no-vacuum", action="store_true", help="hopp over VACUUM etterpå")
+    args = parser.parse_args()
+
+    polls_db.init_db()
+    moved = archive_cold_polls(args.days, vacuum=not args.no_vacuum)
+    print(f"Arkiverte {moved} poller til {polls_db.ARCHIVE_PATH}")
+
+
+if __name__ == "__main__":
+    main()
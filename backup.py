@@ -0,0 +1,141 @@
+# sikkerhetskopi av polls.db mens kiosken kjører. før måtte app.py stoppes for å kopiere databasen,
+# ellers kunne kopien bli halvskrevet. her brukes sqlites backup-api i små steg med pauser mellom,
+# og kopien pakkes sammen med bildene den peker på i en tar som strømmes ut mens den lages.
+#
+#   python backup.py --out kiosk-backup.tar
+#   curl -o kiosk-backup.tar http://<pi-ip>:8000/admin/backup
+
+import argparse
+import io
+import os
+import sqlite3
+import tarfile
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional
+
+import polls_db
+
+BACKUP_PAGES = 64
+BACKUP_PAUSE = 0.005
+TAR_CHUNK_SIZE = 64 * 1024
+
+
+def backup_database(source_path: str, target_path: str, pages: int = BACKUP_PAGES,
+                    pause: float = BACKUP_PAUSE,
+                    progress: Optional[Callable[[int, int], None]] = None) -> None:
+    """Copy a live SQLite database to ``target_path`` with the online backup API.
+
+    In WAL mode the copy is taken from a single read snapshot, so writers are never blocked and the
+    backup does not restart when votes are saved while it runs.
+    """
+    source = sqlite3.connect(source_path, isolation_level=None)
+    target = sqlite3.connect(target_path)
+    try:
+        wal = source.execute("PRAGMA journal_mode").fetchone()[0].lower() == "wal"
+        if wal:
+            # lesetransaksjonen låser et øyeblikksbilde. i wal-modus kan andre fortsatt skrive imens
+            source.execute("BEGIN")
+            source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+
+        # kalles etter hvert steg. pausen slipper til stemmer og skjermløkka mellom stegene
+        def step_done(status, remaining, total):
+            if progress:
+                progress(remaining, total)
+            if remaining and pause:
+                time.sleep(pause)
+
+        source.backup(target, pages=pages, progress=step_done)
+        if wal:
+            source.execute("COMMIT")
+    finally:
+        source.close()
+        target.close()
+
+
+#bildene kopien faktisk peker på, både fra aktive og arkiverte poller
+def referenced_media(db_paths: List[str]) -> List[str]:
+    paths = set()
+    for db_path in db_paths:
+        with sqlite3.connect(db_path) as conn:
+            rows = conn.execute("SELECT DISTINCT image_path FROM polls WHERE image_path IS NOT NULL")
+            paths.update(row[0] for row in rows)
+        conn.close()
+    return sorted(paths)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that collects what tarfile writes so it can be yielded in chunks."""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> Iterator[bytes]:
+        chunks, self.chunks = self.chunks, []
+        yield from chunks
+
+
+def _add_file(tar: tarfile.TarFile, path: Path, name: str) -> None:
+    info = tar.gettarinfo(str(path), arcname=name)
+    with path.open("rb") as handle:
+        tar.addfile(info, handle)
+
+
+def stream_backup(base_dir: Path, include_media: bool = True, pages: int = BACKUP_PAGES,
+                  pause: float = BACKUP_PAUSE) -> Iterator[bytes]:
+    """Yield a tar archive with consistent copies of the databases and the media they reference."""
+    with tempfile.TemporaryDirectory(prefix="polls-backup-") as workdir:
+        snapshots = []
+        for source_path in (polls_db.DB_PATH, polls_db.ARCHIVE_PATH):
+            if not os.path.exists(source_path):
+                continue
+            snapshot = os.path.join(workdir, os.path.basename(source_path))
+            backup_database(source_path, snapshot, pages=pages, pause=pause)
+            snapshots.append(snapshot)
+
+        sink = _ChunkSink()
+        with tarfile.open(fileobj=sink, mode="w|", bufsize=TAR_CHUNK_SIZE) as tar:
+            for snapshot in snapshots:
+                _add_file(tar, Path(snapshot), os.path.basename(snapshot))
+                yield from sink.drain()
+            if include_media:
+                for relative_path in referenced_media(snapshots):
+                    absolute = (base_dir / relative_path).resolve()
+                    if not absolute.is_file() or not absolute.is_relative_to(base_dir):
+                        continue
+                    _add_file(tar, absolute, relative_path)
+                    yield from sink.drain()
+        yield from sink.drain()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Ta sikkerhetskopi av pollene mens kiosken kjører.")
+    parser.add_argument("--out", default="polls-backup.tar",
+                        help="tar-fil med databasene og bildene, eller en .db-fil for bare databasen")
+    parser.add_argument("--no-media", action="store_true", help="ikke ta med bildene")
+    parser.add_argument("--pages", type=int, default=BACKUP_PAGES, help="sider som kopieres per steg")
+    parser.add_argument("--pause", type=float, default=BACKUP_PAUSE, help="sekunder pause mellom stegene")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.out.endswith(".db"):
+        backup_database(polls_db.DB_PATH, args.out, pages=args.pages, pause=args.pause)
+    else:
+        base_dir = Path(polls_db.DB_PATH).resolve().parent
+        with open(args.out, "wb") as out_file:
+            for chunk in stream_backup(base_dir, not args.no_media, args.pages, args.pause):
+                out_file.write(chunk)
+    size = os.path.getsize(args.out)
+    print(f"Skrev {args.out} ({size / 1024:.0f} KiB) på {time.perf_counter() - started:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
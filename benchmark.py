@@ -0,0 +1,734 @@
+# enkle målinger mot en kiosk som kjører. kjøres fra en annen maskin (eller på pien selv):
+#
+#   python benchmark.py http --url http://<pi-ip>:8000/get_scores/ --seconds 10 --concurrency 8
+#
+# skriver ut requests per sekund og latens, så vi kan sammenligne før og etter endringer.
+#
+#   python benchmark.py backup-db --polls 200000 --seconds 5
+#   python benchmark.py render --frames 600
+#   python benchmark.py state --voters 8 --seconds 5
+#   python benchmark.py mirror --viewers 20 --seconds 5
+#   python benchmark.py stream --url http://<pi-ip>:8000 --viewers 20 --seconds 10
+#   python benchmark.py profiles --profiles standard fast lean --seconds 10 --concurrency 32
+#   python benchmark.py placement --seconds 20 --concurrency 32
+#   python benchmark.py vote-storm --url http://<pi-ip>:8000 --seconds 10 --concurrency 32
+#   python benchmark.py backup --url http://<pi-ip>:8000/get_scores/ --backup-url http://<pi-ip>:8000/admin/backup
+#
+# backup-målingene kjører først uten og så med en sikkerhetskopi gående, og skriver ut latensen for begge.
+#
+# kiosken begrenser hver klient-ip (rate_limit.py), så målinger mot et endpoint får mange 429 i status-tellingen.
+# for å måle rå kapasitet startes kiosken med RATE_LIMIT_EXEMPT=<ip til maskinen som måler> eller DISABLE_RATE_LIMIT=1.
+
+import argparse
+import http.client
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Tuple, Union
+from urllib.parse import urlsplit
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+#hver tråd holder én keep-alive forbindelse og spør så fort den kan til tiden er ute
+#body kan være en funksjon, da lages en ny body for hver request
+def hammer(url: str, seconds: float, concurrency: int, method: str = "GET",
+           body: Union[bytes, Callable[[], bytes]] = b"", headers: Dict[str, str] = None) -> Dict[str, float]:
+    parts = urlsplit(url)
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker():
+        conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=10)
+        local_lat = []
+        local_status: Dict[int, int] = {}
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                payload = body() if callable(body) else body
+                conn.request(method, path, body=payload or None, headers=headers or {})
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=10)
+                status = 0
+            local_lat.append(time.perf_counter() - start)
+            local_status[status] = local_status.get(status, 0) + 1
+        conn.close()
+        with lock:
+            latencies.extend(local_lat)
+            for status, count in local_status.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_ms": (statistics.fmean(latencies) * 1000) if latencies else 0.0,
+        "statuses": statuses,
+    }
+
+
+def print_result(title: str, result: Dict[str, float]) -> None:
+    print(
+        f"{title}: {result['requests']} requests, {result['rps']:.0f} req/s, "
+        f"p50 {result['p50_ms']:.2f} ms, p99 {result['p99_ms']:.2f} ms, status {result['statuses']}"
+    )
+
+
+def cmd_http(args) -> None:
+    result = hammer(args.url, args.seconds, args.concurrency)
+    print_result(args.url, result)
+
+
+def latency_summary(latencies: List[float]) -> Dict[str, float]:
+    return {
+        "count": len(latencies),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies, default=0.0) * 1000,
+    }
+
+
+#kjører `action` i en løkke i en egen tråd til stop settes. returnerer tiden hver runde tok
+def run_in_background(action: Callable[[], None], stop: threading.Event) -> Tuple[threading.Thread, List[float]]:
+    durations: List[float] = []
+
+    def loop():
+        while not stop.is_set():
+            start = time.perf_counter()
+            action()
+            durations.append(time.perf_counter() - start)
+
+    thread = threading.Thread(target=loop, daemon=True)
+    thread.start()
+    return thread, durations
+
+
+#stemmer lagres og leses mot en midlertidig database, først alene og så mens backup går i bakgrunnen
+def cmd_backup_db(args) -> None:
+    import backup
+    import polls_db
+    from poll_record import Poll
+
+    workdir = tempfile.mkdtemp(prefix="backup-bench-")
+    polls_db.DB_PATH = os.path.join(workdir, "polls.db")
+    polls_db.ARCHIVE_PATH = os.path.join(workdir, "polls_archive.db")
+    polls_db.init_db()
+    polls_db.import_poll_records(
+        {"id": f"p{i}", "caption": f"Poll nummer {i}", "score_a": i % 7} for i in range(args.polls)
+    )
+    size = os.path.getsize(polls_db.DB_PATH)
+    print(f"Testdatabase: {args.polls} poller, {size / 1024 / 1024:.1f} MiB")
+    polls = [Poll(f"p{i}", f"Poll nummer {i}") for i in range(min(args.polls, 64))]
+
+    def measure_votes(seconds: float) -> Dict[str, Dict[str, float]]:
+        writes: List[float] = []
+        reads: List[float] = []
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            poll = random.choice(polls)
+            poll.add_vote("yes")
+            start = time.perf_counter()
+            polls_db.save_poll_records([poll])
+            writes.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            polls_db.fetch_poll(poll.id)
+            reads.append(time.perf_counter() - start)
+            time.sleep(args.interval)
+        return {"skriving": latency_summary(writes), "lesing": latency_summary(reads)}
+
+    def print_phase(title: str, result: Dict[str, Dict[str, float]]) -> None:
+        for kind, summary in result.items():
+            print(
+                f"{title} {kind}: {summary['count']} stk, p50 {summary['p50_ms']:.2f} ms, "
+                f"p99 {summary['p99_ms']:.2f} ms, maks {summary['max_ms']:.2f} ms"
+            )
+
+    print_phase("Uten backup", measure_votes(args.seconds))
+
+    target = os.path.join(workdir, "copy.db")
+
+    def one_backup():
+        if os.path.exists(target):
+            os.remove(target)
+        backup.backup_database(polls_db.DB_PATH, target, pages=args.pages, pause=args.pause)
+
+    stop = threading.Event()
+    thread, durations = run_in_background(one_backup, stop)
+    print_phase("Med backup", measure_votes(args.seconds))
+    stop.set()
+    thread.join()
+    if durations:
+        print(f"Backup: {len(durations)} fullførte, {statistics.fmean(durations):.2f} s i snitt")
+
+
+#samme sammenligning mot en kiosk som kjører: ett endpoint hamres mens /admin/backup lastes ned om og om igjen
+def cmd_backup(args) -> None:
+    print_result("Uten backup", hammer(args.url, args.seconds, args.concurrency))
+
+    parts = urlsplit(args.backup_url)
+
+    def download():
+        conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=120)
+        conn.request("GET", parts.path + ("?" + parts.query if parts.query else ""))
+        response = conn.getresponse()
+        while response.read(64 * 1024):
+            pass
+        conn.close()
+
+    stop = threading.Event()
+    thread, durations = run_in_background(download, stop)
+    print_result("Med backup", hammer(args.url, args.seconds, args.concurrency))
+    stop.set()
+    thread.join()
+    if durations:
+        print(f"Backup: {len(durations)} nedlastinger, {statistics.fmean(durations):.2f} s i snitt")
+
+
+#resultatvisningen tegnet på den gamle måten (alt fra bunnen hver frame) mot ferdigtegnet lag + søyler.
+#bruker sdl sin dummy-driver, så den kan kjøres uten skjerm (men bør kjøres på pien for riktige tall)
+def cmd_render(args) -> None:
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+    from display_layers import LayerCompositor
+
+    pygame.init()
+    width, height = args.width, args.height
+    screen = pygame.display.set_mode((width, height))
+    bg, grid, text = (15, 18, 30), (60, 65, 80), (255, 255, 255)
+    colors = [(47, 204, 113), (240, 200, 0), (255, 80, 60)]
+    font_large = pygame.font.Font(None, int(height * 0.1))
+    font_small = pygame.font.Font(None, int(height * 0.05))
+    font_hint = pygame.font.Font(None, int(height * 0.035))
+    margin_x, bottom = width * 0.1, height * 0.2
+    spacing = (width - 2 * margin_x) / 3
+
+    def paint_static(surface):
+        surface.fill(bg)
+        for i in range(6):
+            y = height - bottom - (i * (height * 0.6 / 5))
+            pygame.draw.line(surface, grid, (margin_x * 0.8, y), (width - margin_x * 0.8, y), 1)
+        for i, label in enumerate(("YES", "MEH", "NO")):
+            txt = font_small.render(label, True, text)
+            surface.blit(txt, (margin_x + i * spacing + spacing / 2 - txt.get_width() / 2, height - bottom + 20))
+        hint = font_hint.render("Trykk alle knappene samtidig for å bytte bilde!", True, text)
+        surface.blit(hint, (margin_x * 0.1, 20))
+
+    def paint_dynamic(frame):
+        for i, color in enumerate(colors):
+            value = (frame * (i + 1)) % 500
+            bar = pygame.Rect(0, 0, spacing * 0.4, value)
+            bar.centerx = margin_x + i * spacing + spacing / 2
+            bar.bottom = height - bottom
+            pygame.draw.rect(screen, color, bar, border_radius=20)
+            txt = font_large.render(str(value), True, text)
+            screen.blit(txt, (bar.centerx - txt.get_width() / 2, bar.top - txt.get_height() - 10))
+        caption = font_small.render("Live Duel", True, text)
+        screen.blit(caption, (width / 2 - caption.get_width() / 2, height - caption.get_height() - 10))
+
+    layers = LayerCompositor()
+    layers.register("results", paint_static)
+
+    def scratch(frame):
+        paint_static(screen)
+        paint_dynamic(frame)
+
+    def layered(frame):
+        layers.blit(screen, "results", ())
+        paint_dynamic(frame)
+
+    for title, draw in (("Tegnet fra bunnen", scratch), ("Ferdigtegnet lag", layered)):
+        times = []
+        for frame in range(args.frames):
+            start = time.perf_counter()
+            draw(frame)
+            times.append(time.perf_counter() - start)
+        summary = latency_summary(times)
+        print(f"{title}: p50 {summary['p50_ms']:.3f} ms, p99 {summary['p99_ms']:.3f} ms per frame")
+    pygame.quit()
+
+
+def fetch_json(url: str) -> Dict:
+    parts = urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=10)
+    try:
+        conn.request("GET", parts.path + ("?" + parts.query if parts.query else ""))
+        return json.loads(conn.getresponse().read())
+    finally:
+        conn.close()
+
+
+#mange mobiler som stemmer samtidig. fps-en til skjermløkka leses underveis fra /display/frame_stats
+def cmd_vote_storm(args) -> None:
+    base = args.url.rstrip("/")
+    devices = [uuid.uuid4().hex for _ in range(args.devices)] if args.devices else None
+    choices = ("yes", "no", "meh")
+
+    def body() -> bytes:
+        device = random.choice(devices) if devices else uuid.uuid4().hex
+        return json.dumps({"choice": random.choice(choices), "device_id": device}).encode()
+
+    fps_samples: List[float] = []
+
+    def sample_fps():
+        stats = fetch_json(base + "/display/frame_stats")
+        if stats.get("running"):
+            fps_samples.append(stats["measured_fps"])
+        time.sleep(0.5)
+
+    before = fetch_json(base + "/display/frame_stats")
+    stop = threading.Event()
+    thread, _ = run_in_background(sample_fps, stop)
+    result = hammer(base + "/vote", args.seconds, args.concurrency, method="POST", body=body,
+                    headers={"Content-Type": "application/json"})
+    stop.set()
+    thread.join()
+
+    print_result("Stemmer", result)
+    print("Mottak:", fetch_json(base + "/vote/stats"))
+    if before.get("running"):
+        print(f"Skjermløkka før: {before['measured_fps']} fps")
+    if fps_samples:
+        print(
+            f"Skjermløkka under stormen: min {min(fps_samples):.1f} fps, "
+            f"median {statistics.median(fps_samples):.1f} fps ({len(fps_samples)} målinger)"
+        )
+
+
+#skjermspeilingen lokalt: samme animasjon tegnes først uten seere og så med mange (pluss én treg),
+#og vi ser om skjermløkka rekker like mange frames og hvor mye speilingen koster den per frame
+def cmd_mirror(args) -> None:
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+    from display_mirror import DisplayMirror
+
+    pygame.init()
+    width, height = args.width, args.height
+    screen = pygame.display.set_mode((width, height))
+    colors = [(47, 204, 113), (240, 200, 0), (255, 80, 60)]
+
+    def draw(frame):
+        screen.fill((15, 18, 30))
+        for i, color in enumerate(colors):
+            value = (frame * (i + 1) * 3) % int(height * 0.6)
+            bar = pygame.Rect(0, 0, width // 8, value)
+            bar.midbottom = (width * (i + 1) // 4, height - height // 5)
+            pygame.draw.rect(screen, color, bar, border_radius=20)
+
+    for viewers in (0, args.viewers):
+        mirror = DisplayMirror(max_fps=args.stream_fps, max_width=args.stream_width)
+        mirror.start()
+        received = [0] * (viewers + 1 if viewers else 0)
+
+        def viewer(index: int, pause: float = 0.0):
+            for _ in mirror.frames(timeout=0.5):
+                received[index] += 1
+                if pause:
+                    time.sleep(pause)
+                if stop.is_set():
+                    break
+
+        stop = threading.Event()
+        threads = [threading.Thread(target=viewer, args=(i,), daemon=True) for i in range(viewers)]
+        if viewers:
+            # én seer som bruker et halvt sekund på hvert bilde skal ikke holde igjen de andre
+            threads.append(threading.Thread(target=viewer, args=(viewers, 0.5), daemon=True))
+        for thread in threads:
+            thread.start()
+
+        clock = pygame.time.Clock()
+        work: List[float] = []
+        frames = 0
+        started = time.perf_counter()
+        while time.perf_counter() - started < args.seconds:
+            start = time.perf_counter()
+            draw(frames)
+            pygame.display.flip()
+            mirror.offer(screen, True)
+            work.append(time.perf_counter() - start)
+            frames += 1
+            clock.tick(args.fps)
+        elapsed = time.perf_counter() - started
+        stop.set()
+        mirror.stop()
+        for thread in threads:
+            thread.join(2)
+
+        summary = latency_summary(work)
+        print(
+            f"{viewers} seere: {frames / elapsed:.1f} fps, arbeid per frame p50 {summary['p50_ms']:.2f} ms, "
+            f"p99 {summary['p99_ms']:.2f} ms"
+        )
+        if viewers:
+            fast = received[:viewers]
+            print(
+                f"  bilder per seer: min {min(fast)}, maks {max(fast)} ({min(fast) / elapsed:.1f}/s), "
+                f"treg seer: {received[viewers]}"
+            )
+            print("  speiling:", mirror.stats())
+    pygame.quit()
+
+
+#mot kiosken: N nettlesere som ser på /display/stream mens skjermløkkas fps måles
+def cmd_stream(args) -> None:
+    base = args.url.rstrip("/")
+    parts = urlsplit(base)
+    received = [0] * args.viewers
+    stop = threading.Event()
+
+    def viewer(index: int):
+        conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=10)
+        conn.request("GET", "/display/stream")
+        response = conn.getresponse()
+        if response.status != 200:
+            print(f"Seer {index}: HTTP {response.status}")
+            return
+        tail = b""
+        while not stop.is_set():
+            chunk = response.read1(65536)
+            if not chunk:
+                break
+            data = tail + chunk
+            received[index] += data.count(b"--frame\r\n")
+            tail = data[-8:]
+        conn.close()
+
+    fps_samples: List[float] = []
+
+    def sample_fps():
+        stats = fetch_json(base + "/display/frame_stats")
+        if stats.get("running"):
+            fps_samples.append(stats["measured_fps"])
+        time.sleep(0.5)
+
+    before = fetch_json(base + "/display/frame_stats")
+    threads = [threading.Thread(target=viewer, args=(i,), daemon=True) for i in range(args.viewers)]
+    for thread in threads:
+        thread.start()
+    sampler, _ = run_in_background(sample_fps, stop)
+    time.sleep(args.seconds)
+    stop.set()
+    sampler.join()
+    after = fetch_json(base + "/display/frame_stats")
+
+    print(f"Bilder per seer: min {min(received)}, maks {max(received)} på {args.seconds:.0f} s")
+    if before.get("running"):
+        print(f"Skjermløkka før: {before['measured_fps']} fps")
+    if fps_samples:
+        print(
+            f"Skjermløkka med {args.viewers} seere: min {min(fps_samples):.1f} fps, "
+            f"median {statistics.median(fps_samples):.1f} fps"
+        )
+    if "mirror" in after:
+        print("Speiling:", after["mirror"])
+
+
+#cpu-tid (bruker + system) for en prosess, fra /proc. bare på linux, men det er det pien kjører
+def process_cpu_seconds(pid: int) -> float:
+    try:
+        with open(f"/proc/{pid}/stat") as fh:
+            fields = fh.read().rsplit(")", 1)[1].split()
+    except OSError:
+        return 0.0
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+#starter app.py med `env` i tillegg til vårt eget miljø, og venter til api-et svarer
+def launch_app(label: str, base: str, env: Dict[str, str]) -> subprocess.Popen:
+    app_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+    server = subprocess.Popen([sys.executable, app_path], env=dict(os.environ, **env), cwd=os.path.dirname(app_path),
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while True:
+        try:
+            fetch_json(base + "/get_scores/")
+            return server
+        except (OSError, http.client.HTTPException, ValueError):
+            if server.poll() is not None or time.monotonic() > deadline:
+                stop_app(server)
+                raise SystemExit(f"{label}: app.py startet ikke (kode {server.returncode})")
+            time.sleep(0.5)
+
+
+def stop_app(server: subprocess.Popen) -> None:
+    server.terminate()
+    try:
+        server.wait(10)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+
+#starter app.py én gang per serverprofil og kjører samme last mot hver. kjøres på pien med kiosken stoppet,
+#så skjermen er med i målingen. ratebegrensningen slås av, ellers måles bare 429-svarene
+def cmd_profiles(args) -> None:
+    base = f"http://127.0.0.1:{args.port}"
+    rows = []
+    for profile in args.profiles:
+        env = dict(SERVER_PROFILE=profile, SERVER_PORT=str(args.port), DISABLE_RATE_LIMIT="1", DISABLE_GPIO="1")
+        if args.no_display:
+            env["DISABLE_DISPLAY"] = "1"
+        server = launch_app(profile, base, env)
+        try:
+            time.sleep(args.warmup)
+
+            fps_samples: List[float] = []
+
+            def sample_fps():
+                stats = fetch_json(base + "/display/frame_stats")
+                if stats.get("running"):
+                    fps_samples.append(stats["measured_fps"])
+                time.sleep(0.5)
+
+            stop = threading.Event()
+            sampler, _ = run_in_background(sample_fps, stop)
+            cpu_before = process_cpu_seconds(server.pid)
+            result = hammer(base + args.path, args.seconds, args.concurrency)
+            cpu = process_cpu_seconds(server.pid) - cpu_before
+            stop.set()
+            sampler.join()
+        finally:
+            stop_app(server)
+        print_result(profile, result)
+        rows.append((profile, result, cpu, fps_samples))
+
+    print()
+    print(f"{'profil':<10} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'cpu s':>7} {'fps min':>8} {'fps med':>8}")
+    for profile, result, cpu, fps in rows:
+        fps_min = f"{min(fps):.1f}" if fps else "-"
+        fps_median = f"{statistics.median(fps):.1f}" if fps else "-"
+        print(
+            f"{profile:<10} {result['rps']:>8.0f} {result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f} "
+            f"{cpu:>7.2f} {fps_min:>8} {fps_median:>8}"
+        )
+
+
+#skjermløkka under last fra api-et, først med trådene flytende og så plassert med cpu_plan. én tråd stemmer
+#hele tiden så skjermen går i full fart. jitteren i frametiden kommer fra /display/frame_stats, og for
+#knapp-til-skjerm-tiden må noen trykke på knappene underveis
+def cmd_placement(args) -> None:
+    base = f"http://127.0.0.1:{args.port}"
+    rows = []
+
+    def vote_body() -> bytes:
+        return json.dumps({"choice": random.choice(("yes", "no", "meh")), "device_id": uuid.uuid4().hex}).encode()
+
+    for label, pinning in (("flytende", "0"), ("plassert", "1")):
+        env = dict(CPU_PINNING=pinning, SERVER_PORT=str(args.port), DISABLE_RATE_LIMIT="1")
+        if args.no_gpio:
+            env["DISABLE_GPIO"] = "1"
+        server = launch_app(label, base, env)
+        try:
+            time.sleep(args.warmup)
+            voter = threading.Thread(
+                target=hammer, args=(base + "/vote", args.seconds, 1),
+                kwargs={"method": "POST", "body": vote_body, "headers": {"Content-Type": "application/json"}},
+                daemon=True,
+            )
+            voter.start()
+            result = hammer(base + args.path, args.seconds, args.concurrency)
+            voter.join()
+            stats = fetch_json(base + "/display/frame_stats")
+            threads = fetch_json(base + "/admin/threads")
+        finally:
+            stop_app(server)
+        if not stats.get("running"):
+            raise SystemExit("Skjermløkka kjører ikke. Start uten DISABLE_DISPLAY (SDL_VIDEODRIVER=dummy går fint).")
+        print_result(label, result)
+        for warning in threads.get("warnings", []):
+            print(f"  {warning}")
+        rows.append((label, result, stats["frame_jitter"], stats["input_latency"]))
+
+    print()
+    print(f"{'':<10} {'req p99':>8} {'frame p50':>10} {'frame p99':>10} {'jitter p99':>11} {'knapp p50':>10} {'knapp p99':>10}")
+    for label, result, jitter, latency in rows:
+        if not jitter.get("samples"):
+            print(f"{label:<10} {result['p99_ms']:>8.2f}  skjermløkka gikk aldri i full fart")
+            continue
+        buttons = (f"{latency['ms_p50']:>10.2f} {latency['ms_p99']:>10.2f}" if latency["samples"]
+                   else f"{'-':>10} {'-':>10}")
+        print(
+            f"{label:<10} {result['p99_ms']:>8.2f} {jitter['interval_ms_p50']:>10.2f} {jitter['interval_ms_p99']:>10.2f} "
+            f"{jitter['jitter_ms_p99']:>11.2f} {buttons}"
+        )
+
+
+#poll_state alene: knappetråder som stemmer så fort de kan, mens api-tråder venter på kommandoer og
+#en leser henter øyeblikksbildet. viser ventetiden i køen og at ingen stemmer forsvinner
+def cmd_state(args) -> None:
+    from poll_record import Poll
+    from poll_state import PollState
+
+    saves: List[int] = []
+    state = PollState(Poll("bench", "Benchmark"), persist=lambda poll: saves.append(poll.score_a))
+    state.start()
+    stop = threading.Event()
+    sent = [0] * args.voters
+
+    def voter(index: int):
+        while not stop.is_set():
+            state.vote("yes")
+            sent[index] += 1
+            if args.vote_pause:
+                time.sleep(args.vote_pause)
+
+    def rename(state_, text):
+        state_.poll.update(caption=text)
+        return state_.poll.caption
+
+    call_latencies: List[float] = []
+
+    def api_caller():
+        while not stop.is_set():
+            start = time.perf_counter()
+            state.call(rename, f"tekst {start}")
+            call_latencies.append(time.perf_counter() - start)
+            time.sleep(0.01)
+
+    torn = 0
+    reads = 0
+
+    def reader():
+        nonlocal torn, reads
+        last_generation = -1
+        while not stop.is_set():
+            snap = state.snapshot
+            reads += 1
+            if snap.generation < last_generation:
+                torn += 1
+            last_generation = snap.generation
+
+    threads = [threading.Thread(target=voter, args=(i,), daemon=True) for i in range(args.voters)]
+    threads += [threading.Thread(target=api_caller, daemon=True), threading.Thread(target=reader, daemon=True)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    state.stop()
+
+    total = sum(sent)
+    print(f"Stemmer sendt: {total} ({total / args.seconds:.0f}/s), talt: {state.snapshot.score_a}")
+    print(f"Lagringer: {len(saves)}, lesinger av øyeblikksbildet: {reads}, baklengs: {torn}")
+    summary = latency_summary(call_latencies)
+    print(f"Api-kommandoer: {summary['count']} stk, p50 {summary['p50_ms']:.2f} ms, p99 {summary['p99_ms']:.2f} ms")
+    print("Køen:", state.stats())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Målinger mot kiosken")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    http_parser = sub.add_parser("http", help="requests per sekund mot ett endpoint")
+    http_parser.add_argument("--url", default="http://127.0.0.1:8000/get_scores/")
+    http_parser.add_argument("--seconds", type=float, default=10.0)
+    http_parser.add_argument("--concurrency", type=int, default=8)
+    http_parser.set_defaults(func=cmd_http)
+
+    backup_db_parser = sub.add_parser("backup-db", help="latens for stemmer mens databasen sikkerhetskopieres")
+    backup_db_parser.add_argument("--polls", type=int, default=200000)
+    backup_db_parser.add_argument("--seconds", type=float, default=5.0)
+    backup_db_parser.add_argument("--interval", type=float, default=0.002, help="pause mellom stemmene")
+    backup_db_parser.add_argument("--pages", type=int, default=64)
+    backup_db_parser.add_argument("--pause", type=float, default=0.005)
+    backup_db_parser.set_defaults(func=cmd_backup_db)
+
+    render_parser = sub.add_parser("render", help="tegnetid for resultatvisningen med og uten ferdigtegnet lag")
+    render_parser.add_argument("--frames", type=int, default=600)
+    render_parser.add_argument("--width", type=int, default=1920)
+    render_parser.add_argument("--height", type=int, default=1080)
+    render_parser.set_defaults(func=cmd_render)
+
+    state_parser = sub.add_parser("state", help="kø-ventetid og samtidighet i poll_state")
+    state_parser.add_argument("--voters", type=int, default=8)
+    state_parser.add_argument("--seconds", type=float, default=5.0)
+    state_parser.add_argument("--vote-pause", type=float, default=0.0, help="pause mellom stemmene per tråd")
+    state_parser.set_defaults(func=cmd_state)
+
+    mirror_parser = sub.add_parser("mirror", help="skjermløkkas fps med og uten seere på speilingen (lokalt)")
+    mirror_parser.add_argument("--viewers", type=int, default=20)
+    mirror_parser.add_argument("--seconds", type=float, default=5.0)
+    mirror_parser.add_argument("--fps", type=int, default=60)
+    mirror_parser.add_argument("--width", type=int, default=1920)
+    mirror_parser.add_argument("--height", type=int, default=1080)
+    mirror_parser.add_argument("--stream-fps", type=float, default=10.0)
+    mirror_parser.add_argument("--stream-width", type=int, default=960)
+    mirror_parser.set_defaults(func=cmd_mirror)
+
+    stream_parser = sub.add_parser("stream", help="seere på /display/stream mens skjermens fps måles")
+    stream_parser.add_argument("--url", required=True, help="f.eks. http://<pi-ip>:8000")
+    stream_parser.add_argument("--viewers", type=int, default=20)
+    stream_parser.add_argument("--seconds", type=float, default=10.0)
+    stream_parser.set_defaults(func=cmd_stream)
+
+    profiles_parser = sub.add_parser("profiles", help="sammenlign serverprofilene (start app.py på nytt for hver)")
+    profiles_parser.add_argument("--profiles", nargs="+", default=["standard", "fast", "lean"])
+    profiles_parser.add_argument("--port", type=int, default=8010)
+    profiles_parser.add_argument("--path", default="/get_scores/")
+    profiles_parser.add_argument("--seconds", type=float, default=10.0)
+    profiles_parser.add_argument("--concurrency", type=int, default=32)
+    profiles_parser.add_argument("--warmup", type=float, default=2.0)
+    profiles_parser.add_argument("--no-display", action="store_true", help="start app.py uten skjerm")
+    profiles_parser.set_defaults(func=cmd_profiles)
+
+    placement_parser = sub.add_parser("placement", help="frame-jitter under last, med og uten cpu_plan")
+    placement_parser.add_argument("--port", type=int, default=8010)
+    placement_parser.add_argument("--path", default="/get_old_polls")
+    placement_parser.add_argument("--seconds", type=float, default=20.0)
+    placement_parser.add_argument("--concurrency", type=int, default=32)
+    placement_parser.add_argument("--warmup", type=float, default=2.0)
+    placement_parser.add_argument("--no-gpio", action="store_true", help="start app.py uten knappene")
+    placement_parser.set_defaults(func=cmd_placement)
+
+    storm_parser = sub.add_parser("vote-storm", help="mange mobilstemmer samtidig mens skjermens fps måles")
+    storm_parser.add_argument("--url", default="http://127.0.0.1:8000")
+    storm_parser.add_argument("--seconds", type=float, default=10.0)
+    storm_parser.add_argument("--concurrency", type=int, default=32)
+    storm_parser.add_argument("--devices", type=int, default=0,
+                              help="antall enheter å velge blant (0 = ny enhet for hver stemme)")
+    storm_parser.set_defaults(func=cmd_vote_storm)
+
+    backup_parser = sub.add_parser("backup", help="latens mot kiosken mens /admin/backup lastes ned")
+    backup_parser.add_argument("--url", default="http://127.0.0.1:8000/get_scores/")
+    backup_parser.add_argument("--backup-url", default="http://127.0.0.1:8000/admin/backup")
+    backup_parser.add_argument("--seconds", type=float, default=10.0)
+    backup_parser.add_argument("--concurrency", type=int, default=8)
+    backup_parser.set_defaults(func=cmd_backup)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+# plassering av trådene på kjernene. pi 5 har fire kjerner, og før fløt skjermløkka, gpio-trådene, api-et og
+# bakgrunnsarbeidet fritt mellom dem. da kunne bildeskalering, jpeg-koding eller en sikkerhetskopi havne på
+# samme kjerne som skjermløkka akkurat når den skulle tegne. nå får hver tråd en rolle:
+#
+#   render      skjermløkka (hovedtråden) og trådene pygame lager
+#   input       poll_state, som teller stemmene, og gpio-trådene som kaller knappefunksjonene
+#   api         uvicorn og trådene fastapi kjører endpoints i (også eksport og sikkerhetskopi)
+#   background  spillelista (bildeskalering), skjermspeilingen, arkivering, media-opprydding, sesjonslagring
+#
+# med fire kjerner får render og input én kjerne hver, og api og background deler resten. render og input
+# får høyere prioritet (lavere nice), background lavere. python-trådene deler fortsatt gil-en, så dette
+# fjerner ikke ventetiden på den. men når skjermløkka får gil-en står ikke kjernen opptatt med noe annet,
+# og sqlite, sha256, bildedekoding og jpeg-koding slipper gil-en mens de jobber på de andre kjernene.
+#
+# CPU_PINNING=0 slår alt av. CPU_PLAN="render=3;input=2;api=0-1;background=0-1" og
+# CPU_NICE="render=-5;input=-5;api=0;background=10" overstyrer enkeltroller. negativ nice krever root eller
+# CAP_SYS_NICE. uten det beholder render og input vanlig prioritet, og bare background senkes.
+
+import os
+import threading
+from typing import Callable, Dict, FrozenSet, List, Mapping, TypeVar
+
+ROLES = ("render", "input", "api", "background")
+
+# trådnavn -> rolle. tråder som ikke står her (gpio, anyio, SDL) arver plasseringen til tråden som startet dem
+THREAD_ROLES = {
+    "MainThread": "render",
+    "poll-state": "input",
+    "api": "api",
+    "playlist": "background",
+    "display-mirror": "background",
+    "poll-archiver": "background",
+    "media-gc": "background",
+    "session-flusher": "background",
+}
+
+DEFAULT_NICE = {"render": -5, "input": -5, "api": 0, "background": 10}
+
+T = TypeVar("T")
+
+
+def parse_cpus(text: str) -> FrozenSet[int]:
+    """Parse a CPU list like ``"0-1,3"``."""
+    cpus = set()
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        cpus.update(range(int(first), int(last or first) + 1))
+    return frozenset(cpus)
+
+
+def _parse_roles(text: str, convert: Callable[[str], T]) -> Dict[str, T]:
+    result = {}
+    for item in text.split(";"):
+        if not item.strip():
+            continue
+        role, _, value = item.partition("=")
+        role = role.strip()
+        if role not in ROLES:
+            raise ValueError(f"Ukjent rolle '{role}' i CPU-planen. Velg en av: {', '.join(ROLES)}")
+        result[role] = convert(value.strip())
+    return result
+
+
+def default_layout(available: FrozenSet[int]) -> Dict[str, FrozenSet[int]]:
+    """Render and input on the highest-numbered CPUs, API and background on the rest."""
+    ordered = sorted(available)
+    if len(ordered) < 2:
+        return {}
+    if len(ordered) >= 4:
+        render, input_, rest = ordered[-1:], ordered[-2:-1], ordered[:-2]
+    else:
+        # for få kjerner til at input får sin egen. da deler den med skjermløkka
+        render = input_ = ordered[-1:]
+        rest = ordered[:-1]
+    return {
+        "render": frozenset(render),
+        "input": frozenset(input_),
+        "api": frozenset(rest),
+        "background": frozenset(rest),
+    }
+
+
+class CpuPlan:
+    """CPU set and nice value per thread role, applied to threads by name."""
+
+    def __init__(self, cpus: Mapping[str, FrozenSet[int]], nice: Mapping[str, int]):
+        self.cpus = dict(cpus)
+        self.nice = dict(nice)
+        self.placed: Dict[str, str] = {}
+        self.warnings: List[str] = []
+
+    @classmethod
+    def from_env(cls, env: Mapping[str, str] = os.environ) -> "CpuPlan":
+        if env.get("CPU_PINNING") == "0" or not hasattr(os, "sched_setaffinity"):
+            return cls({}, {})
+        available = frozenset(os.sched_getaffinity(0))
+        cpus = default_layout(available)
+        cpus.update(_parse_roles(env.get("CPU_PLAN", ""), parse_cpus))
+        for role, wanted in cpus.items():
+            if not wanted or not wanted <= available:
+                raise ValueError(
+                    f"CPU-planen gir {role} kjernene {sorted(wanted)}, men bare {sorted(available)} er tilgjengelige."
+                )
+        nice = dict(DEFAULT_NICE)
+        nice.update(_parse_roles(env.get("CPU_NICE", ""), int))
+        return cls(cpus, nice)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.cpus or self.nice)
+
+    def apply(self, native_id: int, role: str) -> None:
+        cpus = self.cpus.get(role)
+        if cpus:
+            os.sched_setaffinity(native_id, cpus)
+        nice = self.nice.get(role)
+        if nice is None:
+            return
+        try:
+            os.setpriority(os.PRIO_PROCESS, native_id, nice)
+        except PermissionError:
+            # uten rettigheter kan prioriteten bare senkes. si fra én gang per rolle
+            warning = f"nice {nice} for {role} krever CAP_SYS_NICE, beholder vanlig prioritet"
+            if warning not in self.warnings:
+                self.warnings.append(warning)
+                print(f"CPU-plan: {warning}")
+
+    def pin_current(self, role: str) -> None:
+        """Apply ``role`` to the calling thread. Threads it starts afterwards inherit it."""
+        if self.enabled:
+            self.apply(threading.get_native_id(), role)
+
+    def place_threads(self) -> Dict[str, str]:
+        """Apply the plan to every running thread named in THREAD_ROLES. Returns thread name -> role."""
+        if not self.enabled:
+            return {}
+        for thread in threading.enumerate():
+            role = THREAD_ROLES.get(thread.name)
+            if role and thread.native_id is not None:
+                try:
+                    self.apply(thread.native_id, role)
+                except ProcessLookupError:
+                    # tråden avsluttet mens vi gikk gjennom lista
+                    continue
+                self.placed[thread.name] = role
+        return dict(self.placed)
+
+    def describe(self) -> str:
+        if not self.enabled:
+            return "av"
+        parts = []
+        for role in ROLES:
+            cpus = ",".join(str(cpu) for cpu in sorted(self.cpus.get(role, ()))) or "alle"
+            parts.append(f"{role}={cpus} (nice {self.nice.get(role, 0)})")
+        return ", ".join(parts)
+
+    def stats(self) -> Dict:
+        threads = []
+        for thread in threading.enumerate():
+            if thread.native_id is None:
+                continue
+            try:
+                cpus = sorted(os.sched_getaffinity(thread.native_id)) if hasattr(os, "sched_getaffinity") else None
+                nice = os.getpriority(os.PRIO_PROCESS, thread.native_id) if hasattr(os, "getpriority") else None
+            except ProcessLookupError:
+                continue
+            threads.append({
+                "name": thread.name,
+                "role": THREAD_ROLES.get(thread.name),
+                "native_id": thread.native_id,
+                "cpus": cpus,
+                "nice": nice,
+            })
+        return {
+            "enabled": self.enabled,
+            "plan": {role: sorted(cpus) for role, cpus in self.cpus.items()},
+            "nice": dict(self.nice),
+            "warnings": list(self.warnings),
+            "threads": threads,
+        }
@@ -0,0 +1,77 @@
+# lag for skjermtegningen. det som aldri endrer seg (bakgrunn, rutenett, YES/MEH/NO og hinten øverst)
+# tegnes én gang inn i en flate like stor som skjermen. hver frame kopieres den flata inn med én blit,
+# og bare søylene, tallene og teksten tegnes oppå. flata lages på nytt hvis oppløsningen eller fargene endres.
+
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+import pygame
+
+try:
+    import qrcode  # type: ignore
+except ImportError:  # pragma: no cover - qrcode er valgfritt, uten den vises ingen qr-kode
+    qrcode = None
+
+Painter = Callable[[pygame.Surface], None]
+
+
+class StaticLayer:
+    """A display-sized surface painted once and reused until its size or theme changes."""
+
+    __slots__ = ("painter", "surface", "key")
+
+    def __init__(self, painter: Painter):
+        self.painter = painter
+        self.surface: Optional[pygame.Surface] = None
+        self.key: Optional[Tuple] = None
+
+    def get(self, size: Tuple[int, int], theme: Hashable) -> pygame.Surface:
+        key = (size, theme)
+        if self.surface is None or key != self.key:
+            surface = pygame.Surface(size)
+            # samme pikselformat som skjermen gjør blit til en ren minnekopi
+            if pygame.display.get_surface() is not None:
+                surface = surface.convert()
+            self.painter(surface)
+            self.surface = surface
+            self.key = key
+        return self.surface
+
+
+class LayerCompositor:
+    """Named static layers that are blitted under the dynamic content of each view."""
+
+    def __init__(self):
+        self.layers: Dict[str, StaticLayer] = {}
+
+    def register(self, name: str, painter: Painter) -> None:
+        self.layers[name] = StaticLayer(painter)
+
+    def invalidate(self) -> None:
+        for layer in self.layers.values():
+            layer.surface = None
+
+    #hele skjermen, brukes når alt tegnes på nytt
+    def blit(self, target: pygame.Surface, name: str, theme: Hashable) -> None:
+        target.blit(self.layers[name].get(target.get_size(), theme), (0, 0))
+
+    #bare ett område, brukes for å viske ut en søyle før den tegnes på nytt
+    def restore(self, target: pygame.Surface, name: str, theme: Hashable, area: pygame.Rect) -> None:
+        target.blit(self.layers[name].get(target.get_size(), theme), area, area)
+
+
+#qr-koden til stemmesiden. tegnes inn i det faste laget, så den koster ingenting per frame
+def qr_surface(text: str, module_px: int = 6, fg=(0, 0, 0), bg=(255, 255, 255)) -> Optional[pygame.Surface]:
+    """Render ``text`` as a QR code, or return None if the qrcode package is not installed."""
+    if qrcode is None:
+        return None
+    code = qrcode.QRCode(border=2, error_correction=qrcode.constants.ERROR_CORRECT_M)
+    code.add_data(text)
+    code.make(fit=True)
+    matrix = code.get_matrix()
+    surface = pygame.Surface((len(matrix) * module_px, len(matrix) * module_px))
+    surface.fill(bg)
+    for y, row in enumerate(matrix):
+        for x, dark in enumerate(row):
+            if dark:
+                surface.fill(fg, (x * module_px, y * module_px, module_px, module_px))
+    return surface
@@ -0,0 +1,211 @@
+# speiling av skjermen som mjpeg, så de bak scenen kan se hva kiosken viser.
+# skjermløkka gjør så lite som mulig: bare når noen ser på, når en ny frame faktisk er tegnet, når det
+# har gått lenge nok siden forrige bilde og når koderen er ledig, skaleres skjermen ned (nærmeste piksel,
+# ca. 1 ms for 960x540). resten, jpeg-kodingen, skjer i en egen tråd. alle seerne deler det samme
+# ferdigkodede bildet, så ti seere koster like mye som én. en treg seer hopper bare over bilder.
+
+import asyncio
+import io
+import threading
+import time
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+import pygame
+
+BOUNDARY = "frame"
+
+
+def mjpeg_part(jpeg: bytes) -> bytes:
+    return (
+        f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(jpeg)}\r\n\r\n".encode("ascii")
+        + jpeg
+        + b"\r\n"
+    )
+
+
+class DisplayMirror:
+    """Captures rendered frames at a capped rate and size and JPEG-encodes them once for all viewers."""
+
+    def __init__(self, max_fps: float = 10.0, max_width: int = 960,
+                 on_demand: Optional[Callable[[], None]] = None):
+        self.min_interval = 1.0 / max_fps
+        self.max_width = max_width
+        # kalles når en ny seer kobler til, så løkka våkner og tar et bilde med en gang
+        self.on_demand = on_demand
+        self.viewers = 0
+        self._dirty = True
+        self._last_capture = 0.0
+        self._pending: Optional[pygame.Surface] = None
+        self._seq = 0
+        self._jpeg: Optional[bytes] = None
+        self._cond = threading.Condition()
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+        self.captures = 0
+        self.skipped_busy = 0
+        self.capture_seconds = 0.0
+        self.encode_seconds = 0.0
+
+    # --- skjermløkka ---
+
+    def offer(self, surface: pygame.Surface, changed: bool) -> None:
+        """Called once per loop iteration. ``changed`` says whether a new frame was drawn."""
+        if changed:
+            self._dirty = True
+        if not self.viewers or not self._dirty:
+            return
+        now = time.monotonic()
+        if now - self._last_capture < self.min_interval:
+            return
+        if self._pending is not None:
+            self.skipped_busy += 1
+            return
+        start = time.perf_counter()
+        width, height = surface.get_size()
+        if width > self.max_width:
+            small = pygame.transform.scale(surface, (self.max_width, height * self.max_width // width))
+        else:
+            small = surface.copy()
+        self.capture_seconds += time.perf_counter() - start
+        self.captures += 1
+        self._dirty = False
+        self._last_capture = now
+        with self._cond:
+            self._pending = small
+            self._cond.notify_all()
+
+    # --- kodetråden ---
+
+    def _encode_loop(self) -> None:
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                small = self._pending
+            start = time.perf_counter()
+            buffer = io.BytesIO()
+            try:
+                pygame.image.save(small, buffer, "frame.jpg")
+            except Exception as exc:
+                print(f"Kunne ikke kode skjermbildet: {exc}")
+                with self._cond:
+                    self._pending = None
+                continue
+            self.encode_seconds += time.perf_counter() - start
+            self._publish(buffer.getvalue())
+
+    def _publish(self, jpeg: bytes) -> None:
+        with self._cond:
+            self._seq += 1
+            self._jpeg = jpeg
+            self._pending = None
+            waiters, self._waiters = self._waiters, []
+            frame = (self._seq, jpeg)
+            self._cond.notify_all()
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_resolve, future, frame)
+
+    def start(self) -> None:
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self._encode_loop, name="display-mirror", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        with self._cond:
+            self._closed = True
+            waiters, self._waiters = self._waiters, []
+            self._cond.notify_all()
+        # seerne i /display/stream venter på en future. uten dette henger de, og uvicorn venter på dem ved avslutning
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(future.cancel)
+            except RuntimeError:
+                # loopen er allerede lukket
+                pass
+
+    # --- seerne ---
+
+    def _join(self) -> None:
+        with self._cond:
+            self.viewers += 1
+            self._dirty = True
+        if self.on_demand:
+            self.on_demand()
+
+    def _leave(self) -> None:
+        with self._cond:
+            self.viewers -= 1
+
+    def wait_frame(self, after: int, timeout: Optional[float] = None) -> Optional[Tuple[int, bytes]]:
+        """Block until a frame newer than ``after`` exists and return (seq, jpeg), or None on timeout."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq > after or self._closed, timeout):
+                return None
+            return (self._seq, self._jpeg) if self._seq > after else None
+
+    async def next_frame(self, after: int) -> Optional[Tuple[int, bytes]]:
+        """Wait for a frame newer than ``after``. Returns None once the mirror is stopped."""
+        loop = asyncio.get_running_loop()
+        with self._cond:
+            if self._closed:
+                return None
+            if self._seq > after:
+                return self._seq, self._jpeg
+            future = loop.create_future()
+            self._waiters.append((loop, future))
+        try:
+            return await future
+        except asyncio.CancelledError:
+            # stop() kansellerer futuren. andre kanselleringer skal videre
+            if self._closed:
+                return None
+            raise
+
+    def frames(self, timeout: float = 5.0) -> Iterator[bytes]:
+        """Blocking iterator of JPEG frames, for use outside asyncio (benchmarks)."""
+        self._join()
+        try:
+            seq = self._seq
+            while not self._closed:
+                frame = self.wait_frame(seq, timeout)
+                if frame:
+                    seq, jpeg = frame
+                    yield jpeg
+        finally:
+            self._leave()
+
+    async def stream(self) -> AsyncIterator[bytes]:
+        """multipart/x-mixed-replace body. Starts with the latest frame so the viewer sees something at once."""
+        self._join()
+        try:
+            seq = self._seq - 1 if self._jpeg is not None else self._seq
+            while not self._closed:
+                frame = await self.next_frame(seq)
+                if frame is None:
+                    return
+                seq, jpeg = frame
+                yield mjpeg_part(jpeg)
+        finally:
+            self._leave()
+
+    def stats(self) -> Dict[str, float]:
+        captures = max(self.captures, 1)
+        return {
+            "viewers": self.viewers,
+            "frames": self._seq,
+            "captures": self.captures,
+            "skipped_busy": self.skipped_busy,
+            "capture_ms_mean": round(self.capture_seconds * 1000 / captures, 3),
+            "encode_ms_mean": round(self.encode_seconds * 1000 / max(self._seq, 1), 3),
+            "last_frame_bytes": len(self._jpeg) if self._jpeg else 0,
+        }
+
+
+def _resolve(future: asyncio.Future, frame) -> None:
+    if not future.done():
+        future.set_result(frame)
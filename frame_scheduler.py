@@ -0,0 +1,157 @@
+# styrer hvor ofte pygame-løkka går. før gikk den i 60 fps hele døgnet selv om ingen stemte.
+# nå går den i full fart når noe skjer, og senker farten gradvis når det er stille. med idle_fps=0
+# stopper den helt til neste event. knapper og api vekker løkka med et pygame-event, så det føles like raskt som før.
+
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+import pygame
+
+# eventet som postes fra gpio-tråder og api-tråden for å vekke løkka
+WAKE_EVENT = pygame.USEREVENT + 1
+
+
+class AdaptiveFrameScheduler:
+    """Frame pacing for the kiosk loop: full rate while active, decaying to ``idle_fps`` when idle.
+
+    With ``idle_fps=0`` the loop stops scheduling frames entirely once it has decayed and only
+    runs again when an event arrives.
+    """
+
+    def __init__(self, active_fps: int = 60, idle_fps: int = 0, idle_after: float = 3.0,
+                 decay_step: float = 1.0):
+        self.active_fps = active_fps
+        self.idle_fps = idle_fps
+        self.idle_after = idle_after
+        self.decay_step = decay_step
+        self.clock = pygame.time.Clock()
+        self.last_activity = time.monotonic()
+        self._wake_pending = False
+        self._last_frame = time.perf_counter()
+
+        # målinger til rapporten
+        self.started_wall = time.monotonic()
+        self.started_cpu = time.thread_time()
+        self.frames = 0
+        self.active_frames = 0
+        self.active_cpu = 0.0
+        self._frame_cpu_start = self.started_cpu
+        # tiden mellom frames når løkka går i full fart. avviket fra 1/active_fps er jitteren
+        self.intervals: Deque[float] = deque(maxlen=600)
+        self._paced = False
+
+    #trygg å kalle fra alle tråder. flere vekkinger før løkka rekker å våkne blir til ett event
+    def request_wake(self) -> None:
+        if self._wake_pending or not pygame.display.get_init():
+            return
+        self._wake_pending = True
+        try:
+            pygame.event.post(pygame.event.Event(WAKE_EVENT))
+        except pygame.error:
+            self._wake_pending = False
+
+    #kalles fra hovedløkka når noe faktisk skjedde (tastetrykk, stemme, endring fra api)
+    def mark_active(self) -> None:
+        self._wake_pending = False
+        self.last_activity = time.monotonic()
+
+    def current_fps(self) -> int:
+        idle_for = time.monotonic() - self.last_activity
+        if idle_for < self.idle_after:
+            return self.active_fps
+        # halver farten for hvert decay_step sekund vi har vært stille, ned til idle_fps
+        halvings = int((idle_for - self.idle_after) / self.decay_step) + 1
+        fps = self.active_fps >> halvings
+        if fps < max(self.idle_fps, 1):
+            return self.idle_fps
+        return fps
+
+    def wait(self, animating: bool = False, max_wait: Optional[float] = None) -> List[pygame.event.Event]:
+        """Sleep until the next frame is due and return any event that woke us up early.
+
+        ``animating`` keeps the loop at full rate while something is moving on screen. ``max_wait`` caps
+        the sleep in seconds, also when idle, for things that must be redrawn on a timer.
+        """
+        if animating:
+            self.last_activity = time.monotonic()
+        now_cpu = time.thread_time()
+        frame_cpu = now_cpu - self._frame_cpu_start
+        self.frames += 1
+        fps = self.current_fps()
+        if fps >= self.active_fps:
+            self.active_frames += 1
+            self.active_cpu += frame_cpu
+
+        woken: List[pygame.event.Event] = []
+        if fps >= self.active_fps:
+            self.clock.tick(fps)
+            if self._paced:
+                self.intervals.append(time.perf_counter() - self._last_frame)
+        elif fps == 0:
+            # ingenting å animere og ingen input: vent på neste event uten å planlegge flere frames
+            if max_wait is None:
+                woken.append(pygame.event.wait())
+            else:
+                event = pygame.event.wait(int(max_wait * 1000))
+                if event.type != pygame.NOEVENT:
+                    woken.append(event)
+            self.clock.tick()
+        else:
+            # blokker på eventkøen i stedet for å sove, så et knappetrykk vekker oss med en gang
+            elapsed_ms = (time.perf_counter() - self._last_frame) * 1000
+            timeout_ms = int(1000 / fps - elapsed_ms)
+            if max_wait is not None:
+                timeout_ms = min(timeout_ms, int(max_wait * 1000))
+            if timeout_ms > 0:
+                event = pygame.event.wait(timeout_ms)
+                if event.type != pygame.NOEVENT:
+                    woken.append(event)
+            self.clock.tick()
+
+        # bare to frames etter hverandre i full fart gir et intervall som kan sammenlignes med målet
+        self._paced = fps >= self.active_fps
+        self._last_frame = time.perf_counter()
+        self._frame_cpu_start = time.thread_time()
+        return woken
+
+    def jitter(self) -> Dict[str, float]:
+        """Frame interval and its deviation from the target, over the last full-rate frames."""
+        if not self.intervals:
+            return {"samples": 0}
+        target = 1.0 / self.active_fps
+        intervals = sorted(self.intervals)
+        deviations = sorted(abs(interval - target) for interval in self.intervals)
+
+        def pct(values: List[float], p: float) -> float:
+            return round(values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))] * 1000, 3)
+
+        return {
+            "samples": len(intervals),
+            "target_ms": round(target * 1000, 3),
+            "interval_ms_p50": pct(intervals, 50),
+            "interval_ms_p99": pct(intervals, 99),
+            "interval_ms_max": round(intervals[-1] * 1000, 3),
+            "jitter_ms_p50": pct(deviations, 50),
+            "jitter_ms_p99": pct(deviations, 99),
+        }
+
+    def report(self) -> Dict[str, float]:
+        """CPU used by the render thread and an estimate of what a fixed-rate loop would have used."""
+        wall = time.monotonic() - self.started_wall
+        cpu = time.thread_time() - self.started_cpu
+        cpu_per_frame = self.active_cpu / self.active_frames if self.active_frames else 0.0
+        fixed_frames = wall * self.active_fps
+        fixed_cpu = fixed_frames * cpu_per_frame
+        return {
+            "wall_seconds": round(wall, 1),
+            "frames": self.frames,
+            "fixed_rate_frames": int(fixed_frames),
+            "current_fps": self.current_fps(),
+            "measured_fps": round(self.clock.get_fps(), 1),
+            "cpu_seconds": round(cpu, 3),
+            "cpu_per_active_frame_ms": round(cpu_per_frame * 1000, 3),
+            "estimated_fixed_rate_cpu_seconds": round(fixed_cpu, 3),
+            "estimated_cpu_seconds_saved": round(max(0.0, fixed_cpu - cpu), 3),
+            "frame_jitter": self.jitter(),
+        }
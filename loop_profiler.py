@@ -0,0 +1,232 @@
+# måler hvor tiden går i pygame-løkka, så vi kan se hvorfor skjermen hakker.
+# D på tastaturet viser et panel med fps, en graf over frametidene og hvor mye av hver frame som gikk til
+# events, knappekombinasjonen, henting av stillingen, tegning, flip og skjermspeilingen. C starter/stopper cProfile av løkka,
+# og resultatet lagres i profiles/ (åpnes med `python -m pstats` eller snakeviz).
+# når panelet og profileringen er av, er lap() bare en if-test, så løkka merker ingenting til den.
+# InputLatency måler alltid tiden fra et knappetrykk til skjermen viser den nye stillingen.
+
+import cProfile
+import statistics
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import pygame
+
+SECTIONS = ("events", "combo", "state", "draw", "flip", "mirror")
+
+# grensene i histogrammet, i millisekunder. 16.7 ms er én frame i 60 fps
+HISTOGRAM_BOUNDS = (4.0, 8.0, 16.7, 33.3, 50.0)
+
+PANEL_BG = (0, 0, 0)
+PANEL_TEXT = (255, 255, 255)
+PANEL_GRAPH = (80, 200, 255)
+PANEL_BUDGET = (255, 80, 60)
+SECTION_COLORS = {
+    "events": (120, 120, 255),
+    "combo": (200, 120, 255),
+    "state": (255, 160, 60),
+    "draw": (60, 220, 120),
+    "flip": (240, 220, 60),
+    "mirror": (255, 255, 255),
+}
+
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class InputLatency:
+    """Time from a button callback until the first frame drawn from a newer poll snapshot.
+
+    The hardware debounce (bounce_time) happens before the callback and is not included.
+    """
+
+    def __init__(self, history: int = 256, max_age: float = 1.0):
+        self.samples: Deque[float] = deque(maxlen=history)
+        self.max_age = max_age
+        self.expired = 0
+        # (tidspunkt, øyeblikksbildet som gjaldt da knappen ble trykket). knappetrådene legger til,
+        # skjermløkka tar ut, og deque gjør begge deler trygt uten lås
+        self._pending: Deque[Tuple[float, Any]] = deque(maxlen=64)
+
+    def press(self, snapshot: Any) -> None:
+        self._pending.append((time.perf_counter(), snapshot))
+
+    #kalles etter at en frame er vist. alle trykk fra før dette øyeblikksbildet er nå på skjermen
+    def presented(self, snapshot: Any) -> None:
+        now = time.perf_counter()
+        while self._pending and self._pending[0][1] is not snapshot:
+            pressed, _ = self._pending.popleft()
+            if now - pressed > self.max_age:
+                # stemmen ble aldri vist for seg selv (bildemodus e.l.), ikke en ekte måling
+                self.expired += 1
+            else:
+                self.samples.append((now - pressed) * 1000)
+
+    def summary(self) -> Dict:
+        ordered = sorted(self.samples)
+        return {
+            "samples": len(ordered),
+            "expired": self.expired,
+            "ms_p50": round(_percentile(ordered, 50), 2),
+            "ms_p95": round(_percentile(ordered, 95), 2),
+            "ms_p99": round(_percentile(ordered, 99), 2),
+            "ms_max": round(ordered[-1], 2) if ordered else 0.0,
+        }
+
+
+class LoopProfiler:
+    """Per-section timing of the render loop with an optional on-screen overlay and cProfile capture."""
+
+    def __init__(self, history: int = 240, profile_dir: Optional[Path] = None):
+        self.enabled = False
+        self.frame_times: Deque[float] = deque(maxlen=history)
+        self.section_totals: Dict[str, float] = dict.fromkeys(SECTIONS, 0.0)
+        self.histogram: List[int] = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+        self.frames = 0
+        self.profile_dir = profile_dir or Path(__file__).resolve().parent / "profiles"
+        self._profile: Optional[cProfile.Profile] = None
+        self._frame_start = 0.0
+        self._last_lap = 0.0
+        self._frame_starts: Deque[float] = deque(maxlen=60)
+        self._current: Dict[str, float] = dict.fromkeys(SECTIONS, 0.0)
+        self._rect: Optional[pygame.Rect] = None
+
+    @property
+    def active(self) -> bool:
+        return self.enabled or self._profile is not None
+
+    def toggle(self) -> bool:
+        self.enabled = not self.enabled
+        if self.enabled:
+            self.reset()
+        return self.enabled
+
+    def reset(self) -> None:
+        self.frame_times.clear()
+        self._frame_starts.clear()
+        self.section_totals = dict.fromkeys(SECTIONS, 0.0)
+        self.histogram = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+        self.frames = 0
+
+    #starter eller stopper cProfile. returnerer filen profilen ble lagret i når den stoppes
+    def toggle_capture(self) -> Optional[Path]:
+        if self._profile is None:
+            self._profile = cProfile.Profile()
+            return None
+        profile, self._profile = self._profile, None
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        path = self.profile_dir / f"loop-{datetime.now():%Y%m%d-%H%M%S}.prof"
+        profile.dump_stats(str(path))
+        return path
+
+    def begin_frame(self) -> None:
+        if not self.active:
+            return
+        now = time.perf_counter()
+        self._frame_start = self._last_lap = now
+        self._frame_starts.append(now)
+        if self._profile is not None:
+            self._profile.enable()
+
+    def lap(self, section: str) -> None:
+        """Charge the time since the previous lap (or frame start) to ``section``."""
+        if not self.active:
+            return
+        now = time.perf_counter()
+        self._current[section] += now - self._last_lap
+        self._last_lap = now
+
+    #kalles før løkka legger seg til å vente, så ventetiden ikke telles som arbeid
+    def end_frame(self) -> None:
+        if not self.active:
+            return
+        if self._profile is not None:
+            self._profile.disable()
+        frame_ms = (time.perf_counter() - self._frame_start) * 1000
+        self.frame_times.append(frame_ms)
+        self.frames += 1
+        for section, spent in self._current.items():
+            self.section_totals[section] += spent
+            self._current[section] = 0.0
+        bucket = 0
+        while bucket < len(HISTOGRAM_BOUNDS) and frame_ms >= HISTOGRAM_BOUNDS[bucket]:
+            bucket += 1
+        self.histogram[bucket] += 1
+
+    def fps(self) -> float:
+        if len(self._frame_starts) < 2:
+            return 0.0
+        span = self._frame_starts[-1] - self._frame_starts[0]
+        return (len(self._frame_starts) - 1) / span if span > 0 else 0.0
+
+    def summary(self) -> Dict:
+        frames = max(self.frames, 1)
+        labels = [f"<{bound:g}ms" for bound in HISTOGRAM_BOUNDS] + [f">={HISTOGRAM_BOUNDS[-1]:g}ms"]
+        ordered = sorted(self.frame_times)
+        return {
+            "enabled": self.enabled,
+            "capturing": self._profile is not None,
+            "frames": self.frames,
+            "fps": round(self.fps(), 1),
+            "frame_ms_p50": round(_percentile(ordered, 50), 3),
+            "frame_ms_p99": round(_percentile(ordered, 99), 3),
+            "frame_ms_max": round(ordered[-1], 3) if ordered else 0.0,
+            "frame_ms_stdev": round(statistics.pstdev(ordered), 3) if ordered else 0.0,
+            "section_ms_mean": {
+                section: round(total * 1000 / frames, 3) for section, total in self.section_totals.items()
+            },
+            "histogram": dict(zip(labels, self.histogram)),
+        }
+
+    # --- panelet på skjermen ---
+
+    def overlay_rect(self, screen_size: Tuple[int, int]) -> pygame.Rect:
+        width, _ = screen_size
+        return pygame.Rect(width - 430, 10, 420, 275)
+
+    def draw(self, surface: pygame.Surface, font: pygame.font.Font) -> Optional[pygame.Rect]:
+        """Draw the overlay in the top right corner and return the area it covers."""
+        if not self.enabled:
+            return None
+        rect = self.overlay_rect(surface.get_size())
+        surface.fill(PANEL_BG, rect)
+        x, y = rect.x + 10, rect.y + 8
+
+        last = self.frame_times[-1] if self.frame_times else 0.0
+        status = " REC" if self._profile is not None else ""
+        header = font.render(f"{self.fps():5.1f} fps  {last:6.2f} ms{status}", True, PANEL_TEXT)
+        surface.blit(header, (x, y))
+        y += header.get_height() + 6
+
+        # frametid for de siste framene. den røde streken er budsjettet for 60 fps
+        graph = pygame.Rect(x, y, rect.width - 20, 90)
+        pygame.draw.rect(surface, PANEL_TEXT, graph, 1)
+        scale_ms = max(33.3, max(self.frame_times, default=0.0))
+        budget_y = graph.bottom - int(16.7 / scale_ms * graph.height)
+        pygame.draw.line(surface, PANEL_BUDGET, (graph.left, budget_y), (graph.right - 1, budget_y))
+        if len(self.frame_times) >= 2:
+            step = graph.width / (self.frame_times.maxlen - 1)
+            points = [
+                (graph.left + int(i * step), graph.bottom - 1 - int(ms / scale_ms * (graph.height - 2)))
+                for i, ms in enumerate(self.frame_times)
+            ]
+            pygame.draw.lines(surface, PANEL_GRAPH, False, points)
+        y = graph.bottom + 8
+
+        # snittid per del av løkka, som stolper
+        frames = max(self.frames, 1)
+        means = {section: total * 1000 / frames for section, total in self.section_totals.items()}
+        widest = max(max(means.values()), 0.001)
+        for section in SECTIONS:
+            label = font.render(f"{section:<6} {means[section]:6.2f} ms", True, PANEL_TEXT)
+            surface.blit(label, (x, y))
+            bar_width = int((rect.width - 200) * means[section] / widest)
+            pygame.draw.rect(surface, SECTION_COLORS[section], (x + 180, y + 4, bar_width, label.get_height() - 8))
+            y += label.get_height()
+        return rect
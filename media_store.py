@@ -0,0 +1,137 @@
+# bildelagring etter innhold. før ble hver opplasting lagret som en ny uuid-fil, så samme logo lastet opp
+# til ti poller lå ti ganger på sd-kortet. nå får hver fil navn etter sha256 av innholdet, og en fil som
+# allerede finnes skrives ikke på nytt. en bakgrunnstråd sletter filer ingen poll peker på lenger.
+
+import hashlib
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import BinaryIO, List, Tuple
+
+from polls_db import (
+    delete_media,
+    fetch_media_paths,
+    fetch_orphaned_media,
+    find_media,
+    register_media,
+)
+
+CHUNK_SIZE = 1024 * 1024
+HASH_DIR_NAME = "sha256"
+
+# holder opplasting og sletting fra å gå i beina på hverandre for samme fil
+_media_lock = threading.Lock()
+
+
+def hash_stream(fileobj: BinaryIO) -> Tuple[str, int]:
+    """Return (sha256 hex digest, size) of a file object, reading it in chunks."""
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in iter(lambda: fileobj.read(CHUNK_SIZE), b""):
+        digest.update(chunk)
+        size += len(chunk)
+    return digest.hexdigest(), size
+
+
+class MediaStore:
+    """Content-addressed image storage under ``media_dir/sha256/``."""
+
+    def __init__(self, base_dir: Path, media_dir: Path, gc_interval: float = 600.0,
+                 grace_seconds: int = 3600):
+        self.base_dir = base_dir
+        self.media_dir = media_dir
+        self.gc_interval = gc_interval
+        self.grace_seconds = grace_seconds
+        self._stop = threading.Event()
+        self._gc_thread = None
+
+    def relative(self, path: Path) -> str:
+        return str(path.relative_to(self.base_dir))
+
+    #leser opplastingen én gang for å finne hashen. finnes filen fra før returneres den med en gang, uten ny skriving
+    def store(self, fileobj: BinaryIO, suffix: str) -> Tuple[str, bool]:
+        """Store an upload and return (relative path, written). ``written`` is False for duplicates."""
+        fileobj.seek(0)
+        sha256, size = hash_stream(fileobj)
+
+        with _media_lock:
+            existing = find_media(sha256)
+            if existing and (self.base_dir / existing[0]).exists():
+                return existing[0], False
+
+            target = self.media_dir / HASH_DIR_NAME / sha256[:2] / f"{sha256}{suffix}"
+            target.parent.mkdir(parents=True, exist_ok=True)
+            partial = target.with_name(target.name + ".part")
+            fileobj.seek(0)
+            with partial.open("wb") as out_file:
+                shutil.copyfileobj(fileobj, out_file, CHUNK_SIZE)
+            os.replace(partial, target)
+
+            relative_path = self.relative(target)
+            register_media(relative_path, sha256, size)
+        return relative_path, True
+
+    #filer som lå i media/ før denne ordningen kom blir registrert, så de også ryddes når ingen bruker dem
+    def adopt_untracked_files(self) -> int:
+        known = set(fetch_media_paths())
+        adopted = 0
+        for path in self.media_dir.rglob("*"):
+            if not path.is_file() or path.name.endswith(".part"):
+                continue
+            relative_path = self.relative(path)
+            if relative_path in known:
+                continue
+            with path.open("rb") as handle:
+                sha256, size = hash_stream(handle)
+            register_media(relative_path, sha256, size)
+            adopted += 1
+        return adopted
+
+    def collect_garbage(self) -> List[str]:
+        """Delete media files no poll refers to any more. Returns the removed paths."""
+        removed = []
+        for relative_path in fetch_orphaned_media(self.grace_seconds):
+            with _media_lock:
+                if not delete_media(relative_path, self.grace_seconds):
+                    continue
+                absolute = self.base_dir / relative_path
+                try:
+                    absolute.unlink()
+                except FileNotFoundError:
+                    pass
+            removed.append(relative_path)
+            # fjern tomme mapper igjen, men aldri selve media/
+            parent = absolute.parent
+            while parent != self.media_dir and parent.is_relative_to(self.media_dir):
+                try:
+                    parent.rmdir()
+                except OSError:
+                    break
+                parent = parent.parent
+        return removed
+
+    def start_collector(self) -> None:
+        if self._gc_thread:
+            return
+
+        def run():
+            try:
+                adopted = self.adopt_untracked_files()
+                if adopted:
+                    print(f"Registrerte {adopted} eksisterende bildefiler")
+            except Exception as exc:
+                print(f"Kunne ikke registrere eksisterende bilder: {exc}")
+            while not self._stop.wait(self.gc_interval):
+                try:
+                    removed = self.collect_garbage()
+                    if removed:
+                        print(f"Slettet {len(removed)} ubrukte bildefiler")
+                except Exception as exc:
+                    print(f"Søppeltømming av bilder feilet: {exc}")
+
+        self._gc_thread = threading.Thread(target=run, name="media-gc", daemon=True)
+        self._gc_thread.start()
+
+    def stop_collector(self) -> None:
+        self._stop.set()
@@ -0,0 +1,203 @@
+# spilleliste for skjermen: en liste med poll-id-er som byttes på automatisk etter en fast tid,
+# eller når noen trykker neste/forrige. før et bytte hentes neste poll fra databasen og bildet
+# dens skaleres ferdig i bakgrunnen, så selve byttet bare er å sette inn en poll som allerede er klar.
+
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from poll_record import Poll
+from polls_db import catalog_version, fetch_poll
+
+
+class Prefetched(NamedTuple):
+    """A poll read ahead of time, with the catalog version it was read at."""
+
+    poll: Poll
+    catalog: int
+
+
+class Playlist:
+    """Rotates the displayed poll through ``ids``, prefetching the next one in the background.
+
+    ``warm(poll)`` prepares anything slow (the scaled image), ``show(prefetched)`` makes the poll
+    the displayed one. Both are called from the playlist thread or the thread asking for a switch.
+    """
+
+    def __init__(self, show: Callable[[Prefetched], None], warm: Optional[Callable[[Poll], None]] = None,
+                 interval: float = 30.0):
+        self.show = show
+        self.warm = warm
+        self.interval = interval
+        self.ids: List[str] = []
+        self.index = -1
+        self.running = False
+        self.switches = 0
+        self.prefetch_hits = 0
+        self._deadline: Optional[float] = None
+        self._prefetched: Optional[Prefetched] = None
+        self._prefetch_wanted = False
+        self._cond = threading.Condition()
+        # bare ett bytte om gangen, ellers kan tidtakeren og /playlist/next hoppe over hverandre
+        self._switch_lock = threading.Lock()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+    def set(self, ids: List[str], interval: Optional[float] = None, autostart: bool = True) -> None:
+        ids = [poll_id for poll_id in (poll_id.strip() for poll_id in ids) if poll_id]
+        with self._cond:
+            self.ids = ids
+            self.index = -1
+            if interval is not None:
+                self.interval = interval
+            self._prefetched = None
+            self.running = autostart and bool(ids)
+            self._deadline = time.monotonic() if self.running else None
+            self._prefetch_wanted = bool(ids)
+            self._cond.notify()
+
+    def clear(self) -> None:
+        self.set([], autostart=False)
+
+    def resume(self) -> None:
+        with self._cond:
+            if not self.ids:
+                return
+            self.running = True
+            self._deadline = time.monotonic() + (self.interval if self.index >= 0 else 0.0)
+            self._cond.notify()
+
+    def pause(self) -> None:
+        with self._cond:
+            self.running = False
+            self._deadline = None
+
+    def next(self) -> Optional[Poll]:
+        return self._advance(1)
+
+    def previous(self) -> Optional[Poll]:
+        return self._advance(-1)
+
+    def _target(self, step: int) -> Optional[int]:
+        if not self.ids:
+            return None
+        if self.index < 0:
+            return 0 if step > 0 else len(self.ids) - 1
+        return (self.index + step) % len(self.ids)
+
+    def _load(self, poll_id: str) -> Optional[Prefetched]:
+        catalog = catalog_version()
+        poll = fetch_poll(poll_id)
+        return Prefetched(poll, catalog) if poll else None
+
+    #et bilde som ikke kan lastes skal ikke stoppe byttet, pollen vises da uten
+    def _warm(self, poll: Poll) -> None:
+        if not self.warm:
+            return
+        try:
+            self.warm(poll)
+        except Exception as exc:
+            print(f"Kunne ikke forberede bildet til {poll.id}: {exc}")
+
+    def _advance(self, step: int) -> Optional[Poll]:
+        with self._switch_lock:
+            with self._cond:
+                target = self._target(step)
+                if target is None:
+                    return None
+                ids = self.ids
+                ready = self._prefetched if step == 1 else None
+            # poller som er slettet hoppes over, men aldri mer enn én runde
+            for _ in range(len(ids)):
+                poll_id = ids[target]
+                if ready and ready.poll.id == poll_id:
+                    self.prefetch_hits += 1
+                    break
+                ready = self._load(poll_id)
+                if ready:
+                    self._warm(ready.poll)
+                    break
+                print(f"Spillelista hopper over {poll_id}, den finnes ikke")
+                target = (target + step) % len(ids)
+            if ready:
+                self.show(ready)
+                self.switches += 1
+            with self._cond:
+                # set() kan ha byttet ut lista mens vi byttet poll. da starter den nye lista forfra
+                if self.ids is ids:
+                    self.index = target
+                self._prefetched = None
+                self._prefetch_wanted = True
+                if self.running:
+                    self._deadline = time.monotonic() + self.interval
+                self._cond.notify()
+            return ready.poll if ready else None
+
+    def _prefetch(self) -> None:
+        with self._cond:
+            target = self._target(1)
+            if target is None:
+                return
+            poll_id = self.ids[target]
+        ready = self._load(poll_id)
+        if ready:
+            self._warm(ready.poll)
+        with self._cond:
+            # lista kan ha blitt byttet ut mens vi hentet
+            upcoming = self._target(1)
+            if ready and upcoming is not None and self.ids[upcoming] == poll_id:
+                self._prefetched = ready
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._closed and not self._prefetch_wanted:
+                    if self.running and self._deadline is not None:
+                        remaining = self._deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                    else:
+                        self._cond.wait()
+                if self._closed:
+                    return
+                prefetch, self._prefetch_wanted = self._prefetch_wanted, False
+                due = self.running and self._deadline is not None and self._deadline <= time.monotonic()
+            try:
+                if prefetch:
+                    self._prefetch()
+                if due:
+                    self._advance(1)
+            except Exception as exc:
+                print(f"Spillelista feilet: {exc}")
+                with self._cond:
+                    if self.running:
+                        self._deadline = time.monotonic() + self.interval
+
+    def start(self) -> None:
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self._loop, name="playlist", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+    def status(self) -> Dict:
+        with self._cond:
+            upcoming = self._target(1)
+            return {
+                "ids": list(self.ids),
+                "index": self.index,
+                "current": self.ids[self.index] if 0 <= self.index < len(self.ids) else None,
+                "next": self.ids[upcoming] if upcoming is not None else None,
+                "next_ready": self._prefetched is not None,
+                "running": self.running,
+                "interval": self.interval,
+                "seconds_left": round(max(0.0, self._deadline - time.monotonic()), 1)
+                if self.running and self._deadline is not None else None,
+                "switches": self.switches,
+                "prefetch_hits": self.prefetch_hits,
+            }
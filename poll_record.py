@@ -0,0 +1,104 @@
+# en kompakt type for en poll. før ble pollene sendt rundt som vanlige dicts overalt,
+# nå er det én klasse med __slots__ og en versjonsteller som økes ved hver endring.
+# da holder det å sammenligne et tall for å vite om noe må lagres.
+
+from typing import Any, Dict, Optional, Tuple
+
+POLL_FIELDS = ("id", "caption", "score_a", "score_b", "score_meh", "image_path")
+
+# hvilket tellerfelt hver knapp/stemme havner i
+CHOICE_FIELDS = {"yes": "score_a", "no": "score_b", "meh": "score_meh"}
+
+
+class Poll:
+    """A single poll. ``version`` is bumped every time a field changes."""
+
+    __slots__ = POLL_FIELDS + ("version",)
+
+    def __init__(
+        self,
+        id: str,
+        caption: str = "",
+        score_a: int = 0,
+        score_b: int = 0,
+        score_meh: int = 0,
+        image_path: Optional[str] = None,
+        version: int = 0,
+    ):
+        self.id = id
+        self.caption = caption
+        self.score_a = score_a
+        self.score_b = score_b
+        self.score_meh = score_meh
+        self.image_path = image_path
+        self.version = version
+
+    #rader fra sqlite kommer i samme rekkefølge som POLL_FIELDS
+    @classmethod
+    def from_row(cls, row: Tuple) -> "Poll":
+        """Build a poll from a row selected in POLL_FIELDS order."""
+        return cls(*row)
+
+    def add_vote(self, choice: str, amount: int = 1) -> None:
+        """Add ``amount`` votes for ``choice`` ("yes", "no" or "meh")."""
+        field = CHOICE_FIELDS[choice]
+        setattr(self, field, getattr(self, field) + amount)
+        self.version += 1
+
+    def update(self, **fields: Any) -> bool:
+        """Set the given fields, bumping the version if anything changed."""
+        changed = False
+        for name, value in fields.items():
+            if name not in POLL_FIELDS:
+                raise AttributeError(f"Poll har ikke feltet '{name}'")
+            if getattr(self, name) != value:
+                setattr(self, name, value)
+                changed = True
+        if changed:
+            self.version += 1
+        return changed
+
+    @property
+    def key(self) -> Tuple[Optional[str], int]:
+        """Hashable (id, version) pair identifying this exact state of the poll."""
+        return (self.id, self.version)
+
+    def copy(self) -> "Poll":
+        return Poll(
+            self.id,
+            self.caption,
+            self.score_a,
+            self.score_b,
+            self.score_meh,
+            self.image_path,
+            self.version,
+        )
+
+    def astuple(self) -> Tuple:
+        """Return the poll fields in POLL_FIELDS order (same order as the database columns)."""
+        return (self.id, self.caption, self.score_a, self.score_b, self.score_meh, self.image_path)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "caption": self.caption,
+            "score_a": self.score_a,
+            "score_b": self.score_b,
+            "score_meh": self.score_meh,
+            "image_path": self.image_path,
+        }
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Poll):
+            return NotImplemented
+        return self.astuple() == other.astuple()
+
+    # pollen endrer seg hele tiden, så den kan ikke brukes som nøkkel direkte. bruk poll.key
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return (
+            f"Poll(id={self.id!r}, caption={self.caption!r}, score_a={self.score_a}, "
+            f"score_b={self.score_b}, score_meh={self.score_meh}, "
+            f"image_path={self.image_path!r}, version={self.version})"
+        )
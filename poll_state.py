@@ -0,0 +1,241 @@
+# én eier av pollen på skjermen. før ble shared_data og tellerne endret fra uvicorn-tråden, fra
+# gpiozero-trådene og fra pygame-løkka, og alle som leste måtte tåle at ting var halvveis endret.
+# nå går alle endringer som kommandoer gjennom én kø til én tråd, som utfører dem i rekkefølge.
+# etter hver runde publiseres et nytt, uforanderlig øyeblikksbilde (PollSnapshot). de som bare leser
+# (skjermen, /get_scores/) tar det siste bildet uten lås, siden det byttes ut i én operasjon.
+
+import asyncio
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+from poll_record import Poll
+
+
+class PollSnapshot(NamedTuple):
+    """Immutable view of the displayed poll. ``generation`` grows with every published change."""
+
+    id: str
+    caption: str
+    score_a: int
+    score_b: int
+    score_meh: int
+    image_path: Optional[str]
+    generation: int
+
+    @classmethod
+    def of(cls, poll: Poll, generation: int) -> "PollSnapshot":
+        return cls(poll.id, poll.caption, poll.score_a, poll.score_b, poll.score_meh, poll.image_path, generation)
+
+    def to_poll(self) -> Poll:
+        return Poll(self.id, self.caption, self.score_a, self.score_b, self.score_meh, self.image_path)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self.to_poll().to_dict()
+
+
+# legges i køen av stop(). alt som ligger foran blir utført først
+_STOP = object()
+
+
+class PollState:
+    """Single-writer owner of the displayed poll.
+
+    Commands are callables ``fn(state, *args)`` run on the owner thread, where they may read and
+    replace ``state.poll`` freely. Everyone else reads ``state.snapshot``.
+    """
+
+    def __init__(self, poll: Poll, persist: Callable[[Poll], None], persisted: bool = False,
+                 persist_interval: float = 0.1, on_publish: Optional[Callable[[], None]] = None,
+                 batch_limit: int = 512):
+        self.poll = poll
+        self.persist = persist
+        self.persist_interval = persist_interval
+        self.on_publish = on_publish
+        # uten tak blir runden aldri ferdig når stemmene kommer like fort som de utføres
+        self.batch_limit = batch_limit
+        self._generation = 0
+        # økes hver gang pollen byttes ut. (epoke, versjon) sier om noe er endret siden sist
+        self._epoch = 0
+        self.snapshot = PollSnapshot.of(poll, self._generation)
+        self._published_key = self._key()
+        self._persisted_key = self._published_key if persisted else None
+        self._last_persist = 0.0
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        # stemmer som ikke er talt ennå. samles her, så en haug med trykk blir én kommando i køen
+        self._votes: Dict[str, int] = {}
+        self._votes_lock = threading.Lock()
+
+        # målinger: hvor lenge kommandoer ventet + ble utført, og hvor mange som kom samtidig
+        self.latencies: deque = deque(maxlen=2048)
+        self.commands = 0
+        self.batches = 0
+        self.max_batch = 0
+        self.published = 0
+
+    # --- for alle andre tråder ---
+
+    def _key(self):
+        return (self._epoch, self.poll.version)
+
+    def submit(self, command: Callable, *args) -> Future:
+        future: Future = Future()
+        # (kommando, argumenter, future eller None, tidspunkt den ble lagt i køen)
+        self._queue.put((command, args, future, time.perf_counter()))
+        return future
+
+    def post(self, command: Callable, *args) -> None:
+        """Queue a command without waiting for it (used by button callbacks)."""
+        self._queue.put((command, args, None, time.perf_counter()))
+
+    def call(self, command: Callable, *args, timeout: float = 10.0) -> Any:
+        return self.submit(command, *args).result(timeout)
+
+    async def call_async(self, command: Callable, *args) -> Any:
+        return await asyncio.wrap_future(self.submit(command, *args))
+
+    def vote(self, choice: str, amount: int = 1) -> None:
+        with self._votes_lock:
+            first = not self._votes
+            self._votes[choice] = self._votes.get(choice, 0) + amount
+        if first:
+            self.post(_count_votes)
+
+    # --- bare på eiertråden ---
+
+    def replace(self, poll: Poll, persisted: bool = False) -> None:
+        """Make ``poll`` the displayed poll. Only call from inside a command."""
+        self.poll = poll
+        self._epoch += 1
+        if persisted:
+            self._persisted_key = self._key()
+
+    def persist_now(self) -> None:
+        """Write the current poll to the database right away. Only call from inside a command."""
+        key = self._key()
+        if self.poll.id and key != self._persisted_key:
+            self.persist(self.poll.copy())
+            self._persisted_key = key
+        self._last_persist = time.monotonic()
+
+    def _publish(self) -> None:
+        key = self._key()
+        if key == self._published_key:
+            return
+        self._generation += 1
+        self.snapshot = PollSnapshot.of(self.poll, self._generation)
+        self._published_key = key
+        self.published += 1
+        if self.on_publish:
+            self.on_publish()
+
+    def _dirty(self) -> bool:
+        return self._key() != self._persisted_key
+
+    def _run_one(self, item) -> None:
+        command, args, future, queued_at = item
+        if future is not None and not future.set_running_or_notify_cancel():
+            return
+        try:
+            result = command(self, *args)
+        except BaseException as exc:
+            if future is not None:
+                future.set_exception(exc)
+            else:
+                print(f"Kommando {getattr(command, '__name__', command)} feilet: {exc}")
+        else:
+            if future is not None:
+                future.set_result(result)
+        self.latencies.append(time.perf_counter() - queued_at)
+        self.commands += 1
+
+    def _loop(self) -> None:
+        while True:
+            # venter på neste kommando, men ikke lenger enn til neste planlagte lagring
+            timeout = None
+            if self._dirty():
+                timeout = max(0.0, self._last_persist + self.persist_interval - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            batch = []
+            while item is not None:
+                batch.append(item)
+                if len(batch) >= self.batch_limit:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    item = None
+
+            stopping = False
+            for entry in batch:
+                if entry is _STOP:
+                    stopping = True
+                    continue
+                self._run_one(entry)
+            if batch:
+                self.batches += 1
+                self.max_batch = max(self.max_batch, len(batch))
+
+            # alle kommandoene i runden blir ett nytt bilde, og stemmer lagres samlet
+            self._publish()
+            if self._dirty() and (stopping or time.monotonic() - self._last_persist >= self.persist_interval):
+                try:
+                    self.persist_now()
+                except Exception as exc:
+                    print(f"Kunne ikke lagre pollen: {exc}")
+                    self._last_persist = time.monotonic()
+            if stopping:
+                return
+
+    def start(self) -> None:
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self._loop, name="poll-state", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Apply everything still queued, write the final state and stop the owner thread."""
+        if not self._thread:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def stats(self) -> Dict[str, float]:
+        ordered = sorted(self.latencies.copy())
+
+        def pct(p: float) -> float:
+            if not ordered:
+                return 0.0
+            return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000, 3)
+
+        # vote() endrer bufferen fra knappe- og api-trådene, så den summeres under låsen
+        with self._votes_lock:
+            pending_votes = sum(self._votes.values())
+        return {
+            "commands": self.commands,
+            "batches": self.batches,
+            "mean_batch": round(self.commands / self.batches, 2) if self.batches else 0.0,
+            "max_batch": self.max_batch,
+            "published_snapshots": self.published,
+            "queued": self._queue.qsize(),
+            "pending_votes": pending_votes,
+            "latency_ms_p50": pct(50),
+            "latency_ms_p99": pct(99),
+            "latency_ms_max": pct(100),
+        }
+
+
+def _count_votes(state: PollState) -> None:
+    with state._votes_lock:
+        votes, state._votes = state._votes, {}
+    for choice, amount in votes.items():
+        state.poll.add_vote(choice, amount)
@@ -1,15 +1,41 @@
 # dette er koden som laster opp all data om alle poller fra hovedprogrammet, over på en sqlite database lagret lokalt.
 
+import itertools
 import os
+import re
 import sqlite3
-from typing import Dict, List, Optional
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from poll_record import Poll
 
 DB_PATH = os.path.join(os.path.dirname(__file__), "polls.db")
+# gamle poller flyttes hit av archive.py. filen åpnes bare for lesing herfra
+ARCHIVE_PATH = os.path.join(os.path.dirname(__file__), "polls_archive.db")
+
+# kolonnene i samme rekkefølge som export/import bruker dem
+EXPORT_COLUMNS = ("id", "caption", "score_a", "score_b", "score_meh", "image_path", "updated_at")
+
+# teller som økes hver gang noe skrives til polls. brukes til å vite når cachede svar er utdaterte
+_catalog_counter = itertools.count(1)
+_catalog_version = 0
+
+
+def catalog_version() -> int:
+    """Return a number that changes every time the polls table is written to."""
+    return _catalog_version
+
+
+def _bump_catalog_version() -> None:
+    global _catalog_version
+    _catalog_version = next(_catalog_counter)
 
 #starter databasen
 def init_db() -> None:
     """Create the polls table if it does not already exist."""
     with sqlite3.connect(DB_PATH) as conn:
+        # wal: lesere (dashboardet, backup) og skrivingen av stemmer stopper ikke hverandre
+        conn.execute("PRAGMA journal_mode=WAL")
         conn.execute(
             """
             CREATE TABLE IF NOT EXISTS polls (
@@ -29,61 +55,294 @@ def init_db() -> None:
         if "image_path" not in columns:
             conn.execute("ALTER TABLE polls ADD COLUMN image_path TEXT")
             conn.commit()
+        # brukes både til sortering og til å finne poller som kan arkiveres
+        conn.execute("CREATE INDEX IF NOT EXISTS polls_updated_at ON polls (updated_at)")
+        conn.executescript(_MEDIA_SCHEMA)
+        _init_search(conn)
+        _init_sync(conn)
 
-#lagrer pollen som en helhet. og legger den inn i table som de andre 
-def save_poll_record(poll: Dict[str, int | str]) -> None:
-    """Insert or update a poll row."""
-    poll_id = poll.get("id")
-    if not poll_id:
+# fulltekstsøk i captions. polls_fts speiler polls.caption og holdes i synk av triggere.
+# finnes ikke fts5 i sqlite-versjonen faller søket tilbake til LIKE
+FTS_AVAILABLE = False
+
+_SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE polls_fts USING fts5(
+    caption,
+    content='polls',
+    content_rowid='rowid',
+    tokenize='unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS polls_fts_insert AFTER INSERT ON polls
+BEGIN
+    INSERT INTO polls_fts (rowid, caption) VALUES (NEW.rowid, NEW.caption);
+END;
+
+CREATE TRIGGER IF NOT EXISTS polls_fts_update AFTER UPDATE OF caption ON polls
+WHEN OLD.caption IS NOT NEW.caption
+BEGIN
+    INSERT INTO polls_fts (polls_fts, rowid, caption) VALUES ('delete', OLD.rowid, OLD.caption);
+    INSERT INTO polls_fts (rowid, caption) VALUES (NEW.rowid, NEW.caption);
+END;
+
+CREATE TRIGGER IF NOT EXISTS polls_fts_delete AFTER DELETE ON polls
+BEGIN
+    INSERT INTO polls_fts (polls_fts, rowid, caption) VALUES ('delete', OLD.rowid, OLD.caption);
+END;
+
+INSERT INTO polls_fts (polls_fts) VALUES ('rebuild');
+"""
+
+
+def _init_search(conn: sqlite3.Connection) -> None:
+    global FTS_AVAILABLE
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'polls_fts'"
+    ).fetchone()
+    if exists:
+        FTS_AVAILABLE = True
         return
+    try:
+        conn.executescript("BEGIN;" + _SEARCH_SCHEMA + "COMMIT;")
+        FTS_AVAILABLE = True
+    except sqlite3.OperationalError as exc:
+        conn.rollback()
+        print(f"FTS5 ikke tilgjengelig ({exc}); søk bruker LIKE i stedet.")
+
+# endringslogg for dashboardet. hver poll har ett rad i poll_changes med revisjonen til siste endring,
+# og slettede (arkiverte) poller blir stående med deleted = 1. da kan en klient spørre "hva er endret
+# siden revisjon N" og få bare det. triggerne gjør at all kode som skriver til polls blir med
+_SYNC_SCHEMA = """
+CREATE TABLE poll_changes (
+    id TEXT PRIMARY KEY,
+    rev INTEGER NOT NULL,
+    deleted INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX poll_changes_rev ON poll_changes (rev);
+
+CREATE TRIGGER sync_poll_insert AFTER INSERT ON polls
+BEGIN
+    INSERT INTO poll_changes (id, rev, deleted)
+    VALUES (NEW.id, (SELECT COALESCE(MAX(rev), 0) + 1 FROM poll_changes), 0)
+    ON CONFLICT(id) DO UPDATE SET rev = excluded.rev, deleted = 0;
+END;
+
+CREATE TRIGGER sync_poll_update AFTER UPDATE ON polls
+BEGIN
+    INSERT INTO poll_changes (id, rev, deleted)
+    VALUES (NEW.id, (SELECT COALESCE(MAX(rev), 0) + 1 FROM poll_changes), 0)
+    ON CONFLICT(id) DO UPDATE SET rev = excluded.rev, deleted = 0;
+END;
+
+CREATE TRIGGER sync_poll_delete AFTER DELETE ON polls
+BEGIN
+    INSERT INTO poll_changes (id, rev, deleted)
+    VALUES (OLD.id, (SELECT COALESCE(MAX(rev), 0) + 1 FROM poll_changes), 1)
+    ON CONFLICT(id) DO UPDATE SET rev = excluded.rev, deleted = 1;
+END;
+"""
 
-    caption = poll.get("caption") or ""
-    score_a = int(poll.get("score_a", 0))
-    score_b = int(poll.get("score_b", 0))
-    score_meh = int(poll.get("score_meh", 0))
-    image_path = poll.get("image_path")
 
+def _init_sync(conn: sqlite3.Connection) -> None:
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'poll_changes'").fetchone()
+    if exists:
+        return
+    # pollene som finnes fra før får revisjoner i samme rekkefølge som de sist ble endret
+    conn.executescript(
+        "BEGIN;"
+        + _SYNC_SCHEMA
+        + """
+        INSERT INTO poll_changes (id, rev)
+        SELECT id, ROW_NUMBER() OVER (ORDER BY updated_at, rowid) FROM polls;
+        COMMIT;
+        """
+    )
+
+
+def fetch_changes(since: int = 0) -> Dict:
+    """Polls changed after revision ``since`` plus the ids removed since then.
+
+    ``full`` is set when the answer is the whole catalog (first sync, or a cursor from another database),
+    and the client should drop anything it has that is not in ``polls``.
+    """
     with sqlite3.connect(DB_PATH) as conn:
-        conn.execute(
+        # revisjonen og radene må komme fra samme øyeblikksbilde
+        conn.execute("BEGIN")
+        head = conn.execute("SELECT COALESCE(MAX(rev), 0) FROM poll_changes").fetchone()[0]
+        full = since <= 0 or since > head
+        rows = conn.execute(
             """
-            INSERT INTO polls (id, caption, score_a, score_b, score_meh, image_path, updated_at)
-            VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-            ON CONFLICT(id) DO UPDATE SET
-                caption=excluded.caption,
-                score_a=excluded.score_a,
-                score_b=excluded.score_b,
-                score_meh=excluded.score_meh,
-                image_path=excluded.image_path,
-                updated_at=CURRENT_TIMESTAMP
+            SELECT c.id, c.rev, c.deleted, p.caption, p.score_a, p.score_b, p.score_meh, p.image_path
+            FROM poll_changes c LEFT JOIN polls p ON p.id = c.id
+            WHERE c.rev > ? AND (c.deleted = 0 OR ?)
+            ORDER BY c.rev DESC
             """,
-            (poll_id, caption, score_a, score_b, score_meh, image_path),
-        )
+            (0 if full else since, not full),
+        ).fetchall()
+        conn.commit()
+
+    polls = []
+    deleted = []
+    for poll_id, rev, is_deleted, caption, score_a, score_b, score_meh, image_path in rows:
+        if is_deleted:
+            deleted.append(poll_id)
+            continue
+        polls.append({
+            **Poll(poll_id, caption, score_a, score_b, score_meh, image_path).to_dict(),
+            "rev": rev,
+        })
+    return {"rev": head, "full": full, "polls": polls, "deleted": deleted}
+
+# bildene lagres etter innholdet (sha256). refcount holdes oppdatert av triggere på polls,
+# så uansett hvilken kode som endrer image_path stemmer tellingen
+_MEDIA_SCHEMA = """
+CREATE TABLE IF NOT EXISTS media (
+    path TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    refcount INTEGER NOT NULL DEFAULT 0,
+    touched_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS media_sha256 ON media (sha256);
+CREATE INDEX IF NOT EXISTS media_refcount ON media (refcount);
+
+CREATE TRIGGER IF NOT EXISTS media_ref_insert AFTER INSERT ON polls
+WHEN NEW.image_path IS NOT NULL
+BEGIN
+    UPDATE media SET refcount = refcount + 1 WHERE path = NEW.image_path;
+END;
+
+CREATE TRIGGER IF NOT EXISTS media_ref_update AFTER UPDATE OF image_path ON polls
+WHEN OLD.image_path IS NOT NEW.image_path
+BEGIN
+    UPDATE media SET refcount = refcount - 1 WHERE path = OLD.image_path;
+    UPDATE media SET refcount = refcount + 1 WHERE path = NEW.image_path;
+END;
+
+CREATE TRIGGER IF NOT EXISTS media_ref_delete AFTER DELETE ON polls
+WHEN OLD.image_path IS NOT NULL
+BEGIN
+    UPDATE media SET refcount = refcount - 1 WHERE path = OLD.image_path;
+END;
+"""
+
+_UPSERT_POLL_SQL = """
+    INSERT INTO polls (id, caption, score_a, score_b, score_meh, image_path, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT(id) DO UPDATE SET
+        caption=excluded.caption,
+        score_a=excluded.score_a,
+        score_b=excluded.score_b,
+        score_meh=excluded.score_meh,
+        image_path=excluded.image_path,
+        updated_at=CURRENT_TIMESTAMP
+"""
+
+
+def _poll_params(poll: Poll) -> Tuple:
+    return (
+        poll.id,
+        poll.caption or "",
+        int(poll.score_a),
+        int(poll.score_b),
+        int(poll.score_meh),
+        poll.image_path,
+    )
+
+#lagrer pollen som en helhet. og legger den inn i table som de andre 
+def save_poll_record(poll: Poll) -> None:
+    """Insert or update a poll row."""
+    if not poll.id:
+        return
+
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.execute(_UPSERT_POLL_SQL, _poll_params(poll))
+        conn.commit()
+    _bump_catalog_version()
+
+#lagrer flere poller i én transaksjon. brukes av stasjonene som skriver samlet i stedet for én og én
+def save_poll_records(polls: Iterable[Poll]) -> int:
+    """Insert or update several polls in a single transaction and return the row count."""
+    params = [_poll_params(poll) for poll in polls if poll.id]
+    if not params:
+        return 0
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.executemany(_UPSERT_POLL_SQL, params)
+        conn.commit()
+    _bump_catalog_version()
+    return len(params)
+
+#stasjonene eier bare tellerne. bilde og caption kan endres via api-et mens en økt pågår, og skal ikke
+#overskrives av kopien økta har i minnet
+_UPSERT_SCORES_SQL = """
+    INSERT INTO polls (id, caption, score_a, score_b, score_meh, image_path, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT(id) DO UPDATE SET
+        score_a=excluded.score_a,
+        score_b=excluded.score_b,
+        score_meh=excluded.score_meh,
+        updated_at=CURRENT_TIMESTAMP
+"""
+
+
+def save_poll_scores(polls: Iterable[Poll]) -> int:
+    """Write only the counters of several polls in one transaction. Caption and image are left alone."""
+    params = [_poll_params(poll) for poll in polls if poll.id]
+    if not params:
+        return 0
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.executemany(_UPSERT_SCORES_SQL, params)
         conn.commit()
+    _bump_catalog_version()
+    return len(params)
+
+#arkivet åpnes skrivebeskyttet, og bare når en poll ikke finnes i den vanlige databasen
+def _open_archive() -> Optional[sqlite3.Connection]:
+    if not os.path.exists(ARCHIVE_PATH):
+        return None
+    return sqlite3.connect(Path(ARCHIVE_PATH).resolve().as_uri() + "?mode=ro", uri=True)
 
 #henter ut en spesifik poll med poll_id
-def fetch_poll(poll_id: str) -> Optional[Dict[str, int | str]]:
-    """Return a single poll by id."""
+def fetch_poll(poll_id: str) -> Optional[Poll]:
+    """Return a single poll by id, looking in the archive if it is not in the hot database."""
     if not poll_id:
         return None
 
+    sql = "SELECT id, caption, score_a, score_b, score_meh, image_path FROM polls WHERE id = ?"
     with sqlite3.connect(DB_PATH) as conn:
-        conn.row_factory = sqlite3.Row
-        cursor = conn.execute(
-            "SELECT id, caption, score_a, score_b, score_meh, image_path FROM polls WHERE id = ?",
-            (poll_id,),
-        )
-        row = cursor.fetchone()
-        return dict(row) if row else None
+        row = conn.execute(sql, (poll_id,)).fetchone()
+    if not row:
+        archive = _open_archive()
+        if archive:
+            with archive:
+                row = archive.execute(sql, (poll_id,)).fetchone()
+            archive.close()
+    return Poll.from_row(row) if row else None
 
-#henter ut alle pollene som har blitt lagret hittil
-def fetch_all_polls() -> List[Dict[str, int | str]]:
-    """Return all polls ordered by last update."""
+#henter ut alle pollene som har blitt lagret hittil. arkiverte poller kommer bare med når man ber om det
+def fetch_all_polls(include_archived: bool = False, limit: Optional[int] = None) -> List[Poll]:
+    """Return polls ordered by last update, newest first. Archived polls follow the hot ones."""
+    sql = "SELECT id, caption, score_a, score_b, score_meh, image_path FROM polls ORDER BY updated_at DESC"
+    params: Tuple = ()
+    if limit is not None:
+        sql += " LIMIT ?"
+        params = (limit,)
     with sqlite3.connect(DB_PATH) as conn:
-        conn.row_factory = sqlite3.Row
-        cursor = conn.execute(
-            "SELECT id, caption, score_a, score_b, score_meh, image_path FROM polls ORDER BY updated_at DESC"
-        )
-        return [dict(row) for row in cursor.fetchall()]
+        polls = [Poll.from_row(row) for row in conn.execute(sql, params).fetchall()]
+    if not include_archived or (limit is not None and len(polls) >= limit):
+        return polls
+
+    archive = _open_archive()
+    if archive:
+        if limit is not None:
+            params = (limit - len(polls),)
+        seen = {poll.id for poll in polls}
+        with archive:
+            rows = archive.execute(sql, params).fetchall()
+        archive.close()
+        # en arkivert poll som er tatt i bruk igjen ligger i begge, og da er den vanlige nyest
+        polls.extend(Poll.from_row(row) for row in rows if row[0] not in seen)
+    return polls
 
 #bildehåndtering. For å laste opp bilde (link til hvor bildet ligger lagret) til databasen og linke det opp til riktig poll
 def update_image_path(poll_id: str, image_path: Optional[str]) -> None:
@@ -99,24 +358,184 @@ def update_image_path(poll_id: str, image_path: Optional[str]) -> None:
             (image_path, poll_id),
         )
         conn.commit()
+    _bump_catalog_version()
 
 #mulighet for å hente poll etter hvilken caption den har. dette er hovedsakelig for å kunne endre navnet på poller.
-def fetch_poll_by_caption(caption: str) -> Optional[Dict[str, int | str]]:
-    """Return the newest poll matching the given caption (case-insensitive)."""
+def fetch_poll_by_caption(caption: str) -> Optional[Poll]:
+    """Return the newest poll matching the given caption (case-insensitive), archive included."""
     if not caption:
         return None
+    sql = """
+        SELECT id, caption, score_a, score_b, score_meh, image_path
+        FROM polls
+        WHERE caption = ?
+        COLLATE NOCASE
+        ORDER BY updated_at DESC
+        LIMIT 1
+    """
+    with sqlite3.connect(DB_PATH) as conn:
+        row = conn.execute(sql, (caption,)).fetchone()
+    if not row:
+        archive = _open_archive()
+        if archive:
+            with archive:
+                row = archive.execute(sql, (caption,)).fetchone()
+            archive.close()
+    return Poll.from_row(row) if row else None
+
+#strømmer alle pollene rett fra cursoren uten å bygge en liste i minnet. brukes av /export
+def iter_poll_rows(batch_size: int = 256) -> Iterator[Tuple]:
+    """Yield every poll row (in EXPORT_COLUMNS order), newest first."""
+    # StreamingResponse kan hente neste rad fra en annen tråd, derav check_same_thread=False
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    try:
+        cursor = conn.execute(
+            "SELECT id, caption, score_a, score_b, score_meh, image_path, updated_at FROM polls ORDER BY updated_at DESC"
+        )
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        conn.close()
+
+#laster inn mange poller på en gang. alt skjer i én transaksjon, så enten kommer alt inn eller ingenting
+def import_poll_records(polls: Iterable[Dict[str, int | str]]) -> int:
+    """Insert or update many polls in a single transaction and return the row count."""
+    imported = 0
+
+    def rows():
+        nonlocal imported
+        for poll in polls:
+            poll_id = poll.get("id")
+            if not poll_id:
+                continue
+            imported += 1
+            yield (
+                str(poll_id),
+                poll.get("caption") or "",
+                int(poll.get("score_a") or 0),
+                int(poll.get("score_b") or 0),
+                int(poll.get("score_meh") or 0),
+                poll.get("image_path") or None,
+                poll.get("updated_at") or None,
+            )
+
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.executemany(
+            """
+            INSERT INTO polls (id, caption, score_a, score_b, score_meh, image_path, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+            ON CONFLICT(id) DO UPDATE SET
+                caption=excluded.caption,
+                score_a=excluded.score_a,
+                score_b=excluded.score_b,
+                score_meh=excluded.score_meh,
+                image_path=excluded.image_path,
+                updated_at=excluded.updated_at
+            """,
+            rows(),
+        )
+        conn.commit()
+    _bump_catalog_version()
+    return imported
+
+#finner et bilde som allerede er lagret med samme innhold. oppdaterer touched_at så søppeltømmingen lar det være i fred
+def find_media(sha256: str) -> Optional[Tuple[str, int]]:
+    """Return (path, size) of stored media with the given content hash, if any."""
+    with sqlite3.connect(DB_PATH) as conn:
+        row = conn.execute(
+            "SELECT path, size FROM media WHERE sha256 = ? ORDER BY touched_at LIMIT 1",
+            (sha256,),
+        ).fetchone()
+        if row:
+            conn.execute("UPDATE media SET touched_at = CURRENT_TIMESTAMP WHERE path = ?", (row[0],))
+            conn.commit()
+        return (row[0], row[1]) if row else None
+
+#registrerer en ny fil. refcount starter på antall poller som allerede peker dit (vanligvis 0),
+#arkiverte poller medregnet så bildene deres ikke blir slettet
+def register_media(path: str, sha256: str, size: int) -> None:
+    archived_refs = 0
+    archive = _open_archive()
+    if archive:
+        with archive:
+            archived_refs = archive.execute(
+                "SELECT COUNT(*) FROM polls WHERE image_path = ?", (path,)
+            ).fetchone()[0]
+        archive.close()
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.execute(
+            """
+            INSERT OR IGNORE INTO media (path, sha256, size, refcount)
+            VALUES (?, ?, ?, (SELECT COUNT(*) FROM polls WHERE image_path = ?) + ?)
+            """,
+            (path, sha256, size, path, archived_refs),
+        )
+        conn.commit()
+
+def fetch_media_paths() -> List[str]:
+    with sqlite3.connect(DB_PATH) as conn:
+        return [row[0] for row in conn.execute("SELECT path FROM media")]
+
+#filer ingen poll peker på lenger, og som ikke er blitt brukt på en stund
+def fetch_orphaned_media(grace_seconds: int) -> List[str]:
     with sqlite3.connect(DB_PATH) as conn:
-        conn.row_factory = sqlite3.Row
         cursor = conn.execute(
             """
-            SELECT id, caption, score_a, score_b, score_meh, image_path
-            FROM polls
-            WHERE caption = ?
-            COLLATE NOCASE
-            ORDER BY updated_at DESC
-            LIMIT 1
+            SELECT path FROM media
+            WHERE refcount <= 0 AND touched_at < datetime('now', ?)
             """,
-            (caption,),
+            (f"-{int(grace_seconds)} seconds",),
         )
-        row = cursor.fetchone()
-        return dict(row) if row else None
+        return [row[0] for row in cursor.fetchall()]
+
+#sjekker refcount og touched_at på nytt. en duplikatopplasting kan ha funnet filen etter at lista over ble hentet,
+#og pollen peker ikke dit før update_image_path har kjørt
+def delete_media(path: str, grace_seconds: int) -> bool:
+    """Forget a media row, but only if it is still unreferenced and unused. Returns True if it was removed."""
+    with sqlite3.connect(DB_PATH) as conn:
+        cursor = conn.execute(
+            """
+            DELETE FROM media
+            WHERE path = ? AND refcount <= 0 AND touched_at < datetime('now', ?)
+            """,
+            (path, f"-{int(grace_seconds)} seconds"),
+        )
+        conn.commit()
+        return cursor.rowcount > 0
+
+#søk i captions. hvert ord matches som prefiks ("quiz lun" finner "Quiz i lunsjen"), best treff først
+def search_polls(query: str, limit: int = 20) -> List[Poll]:
+    """Return polls whose caption matches every word of ``query`` as a prefix, best match first."""
+    terms = re.findall(r"\w+", query or "")
+    if not terms:
+        return []
+    with sqlite3.connect(DB_PATH) as conn:
+        if FTS_AVAILABLE:
+            match = " ".join(f'"{term}"*' for term in terms)
+            cursor = conn.execute(
+                """
+                SELECT p.id, p.caption, p.score_a, p.score_b, p.score_meh, p.image_path
+                FROM polls_fts
+                JOIN polls AS p ON p.rowid = polls_fts.rowid
+                WHERE polls_fts MATCH ?
+                ORDER BY polls_fts.rank
+                LIMIT ?
+                """,
+                (match, limit),
+            )
+        else:
+            where = " AND ".join("caption LIKE ?" for _ in terms)
+            cursor = conn.execute(
+                f"""
+                SELECT id, caption, score_a, score_b, score_meh, image_path
+                FROM polls
+                WHERE {where}
+                ORDER BY updated_at DESC
+                LIMIT ?
+                """,
+                [f"%{term}%" for term in terms] + [limit],
+            )
+        return [Poll.from_row(row) for row in cursor.fetchall()]
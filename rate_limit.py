@@ -0,0 +1,154 @@
+# begrensning av hvor mye hver klient får spørre. api-et er åpent for alle på nettet, og én fane som
+# spør i løkke eller en sal full av mobiler kunne spise opp cpu-en til pien så skjermen hakket.
+# hver klient-ip får en tokenbøtte per type forespørsel (filer, lesing, skriving, opplasting). er bøtta tom,
+# svares det 429 med en gang, før fastapi leser body, parser json eller spør databasen.
+# tunge overføringer (opplasting, import, eksport, sikkerhetskopi) har i tillegg et tak på hvor mange
+# som kan pågå samtidig. bøttene ligger i en lru med fast størrelse, så minnebruken er begrenset.
+
+import math
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+# (tokens per sekund, største bøtte)
+DEFAULT_LIMITS: Dict[str, Tuple[float, float]] = {
+    # sider, /static og /media. dashboardet henter ett bilde per kort, så en innlasting kan være flere
+    # hundre forespørsler på en gang. <img> prøver aldri igjen etter 429, så denne bøtta må være stor
+    "asset": (200.0, 600.0),
+    "read": (20.0, 40.0),
+    "write": (5.0, 10.0),
+    "upload": (0.5, 3.0),
+}
+
+# stier som regnes som tunge overføringer, uansett metode
+UPLOAD_PATHS = ("/upload_image/", "/import", "/export", "/admin/backup")
+# filer og sider som nettleseren henter selv. de serveres fra minnet eller med sendfile
+ASSET_PATHS = ("/", "/vote", "/sw.js")
+ASSET_PREFIXES = ("/static/", "/media/")
+
+_LIMITED_BODY = '{"detail":"For mange forespørsler. Vent litt og prøv igjen."}'.encode("utf-8")
+_BUSY_BODY = '{"detail":"For mange opplastinger pågår. Prøv igjen om litt."}'.encode("utf-8")
+
+
+def classify(method: str, path: str) -> str:
+    if path in UPLOAD_PATHS:
+        return "upload"
+    if method in ("GET", "HEAD", "OPTIONS"):
+        if path in ASSET_PATHS or path.startswith(ASSET_PREFIXES):
+            return "asset"
+        return "read"
+    return "write"
+
+
+class RateLimiter:
+    """Token buckets per (client, route class) kept in a bounded LRU."""
+
+    def __init__(self, limits: Optional[Dict[str, Tuple[float, float]]] = None, max_clients: int = 4096,
+                 max_uploads: int = 2, clock: Callable[[], float] = time.monotonic):
+        self.limits = dict(limits or DEFAULT_LIMITS)
+        self.max_clients = max_clients
+        self.max_uploads = max_uploads
+        self.clock = clock
+        # alt kjører på samme event loop, så tellerne trenger ingen lås
+        self.uploads_active = 0
+        self.uploads_rejected = 0
+        # (klient, klasse) -> [tokens, sist fylt på]
+        self._buckets: "OrderedDict[Tuple[str, str], list]" = OrderedDict()
+        self.allowed: Dict[str, int] = dict.fromkeys(self.limits, 0)
+        self.limited: Dict[str, int] = dict.fromkeys(self.limits, 0)
+        self.evicted = 0
+
+    def take(self, client: str, route_class: str) -> float:
+        """Spend one token. Returns 0 if allowed, otherwise the seconds until a token is available."""
+        rate, burst = self.limits[route_class]
+        now = self.clock()
+        key = (client, route_class)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [burst, now]
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+                self.evicted += 1
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+        if bucket[0] >= 1.0:
+            bucket[0] -= 1.0
+            self.allowed[route_class] += 1
+            return 0.0
+        self.limited[route_class] += 1
+        return (1.0 - bucket[0]) / rate
+
+    def begin_upload(self) -> bool:
+        if self.uploads_active >= self.max_uploads:
+            self.uploads_rejected += 1
+            return False
+        self.uploads_active += 1
+        return True
+
+    def end_upload(self) -> None:
+        self.uploads_active -= 1
+
+    def stats(self) -> Dict:
+        return {
+            "clients_tracked": len(self._buckets),
+            "max_clients": self.max_clients,
+            "evicted": self.evicted,
+            "allowed": dict(self.allowed),
+            "limited": dict(self.limited),
+            "limits": {name: {"rate": rate, "burst": burst} for name, (rate, burst) in self.limits.items()},
+            "uploads_active": self.uploads_active,
+            "max_uploads": self.max_uploads,
+            "uploads_rejected": self.uploads_rejected,
+        }
+
+
+class RateLimitMiddleware:
+    """ASGI middleware that answers 429 before the request reaches FastAPI."""
+
+    def __init__(self, app, limiter: RateLimiter, exempt: Iterable[str] = ()):
+        self.app = app
+        self.limiter = limiter
+        self.exempt = frozenset(exempt)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        client = scope.get("client")
+        host = client[0] if client else "unknown"
+        if host in self.exempt:
+            await self.app(scope, receive, send)
+            return
+
+        route_class = classify(scope["method"], scope["path"])
+        wait = self.limiter.take(host, route_class)
+        if wait:
+            await _reject(send, _LIMITED_BODY, wait)
+            return
+        if route_class != "upload":
+            await self.app(scope, receive, send)
+            return
+
+        if not self.limiter.begin_upload():
+            await _reject(send, _BUSY_BODY, 1.0)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.limiter.end_upload()
+
+
+async def _reject(send, body: bytes, wait: float) -> None:
+    await send({
+        "type": "http.response.start",
+        "status": 429,
+        "headers": [
+            (b"content-type", b"application/json; charset=utf-8"),
+            (b"content-length", str(len(body)).encode("ascii")),
+            (b"retry-after", str(max(1, math.ceil(wait))).encode("ascii")),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,45 @@
+# ferdigserialiserte json-svar for endpointene som blir spurt hele tiden (/get_scores/ og /get_old_polls).
+# i stedet for å la fastapi kjøre jsonable_encoder + json.dumps på hvert kall lager vi bytes én gang
+# per versjon av dataene og sender de rett ut.
+
+import json
+from typing import Any, Callable, Hashable
+
+try:
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover - orjson er valgfritt
+    orjson = None
+
+_json_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize to compact UTF-8 JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return _json_encoder.encode(obj).encode("utf-8")
+
+
+_MISSING = object()
+
+
+class CachedJson:
+    """Serialized JSON body for one endpoint, rebuilt only when its key changes."""
+
+    __slots__ = ("_entry",)
+
+    def __init__(self):
+        self._entry = (_MISSING, b"")
+
+    # nøkkelen må leses FØR dataene hentes. endres dataene underveis blir nøkkelen utdatert og neste kall bygger på nytt
+    def get(self, key: Hashable, build: Callable[[], Any]) -> bytes:
+        entry = self._entry
+        if entry[0] is not _MISSING and entry[0] == key:
+            return entry[1]
+        body = dumps(build())
+        # tuppelen byttes ut i én operasjon, så andre tråder ser enten gammel eller ny verdi
+        self._entry = (key, body)
+        return body
+
+    def clear(self) -> None:
+        self._entry = (_MISSING, b"")
@@ -0,0 +1,83 @@
+# innstillinger for uvicorn, samlet i profiler som velges med SERVER_PROFILE. før var alt standard:
+# asyncio-loop, access-log for hver forespørsel og ingen grense for hvor mange som kunne koble til.
+#
+#   standard  som før, uvicorns egne standardverdier
+#   fast      uvloop og httptools hvis de er installert, ingen access-log, lang keep-alive for mobiler
+#   lean      som fast, men færre samtidige forbindelser og kortere keep-alive, for å skåne skjermen
+#
+# enkeltverdier kan overstyres med SERVER_KEEP_ALIVE, SERVER_BACKLOG, SERVER_LIMIT_CONCURRENCY og
+# SERVER_ACCESS_LOG. `python benchmark.py profiles` sammenligner profilene på pien.
+
+import importlib.util
+import os
+from typing import Any, Dict, Mapping, Optional
+
+DEFAULT_PROFILE = "standard"
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def _fast_loop() -> str:
+    return "uvloop" if _installed("uvloop") else "asyncio"
+
+
+def _fast_http() -> str:
+    return "httptools" if _installed("httptools") else "h11"
+
+
+# limit_concurrency teller åpne forbindelser, også de som ser på /display/stream. over grensen svarer uvicorn 503
+PROFILES: Dict[str, Dict[str, Any]] = {
+    "standard": {},
+    "fast": {
+        "loop": _fast_loop,
+        "http": _fast_http,
+        "access_log": False,
+        "timeout_keep_alive": 15,
+        "backlog": 512,
+        "limit_concurrency": 200,
+    },
+    "lean": {
+        "loop": _fast_loop,
+        "http": _fast_http,
+        "access_log": False,
+        "timeout_keep_alive": 5,
+        "backlog": 128,
+        "limit_concurrency": 48,
+    },
+}
+
+_INT_OVERRIDES = {
+    "SERVER_KEEP_ALIVE": "timeout_keep_alive",
+    "SERVER_BACKLOG": "backlog",
+    "SERVER_LIMIT_CONCURRENCY": "limit_concurrency",
+}
+
+
+def server_options(profile: Optional[str] = None, env: Mapping[str, str] = os.environ) -> Dict[str, Any]:
+    """Keyword arguments for uvicorn.run() for ``profile`` (default: $SERVER_PROFILE or "standard")."""
+    name = profile or env.get("SERVER_PROFILE") or DEFAULT_PROFILE
+    if name not in PROFILES:
+        raise ValueError(f"Ukjent serverprofil '{name}'. Velg en av: {', '.join(PROFILES)}")
+    options: Dict[str, Any] = {
+        "host": env.get("SERVER_HOST", "0.0.0.0"),
+        "port": int(env.get("SERVER_PORT", "8000")),
+    }
+    for key, value in PROFILES[name].items():
+        options[key] = value() if callable(value) else value
+    for variable, key in _INT_OVERRIDES.items():
+        if env.get(variable):
+            options[key] = int(env[variable])
+    if env.get("SERVER_ACCESS_LOG"):
+        options["access_log"] = env["SERVER_ACCESS_LOG"] == "1"
+
+    # skjermen, knappene og tellerne lever i samme prosess som api-et. flere arbeidsprosesser ville fått
+    # hver sin kopi av dem, så det støttes ikke
+    if int(env.get("SERVER_WORKERS", "1")) != 1:
+        raise ValueError("SERVER_WORKERS må være 1: pollen og skjermen eies av denne prosessen.")
+    return options
+
+
+def describe(options: Mapping[str, Any]) -> str:
+    return ", ".join(f"{key}={value}" for key, value in options.items())
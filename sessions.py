@@ -0,0 +1,161 @@
+# flere poller som er aktive samtidig, f.eks. tre stasjoner med hver sine knapper og hver sin poll.
+# hver økt har sin egen teller og sin egen lås, så stemmer på én stasjon aldri venter på en annen.
+# lagring skjer samlet: en bakgrunnstråd skriver alle endrede økter i én transaksjon med jevne mellomrom.
+# bare tellerne skrives, så bilde og caption som endres via api-et mens økta pågår blir stående.
+
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+
+from poll_record import CHOICE_FIELDS, Poll
+from polls_db import fetch_poll, save_poll_scores
+
+
+class SessionError(Exception):
+    """Raised when a session cannot be started (duplicate poll or pin already in use)."""
+
+
+class PollSession:
+    """One active poll with its own counter shard and button mapping."""
+
+    __slots__ = ("poll", "buttons", "lock", "_devices")
+
+    def __init__(self, poll: Poll, buttons: Dict[str, int]):
+        self.poll = poll
+        self.buttons = dict(buttons)
+        self.lock = threading.Lock()
+        self._devices: List = []
+
+    def vote(self, choice: str, amount: int = 1) -> None:
+        with self.lock:
+            self.poll.add_vote(choice, amount)
+
+    def snapshot(self) -> Poll:
+        with self.lock:
+            return self.poll.copy()
+
+    def to_dict(self) -> Dict:
+        data = self.snapshot().to_dict()
+        data["buttons"] = dict(self.buttons)
+        return data
+
+
+class SessionManager:
+    """Keeps N active polls, each in its own shard, and persists them in batches."""
+
+    def __init__(self, button_factory: Optional[Callable[[int], object]] = None,
+                 reserved_pins: Iterable[int] = (), flush_interval: float = 1.0):
+        self.button_factory = button_factory
+        self.reserved_pins = set(reserved_pins)
+        self.flush_interval = flush_interval
+        # ordboka byttes ut i sin helhet ved start/stopp, så lesing trenger aldri lås
+        self._sessions: Dict[str, PollSession] = {}
+        self._lock = threading.Lock()
+        # holder flusheren og stopp() fra å skrive samme poll samtidig (eldre tall kunne da vinne)
+        self._flush_lock = threading.Lock()
+        self._persisted_keys: Dict[str, tuple] = {}
+        self._stop = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+
+    def get(self, poll_id: str) -> Optional[PollSession]:
+        return self._sessions.get(poll_id)
+
+    def sessions(self) -> List[PollSession]:
+        return list(self._sessions.values())
+
+    def start(self, poll: Poll, buttons: Optional[Dict[str, int]] = None) -> PollSession:
+        buttons = buttons or {}
+        for choice in buttons:
+            if choice not in CHOICE_FIELDS:
+                raise SessionError(f"Ukjent valg '{choice}'. Bruk yes, no eller meh.")
+
+        with self._lock:
+            if poll.id in self._sessions:
+                raise SessionError(f"Poll {poll.id} har allerede en aktiv økt.")
+            used = set(self.reserved_pins)
+            for session in self._sessions.values():
+                used.update(session.buttons.values())
+            clash = used.intersection(buttons.values())
+            if clash:
+                raise SessionError(f"GPIO-pinne {sorted(clash)} er allerede i bruk.")
+
+            session = PollSession(poll, buttons)
+            self._bind_buttons(session)
+            sessions = dict(self._sessions)
+            sessions[poll.id] = session
+            self._sessions = sessions
+            self._persisted_keys[poll.id] = poll.key
+        return session
+
+    def stop(self, poll_id: str) -> Optional[Poll]:
+        """End a session, writing its final counters. Returns the poll as stored, with those counters."""
+        with self._lock:
+            session = self._sessions.get(poll_id)
+            if not session:
+                return None
+            sessions = dict(self._sessions)
+            del sessions[poll_id]
+            self._sessions = sessions
+            for device in session._devices:
+                close = getattr(device, "close", None)
+                if close:
+                    close()
+            session._devices = []
+            self._persisted_keys.pop(poll_id, None)
+
+        with self._flush_lock:
+            final = session.snapshot()
+            save_poll_scores([final])
+        # bilde og caption kan ha blitt endret i databasen mens økta pågikk
+        return fetch_poll(poll_id) or final
+
+    def stop_all(self) -> None:
+        for poll_id in list(self._sessions):
+            self.stop(poll_id)
+
+    def _bind_buttons(self, session: PollSession) -> None:
+        if not self.button_factory:
+            return
+        try:
+            for choice, pin in session.buttons.items():
+                button = self.button_factory(pin)
+                button.when_pressed = lambda choice=choice: session.vote(choice)
+                session._devices.append(button)
+        except Exception as exc:
+            for device in session._devices:
+                device.close()
+            session._devices = []
+            raise SessionError(f"Kunne ikke sette opp knappene: {exc}")
+
+    #samler alle økter som har endret seg og skriver dem i én transaksjon
+    def flush(self) -> int:
+        with self._flush_lock:
+            changed = []
+            for poll_id, session in self._sessions.items():
+                snapshot = session.snapshot()
+                if snapshot.key != self._persisted_keys.get(poll_id):
+                    changed.append(snapshot)
+            if not changed:
+                return 0
+            save_poll_scores(changed)
+            for snapshot in changed:
+                if snapshot.id in self._sessions:
+                    self._persisted_keys[snapshot.id] = snapshot.key
+            return len(changed)
+
+    def start_flusher(self) -> None:
+        if self._flusher:
+            return
+
+        def run():
+            while not self._stop.wait(self.flush_interval):
+                try:
+                    self.flush()
+                except Exception as exc:
+                    print(f"Kunne ikke lagre aktive økter: {exc}")
+
+        self._flusher = threading.Thread(target=run, name="session-flusher", daemon=True)
+        self._flusher.start()
+
+    def shutdown(self) -> None:
+        self._stop.set()
+        self.stop_all()
@@ -0,0 +1,112 @@
+// Service worker for kontrollpanelet. Serveren setter inn VERSION og PRECACHE når den starter (se
+// static_assets.py), og siden hentes fra /sw.js.
+//
+//  - skallet (/, style.css, chart.js) legges i cachen ved installasjon. "/" vises fra cachen med en gang og
+//    oppdateres i bakgrunnen, resten har fingeravtrykk i adressen og endres aldri
+//  - bilder under /media/sha256/ er navngitt etter innholdet og caches for godt, andre bilder hentes fra
+//    nettet først
+//  - api-et går alltid til nettet. pollene selv ligger i IndexedDB på siden (index.html)
+//
+// Nettlesere slipper bare til service workere på https eller localhost. Over vanlig http på nettet i salen
+// brukes bare IndexedDB-delen, og skallet kommer fra den vanlige http-cachen.
+
+const VERSION = "__VERSION__";
+const PRECACHE = __PRECACHE__;
+const SHELL_CACHE = `shell-${VERSION}`;
+const MEDIA_CACHE = "media-v1";
+const MEDIA_LIMIT = 200;
+
+self.addEventListener("install", event => {
+    event.waitUntil(
+        caches.open(SHELL_CACHE)
+            .then(cache => cache.addAll(PRECACHE))
+            .then(() => self.skipWaiting())
+    );
+});
+
+self.addEventListener("activate", event => {
+    event.waitUntil(
+        caches.keys()
+            .then(keys => Promise.all(
+                keys.filter(key => key.startsWith("shell-") && key !== SHELL_CACHE).map(key => caches.delete(key))
+            ))
+            .then(() => self.clients.claim())
+    );
+});
+
+self.addEventListener("fetch", event => {
+    const request = event.request;
+    if (request.method !== "GET") return;
+    // delvise forespørsler (video som spoles) går rett til nettet, cachen kan bare holde hele svar
+    if (request.headers.has("range")) return;
+    const url = new URL(request.url);
+    const sameOrigin = url.origin === self.location.origin;
+
+    if (request.mode === "navigate" && sameOrigin && url.pathname === "/") {
+        event.respondWith(staleWhileRevalidate(event, "/"));
+    } else if (PRECACHE.includes(sameOrigin ? url.pathname + url.search : url.href)) {
+        event.respondWith(cacheFirst(request, SHELL_CACHE));
+    } else if (url.pathname.startsWith("/media/sha256/")) {
+        event.respondWith(cacheFirst(request, MEDIA_CACHE));
+    } else if (url.pathname.startsWith("/media/")) {
+        event.respondWith(networkFirst(request, MEDIA_CACHE));
+    }
+    // alt annet (api-et) går rett til nettet
+});
+
+async function staleWhileRevalidate(event, key) {
+    const cache = await caches.open(SHELL_CACHE);
+    const cached = await cache.match(key);
+    const fresh = fetch(event.request)
+        .then(response => {
+            if (cacheable(response)) cache.put(key, response.clone());
+            return response;
+        })
+        .catch(() => null);
+    if (cached) {
+        event.waitUntil(fresh);
+        return cached;
+    }
+    return (await fresh) || Response.error();
+}
+
+async function cacheFirst(request, cacheName) {
+    const cache = await caches.open(cacheName);
+    const cached = await cache.match(request);
+    if (cached) return cached;
+    const response = await fetch(request);
+    if (cacheable(response)) {
+        await cache.put(request, response.clone());
+        if (cacheName === MEDIA_CACHE) trimMedia(cache);
+    }
+    return response;
+}
+
+async function networkFirst(request, cacheName) {
+    const cache = await caches.open(cacheName);
+    try {
+        const response = await fetch(request);
+        if (cacheable(response)) {
+            await cache.put(request, response.clone());
+            trimMedia(cache);
+        }
+        return response;
+    } catch (error) {
+        const cached = await cache.match(request);
+        if (cached) return cached;
+        throw error;
+    }
+}
+
+// cache.put avviser 206, og andre 2xx-svar (204) har ikke noe å vise frem igjen
+function cacheable(response) {
+    return response.status === 200 || response.type === "opaque";
+}
+
+// eldste bilder ut først, cache.keys() gir dem i rekkefølgen de ble lagt inn
+async function trimMedia(cache) {
+    const keys = await cache.keys();
+    for (let i = 0; i < keys.length - MEDIA_LIMIT; i++) {
+        await cache.delete(keys[i]);
+    }
+}
@@ -0,0 +1,364 @@
+# servering av statiske filer med skikkelig caching. alt under static/ leses inn ved oppstart, får et
+# fingeravtrykk (hash av innholdet) og ferdigkomprimerte gzip/brotli-varianter. index.html skrives om til å
+# peke på /static/navn?v=<fingeravtrykk>, og de adressene kan nettleseren cache for alltid.
+# index.html selv og bildene i media/ svarer med ETag, så en ny innlasting bare får 304 tilbake.
+# små bilder fra media/ holdes i minnet (MediaCache). store sendes fra en mmap av filen, uten å gå via en
+# tråd for hver bit. tilbyr serveren pathsend/zerocopysend (uvicorn gjør ikke det) brukes de i stedet.
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import mmap
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import Response
+
+try:
+    import brotli  # type: ignore
+except ImportError:  # pragma: no cover - brotli er valgfritt
+    brotli = None
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+COMPRESSIBLE = ("text/", "application/javascript", "application/json", "image/svg+xml")
+MIN_COMPRESS_SIZE = 256
+MEDIA_CHUNK_SIZE = 256 * 1024
+
+# lokale kopier som brukes i stedet for cdn-en hvis de ligger i static/
+CDN_FALLBACKS = {
+    "https://cdn.jsdelivr.net/npm/chart.js@4.5.0": "vendor/chart.umd.min.js",
+}
+
+# filene kontrollpanelet trenger for å tegne seg uten nett. service workeren (static/sw.js) legger dem
+# i cachen sin når den installeres, sammen med "/" og chart.js
+SHELL_ASSETS = ("style.css",)
+
+_STATIC_REF = re.compile(r'(src|href)="/static/([^"?#]+)"')
+
+
+class Asset:
+    __slots__ = ("name", "content_type", "fingerprint", "variants")
+
+    def __init__(self, name: str, data: bytes):
+        self.name = name
+        self.content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        if self.content_type.startswith("text/") or self.content_type == "application/javascript":
+            self.content_type += "; charset=utf-8"
+        self.fingerprint = hashlib.sha256(data).hexdigest()[:16]
+        # encoding -> bytes. "identity" finnes alltid
+        self.variants: Dict[str, bytes] = {"identity": data}
+        if len(data) >= MIN_COMPRESS_SIZE and self.content_type.startswith(COMPRESSIBLE):
+            compressed = gzip.compress(data, compresslevel=9, mtime=0)
+            if len(compressed) < len(data):
+                self.variants["gzip"] = compressed
+            if brotli is not None:
+                compressed = brotli.compress(data, quality=11)
+                if len(compressed) < len(data):
+                    self.variants["br"] = compressed
+
+    def etag(self, encoding: str) -> str:
+        return f'"{self.fingerprint}-{encoding}"'
+
+
+def accepted_encodings(request: Request) -> Tuple[str, ...]:
+    header = request.headers.get("accept-encoding", "")
+    return tuple(part.split(";")[0].strip().lower() for part in header.split(",") if part.strip())
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag in candidates
+
+
+class AssetManifest:
+    """In-memory, fingerprinted and precompressed copy of the static directory."""
+
+    def __init__(self, static_dir: str):
+        self.static_dir = Path(static_dir)
+        self.assets: Dict[str, Asset] = {}
+        self.index: Optional[Asset] = None
+        self.service_worker: Optional[Asset] = None
+        self.build()
+
+    def build(self) -> None:
+        assets = {}
+        for path in sorted(self.static_dir.rglob("*")):
+            if path.is_file():
+                name = path.relative_to(self.static_dir).as_posix()
+                assets[name] = Asset(name, path.read_bytes())
+        self.assets = assets
+        index_asset = assets.get("index.html")
+        if index_asset:
+            html = index_asset.variants["identity"].decode("utf-8")
+            self.index = Asset("index.html", self.rewrite_html(html).encode("utf-8"))
+        worker = assets.get("sw.js")
+        if worker:
+            script = self.render_service_worker(worker.variants["identity"].decode("utf-8"))
+            self.service_worker = Asset("sw.js", script.encode("utf-8"))
+
+    def url(self, name: str) -> str:
+        asset = self.assets.get(name)
+        if not asset:
+            return f"/static/{name}"
+        return f"/static/{name}?v={asset.fingerprint}"
+
+    #bytter /static/... ut med adresser som har fingeravtrykk, og cdn-adresser med lokale kopier om de finnes
+    def rewrite_html(self, html: str) -> str:
+        for cdn_url, local_name in CDN_FALLBACKS.items():
+            if local_name in self.assets:
+                html = html.replace(f'"{cdn_url}"', f'"/static/{local_name}"')
+        return _STATIC_REF.sub(lambda m: f'{m.group(1)}="{self.url(m.group(2))}"', html)
+
+    def precache_urls(self) -> List[str]:
+        urls = ["/"]
+        urls += [self.url(name) for name in SHELL_ASSETS if name in self.assets]
+        for cdn_url, local_name in CDN_FALLBACKS.items():
+            urls.append(self.url(local_name) if local_name in self.assets else cdn_url)
+        return urls
+
+    #setter inn lista over filer og en versjon. versjonen endres når en av filene endres, og da ser nettleseren
+    #at sw.js er ny, installerer den på nytt og kaster den gamle cachen
+    def render_service_worker(self, template: str) -> str:
+        urls = self.precache_urls()
+        fingerprints = [self.index.fingerprint if self.index else "", *urls, template]
+        version = hashlib.sha256("\n".join(fingerprints).encode("utf-8")).hexdigest()[:16]
+        return template.replace("__VERSION__", version).replace("__PRECACHE__", json.dumps(urls))
+
+    def response(self, asset: Asset, request: Request, immutable: bool) -> Response:
+        encodings = accepted_encodings(request)
+        encoding = "identity"
+        for candidate in ("br", "gzip"):
+            if candidate in asset.variants and candidate in encodings:
+                encoding = candidate
+                break
+
+        headers = {
+            "ETag": asset.etag(encoding),
+            "Cache-Control": IMMUTABLE if immutable else REVALIDATE,
+            "Vary": "Accept-Encoding",
+        }
+        if etag_matches(request, headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(asset.variants[encoding], media_type=asset.content_type, headers=headers)
+
+    def static_response(self, name: str, request: Request) -> Optional[Response]:
+        if name == "sw.js":
+            # malen har __VERSION__ og __PRECACHE__ uten innhold, så /static/sw.js gir samme fil som /sw.js
+            return self.service_worker_response(request)
+        asset = self.assets.get(name)
+        if not asset:
+            return None
+        # bare adresser med riktig fingeravtrykk kan caches for alltid
+        immutable = request.query_params.get("v") == asset.fingerprint
+        return self.response(asset, request, immutable)
+
+    def index_response(self, request: Request) -> Optional[Response]:
+        if not self.index:
+            return None
+        return self.response(self.index, request, immutable=False)
+
+    def service_worker_response(self, request: Request) -> Optional[Response]:
+        if not self.service_worker:
+            return None
+        return self.response(self.service_worker, request, immutable=False)
+
+
+class MediaCache:
+    """LRU of small media files kept as bytes, validated against the file's mtime and size."""
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, max_file_size: int = 512 * 1024):
+        self.max_bytes = max_bytes
+        self.max_file_size = max_file_size
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        # sti -> (mtime_ns, størrelse, innhold)
+        self._entries: "OrderedDict[str, Tuple[int, int, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: Path, mtime_ns: int, size: int) -> Optional[bytes]:
+        if size > self.max_file_size:
+            return None
+        key = str(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == mtime_ns and entry[1] == size:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+        # leses i trådpoolen: media-endepunktet er ikke async, så sd-kortet holder aldri igjen event-loopen
+        data = path.read_bytes()
+        if len(data) != size:
+            # filen ble byttet ut mens vi leste. da sendes den vanlige veien
+            return None
+        with self._lock:
+            self.misses += 1
+            old = self._entries.pop(key, None)
+            if old:
+                self.bytes -= len(old[2])
+            self._entries[key] = (mtime_ns, size, data)
+            self.bytes += size
+            while self.bytes > self.max_bytes and self._entries:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self.bytes -= len(evicted)
+        return data
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"files": len(self._entries), "bytes": self.bytes, "hits": self.hits, "misses": self.misses}
+
+
+class FileRangeResponse(Response):
+    """Sends ``length`` bytes of a file from ``start``.
+
+    Uses the ASGI pathsend/zerocopysend extensions when the server offers them (uvicorn does not). Otherwise
+    the file is mapped in the thread pool and memoryviews into the mmap are sent from the event loop.
+    """
+
+    def __init__(self, path: Path, start: int, length: int, status_code: int, headers: Dict[str, str],
+                 media_type: str):
+        self.path = path
+        self.start = start
+        self.length = length
+        self.status_code = status_code
+        self.media_type = media_type
+        self.background = None
+        self.init_headers(headers)
+
+    async def __call__(self, scope, receive, send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope.get("method") == "HEAD" or self.length == 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+        extensions = scope.get("extensions") or {}
+        if "http.response.pathsend" in extensions and self.start == 0 and self.status_code == 200:
+            await send({"type": "http.response.pathsend", "path": str(self.path)})
+            return
+        if "http.response.zerocopysend" in extensions:
+            handle = await run_in_threadpool(self.path.open, "rb")
+            try:
+                await send({"type": "http.response.zerocopysend", "file": handle,
+                            "offset": self.start, "count": self.length})
+            finally:
+                handle.close()
+            return
+        # open, mmap og madvise kan vente på sd-kortet, så de gjøres i trådpoolen. selve sendingen går på loopen
+        mapped = await run_in_threadpool(_map_file, self.path, self.start, self.length)
+        view = memoryview(mapped)
+        chunk = None
+        try:
+            end = self.start + self.length
+            for offset in range(self.start, end, MEDIA_CHUNK_SIZE):
+                stop = min(offset + MEDIA_CHUNK_SIZE, end)
+                chunk = view[offset:stop]
+                await send({"type": "http.response.body", "body": chunk, "more_body": stop < end})
+        except BaseException:
+            # klienten er borte. tracebacken holder fortsatt på biten, så den slippes her for at mmap-en skal kunne lukkes
+            if chunk is not None:
+                chunk.release()
+            raise
+        finally:
+            try:
+                view.release()
+                mapped.close()
+            except BufferError:
+                # transporten har fortsatt en bit i bufferen sin. mmap-en frigjøres når den slipper den
+                pass
+
+
+def _map_file(path: Path, start: int, length: int) -> mmap.mmap:
+    with path.open("rb") as handle:
+        # filene i media/ byttes ut med rename og skrives aldri over, så mmap-en kan ikke krympe under oss
+        mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    # be kjernen lese inn området i forkant, så sidene helst er i minnet før send() rører dem
+    if hasattr(mapped, "madvise"):
+        first = start - start % mmap.ALLOCATIONGRANULARITY
+        mapped.madvise(mmap.MADV_WILLNEED, first, start + length - first)
+    return mapped
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single ``bytes=`` range. Returns (start, end) inclusive, or None if unsatisfiable."""
+    if not header.startswith("bytes=") or "," in header:
+        return None
+    start_text, _, end_text = header[6:].strip().partition("-")
+    try:
+        if start_text:
+            start = int(start_text)
+            end = int(end_text) if end_text else size - 1
+        else:
+            # bytes=-500 betyr de siste 500 bytene
+            start = max(0, size - int(end_text))
+            end = size - 1
+    except ValueError:
+        return None
+    end = min(end, size - 1)
+    if start > end or start >= size:
+        return None
+    return start, end
+
+
+#bildene fra media/. filer lagret etter innhold (sha256/) endrer seg aldri og kan caches for alltid
+def media_response(path: Path, request: Request, immutable: bool, cache: Optional[MediaCache] = None) -> Response:
+    stat = path.stat()
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": IMMUTABLE if immutable else REVALIDATE,
+        "Accept-Ranges": "bytes",
+    }
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    size = stat.st_size
+    cached = cache.get(path, stat.st_mtime_ns, size) if cache else None
+    range_header = request.headers.get("range")
+    if range_header and request.headers.get("if-range", etag) == etag:
+        byte_range = parse_range(range_header, size)
+        if byte_range is None:
+            headers["Content-Range"] = f"bytes */{size}"
+            return Response(status_code=416, headers=headers)
+        start, end = byte_range
+        length = end - start + 1
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        if cached is not None:
+            return Response(cached[start:end + 1], status_code=206, media_type=content_type, headers=headers)
+        headers["Content-Length"] = str(length)
+        return FileRangeResponse(path, start, length, 206, headers, content_type)
+
+    if cached is not None:
+        return Response(cached, media_type=content_type, headers=headers)
+    headers["Content-Length"] = str(size)
+    return FileRangeResponse(path, 0, size, 200, headers, content_type)
+
+
+def resolve_media_path(media_dir: Path, relative: str) -> Optional[Path]:
+    """Resolve a path under ``media_dir``, refusing anything that escapes it."""
+    candidate = (media_dir / relative).resolve()
+    try:
+        candidate.relative_to(media_dir.resolve())
+    except ValueError:
+        return None
+    if not candidate.is_file():
+        return None
+    return candidate
+
+
+def is_content_addressed(media_dir: Path, path: Path, hash_dir_name: str) -> bool:
+    return path.is_relative_to((media_dir / hash_dir_name).resolve())
+
@@ -0,0 +1,230 @@
+# ferdig skalerte bilder på disk. å dekode en png/jpeg fra media/ og skalere den til skjermen tar fort
+# 100 ms på pi-en, og det skjedde etter hver omstart og hver gang en poll med bilde ble vist.
+# her lagres resultatet som rå piksler (BGRA, samme rekkefølge som skjermen) i surface_cache/, med
+# bildets sha256 og skjermstørrelsen i filnavnet. neste gang mmap-es filen og pikslene leses rett inn
+# med pygame.image.frombuffer, uten dekoding og uten skalering.
+
+import mmap
+import os
+import re
+import struct
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pygame
+
+from media_store import hash_stream
+
+# magi, versjon, bredde, høyde
+_HEADER = struct.Struct("<4sHII")
+_MAGIC = b"PSC1"
+_VERSION = 1
+_FORMAT = "BGRA"
+_HASHED_NAME = re.compile(r"^[0-9a-f]{64}$")
+
+Fit = Callable[[pygame.Surface], pygame.Surface]
+# (bredde, høyde) og pikslene i _FORMAT
+RawPixels = Tuple[Tuple[int, int], bytes]
+
+
+def _parse_header(view: memoryview) -> Optional[Tuple[int, int]]:
+    if len(view) < _HEADER.size:
+        return None
+    magic, version, width, height = _HEADER.unpack_from(view)
+    if magic != _MAGIC or version != _VERSION or len(view) - _HEADER.size != width * height * 4:
+        return None
+    return width, height
+
+
+#må kjøres på skjermtråden: convert() bruker skjermens format, og SDL-skjermen er ikke trådsikker
+def _display_surface(pixels, size: Tuple[int, int]) -> pygame.Surface:
+    raw = pygame.image.frombuffer(pixels, size, _FORMAT)
+    # convert() gir en kopi i skjermens format, uten alfakanal, så blit blir en ren minnekopi og bufferen
+    # kan slippes etterpå
+    return raw.convert() if pygame.display.get_surface() is not None else raw.copy()
+
+
+#for bakgrunnstråden. smoothscale vil ha 24 eller 32 bit, og palettbilder gjøres om uten å røre skjermen
+def _software_surface(surface: pygame.Surface) -> pygame.Surface:
+    if surface.get_bitsize() in (24, 32):
+        return surface
+    widened = pygame.Surface(surface.get_size(), 0, 32)
+    widened.blit(surface, (0, 0))
+    return widened
+
+
+class SurfaceCache:
+    """Disk cache of decoded, display-scaled images stored as raw pixels and read back via mmap."""
+
+    def __init__(self, cache_dir: Path, max_bytes: int = 256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # størrelsen på cachen holdes oppdatert ved skriving og rydding, så stats() slipper å lese mappa.
+        # None til mappa er talt opp første gang
+        self._bytes: Optional[int] = None
+        self._entries = 0
+        # sha256 for filer som ikke ligger under media/sha256/, så de bare hashes én gang per kjøring
+        self._digests: Dict[Tuple[str, int, int], str] = {}
+        # bilder som er lastet på forhånd (warm) og venter på å bli vist, som rå piksler. holdes få, de er store.
+        # spillelista legger inn og skjermtråden tar ut, så låsen beskytter dem og tellerne for størrelsen
+        self._ready: "OrderedDict[Path, RawPixels]" = OrderedDict()
+        self.max_ready = 2
+        self._lock = threading.Lock()
+
+    def digest(self, image: Path) -> str:
+        # innholdsadresserte filer heter allerede det samme som hashen sin
+        if _HASHED_NAME.match(image.stem):
+            return image.stem
+        stat = image.stat()
+        memo = (str(image), stat.st_mtime_ns, stat.st_size)
+        digest = self._digests.get(memo)
+        if digest is None:
+            with image.open("rb") as fh:
+                digest, _ = hash_stream(fh)
+            self._digests[memo] = digest
+        return digest
+
+    def path_for(self, image: Path, box: Tuple[int, int]) -> Path:
+        return self.cache_dir / f"{self.digest(image)}-{box[0]}x{box[1]}.bgra"
+
+    def get(self, image: Path, box: Tuple[int, int], fit: Fit) -> pygame.Surface:
+        """Return ``image`` scaled by ``fit`` for a ``box``-sized area, decoding it only on a cache miss."""
+        cached = self.path_for(image, box)
+        with self._lock:
+            ready = self._ready.pop(cached, None)
+        surface = _display_surface(ready[1], ready[0]) if ready else self.load(cached)
+        if surface is not None:
+            self.hits += 1
+            return surface
+        self.misses += 1
+        surface = fit(pygame.image.load(str(image)).convert())
+        try:
+            self.store(cached, surface)
+        except OSError as exc:
+            print(f"Kunne ikke lagre {cached.name} i bildecachen: {exc}")
+        return surface
+
+    def warm(self, image: Path, box: Tuple[int, int], fit: Fit) -> None:
+        """Prepare ``image`` on a background thread so the next get() for it skips disk and decoding.
+
+        Only raw pixels are made here. The conversion to the display format is left to get(),
+        which runs on the render thread.
+        """
+        cached = self.path_for(image, box)
+        with self._lock:
+            if cached in self._ready:
+                return
+        pixels = self._read(cached)
+        if pixels is None:
+            surface = fit(_software_surface(pygame.image.load(str(image))))
+            pixels = (surface.get_size(), pygame.image.tobytes(surface, _FORMAT))
+            try:
+                self._write(cached, *pixels)
+            except OSError as exc:
+                print(f"Kunne ikke lagre {cached.name} i bildecachen: {exc}")
+        with self._lock:
+            self._ready[cached] = pixels
+            while len(self._ready) > self.max_ready:
+                self._ready.popitem(last=False)
+
+    def _read(self, cached: Path) -> Optional[RawPixels]:
+        try:
+            data = cached.read_bytes()
+        except FileNotFoundError:
+            return None
+        view = memoryview(data)
+        size = _parse_header(view)
+        if size is None:
+            return None
+        os.utime(cached)
+        return size, view[_HEADER.size:]
+
+    def load(self, cached: Path) -> Optional[pygame.Surface]:
+        try:
+            fh = cached.open("rb")
+        except FileNotFoundError:
+            return None
+        with fh:
+            try:
+                mapped = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # tom fil
+                return None
+            view = memoryview(mapped)
+            try:
+                size = _parse_header(view)
+                if size is None:
+                    return None
+                # frombuffer peker rett inn i mmap-en, og kopien gjør at den kan lukkes etterpå
+                with view[_HEADER.size:] as pixels:
+                    surface = _display_surface(pixels, size)
+            finally:
+                view.release()
+                mapped.close()
+        # mtime brukes som "sist brukt" når cachen ryddes
+        os.utime(cached)
+        return surface
+
+    def store(self, cached: Path, surface: pygame.Surface) -> None:
+        self._write(cached, surface.get_size(), pygame.image.tobytes(surface, _FORMAT))
+
+    def _write(self, cached: Path, size: Tuple[int, int], pixels: bytes) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        header = _HEADER.pack(_MAGIC, _VERSION, size[0], size[1])
+        fd, tmp_name = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(header)
+                fh.write(pixels)
+            os.replace(tmp_name, cached)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        # prune() går gjennom mappa uansett og setter tellerne på nytt
+        self.prune()
+
+    def _scan(self) -> List[Tuple[float, int, Path]]:
+        entries = []
+        for entry in self.cache_dir.glob("*.bgra"):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+        return entries
+
+    def prune(self) -> int:
+        """Delete the least recently used entries until the cache fits in ``max_bytes``."""
+        entries = self._scan()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, entry in sorted(entries, key=lambda item: item[0]):
+            if total <= self.max_bytes:
+                break
+            entry.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        with self._lock:
+            self._bytes = total
+            self._entries = len(entries) - removed
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        if self._bytes is None:
+            entries = self._scan()
+            with self._lock:
+                self._bytes = sum(size for _, size, _ in entries)
+                self._entries = len(entries)
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": self._entries,
+                "ready": len(self._ready),
+                "bytes": self._bytes,
+            }
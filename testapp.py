@@ -24,6 +24,7 @@ from polls_db import (
     save_poll_record,
     update_image_path,
 )
+from poll_record import Poll
 
 BASE_DIR = Path(__file__).resolve().parent
 MEDIA_DIR = BASE_DIR / "media"
@@ -205,7 +206,7 @@ last_persisted_poll = {
     "image_path": None,
 }
 
-existing_polls = fetch_all_polls()
+existing_polls = [poll.to_dict() for poll in fetch_all_polls()]
 if existing_polls:
     latest_poll = existing_polls[0]
     shared_data.update(latest_poll)
@@ -261,13 +262,14 @@ def save_poll(force: bool = False):
     if not force and not has_changed:
         return
 
-    save_poll_record(poll_copy)
+    save_poll_record(Poll(**poll_copy))
     last_persisted_poll.update(poll_copy)
 
 
 def find_poll(poll_id: str):
     """Hent en poll ut fra id."""
-    return fetch_poll(poll_id)
+    poll = fetch_poll(poll_id)
+    return poll.to_dict() if poll else None
 
 
 def resolve_poll_target(poll_id: Optional[str], poll_name: Optional[str]):
@@ -280,6 +282,7 @@ def resolve_poll_target(poll_id: Optional[str], poll_name: Optional[str]):
             return poll, resolved_id
     if poll_name:
         poll = fetch_poll_by_caption(poll_name)
+        poll = poll.to_dict() if poll else None
         if poll:
             resolved_id = poll["id"]
             return poll, resolved_id
@@ -482,7 +485,7 @@ def get_scores():
 
 @app.get("/get_old_polls")
 def get_old_polls(): 
-    return fetch_all_polls()
+    return [poll.to_dict() for poll in fetch_all_polls()]
 
 def update_old_polls(id: str):
     poll = find_poll(id)
@@ -0,0 +1,27 @@
+import io
+import sqlite3
+
+import media_store
+import polls_db
+from media_store import MediaStore
+from polls_db import fetch_orphaned_media, init_db
+
+
+def test_collector_spares_file_found_by_duplicate_upload(tmp_path, monkeypatch):
+    monkeypatch.setattr(polls_db, "DB_PATH", str(tmp_path / "polls.db"))
+    monkeypatch.setattr(polls_db, "ARCHIVE_PATH", str(tmp_path / "polls_archive.db"))
+    init_db()
+    store = MediaStore(tmp_path, tmp_path / "media", grace_seconds=60)
+    path, written = store.store(io.BytesIO(b"logo"), ".png")
+    assert written
+    with sqlite3.connect(polls_db.DB_PATH) as conn:
+        conn.execute("UPDATE media SET touched_at = datetime('now', '-1 hour')")
+
+    # søppeltømmingen har hentet lista før duplikatet kom, men ikke slettet noe ennå
+    orphaned = fetch_orphaned_media(store.grace_seconds)
+    assert orphaned == [path]
+    assert store.store(io.BytesIO(b"logo"), ".png") == (path, False)
+    monkeypatch.setattr(media_store, "fetch_orphaned_media", lambda grace_seconds: orphaned)
+
+    assert store.collect_garbage() == []
+    assert (tmp_path / path).exists()
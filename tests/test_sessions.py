@@ -0,0 +1,74 @@
+import threading
+
+import polls_db
+from poll_record import Poll
+from polls_db import fetch_poll, init_db, save_poll_record, update_image_path
+from sessions import SessionManager
+
+
+def test_flush_keeps_image_attached_during_session(tmp_path, monkeypatch):
+    monkeypatch.setattr(polls_db, "DB_PATH", str(tmp_path / "polls.db"))
+    monkeypatch.setattr(polls_db, "ARCHIVE_PATH", str(tmp_path / "polls_archive.db"))
+    init_db()
+    save_poll_record(Poll("p1", "Stasjon", 0, 0, 0, None))
+
+    manager = SessionManager()
+    session = manager.start(fetch_poll("p1"))
+    session.vote("yes")
+    # som /attach_image/ og /upload_image/ gjør mens økta pågår
+    update_image_path("p1", "media/bilde.png")
+    assert manager.flush() == 1
+
+    stored = fetch_poll("p1")
+    assert stored.image_path == "media/bilde.png"
+    assert stored.score_a == 1
+
+    session.vote("no")
+    final = manager.stop("p1")
+    assert final.image_path == "media/bilde.png"
+    assert (final.score_a, final.score_b) == (1, 1)
+    assert fetch_poll("p1").image_path == "media/bilde.png"
+
+
+def test_concurrent_votes_survive_flush_and_stop(tmp_path, monkeypatch):
+    monkeypatch.setattr(polls_db, "DB_PATH", str(tmp_path / "polls.db"))
+    monkeypatch.setattr(polls_db, "ARCHIVE_PATH", str(tmp_path / "polls_archive.db"))
+    init_db()
+    for poll_id in ("p1", "p2"):
+        save_poll_record(Poll(poll_id, poll_id, 0, 0, 0, None))
+
+    manager = SessionManager()
+    sessions = [manager.start(fetch_poll(poll_id)) for poll_id in ("p1", "p2")]
+    votes_per_thread = 200
+    done = threading.Event()
+
+    def voter(session, choice):
+        for _ in range(votes_per_thread):
+            session.vote(choice)
+
+    def flusher():
+        # flusheren går hele tiden, også mens øktene stoppes
+        while not done.is_set():
+            manager.flush()
+
+    flush_thread = threading.Thread(target=flusher)
+    flush_thread.start()
+    voters = [
+        threading.Thread(target=voter, args=(session, choice))
+        for session in sessions
+        for choice in ("yes", "no", "meh", "yes")
+    ]
+    for thread in voters:
+        thread.start()
+    for thread in voters:
+        thread.join()
+
+    finals = [manager.stop(poll_id) for poll_id in ("p1", "p2")]
+    done.set()
+    flush_thread.join()
+
+    expected = (2 * votes_per_thread, votes_per_thread, votes_per_thread)
+    for final in finals:
+        assert (final.score_a, final.score_b, final.score_meh) == expected
+        stored = fetch_poll(final.id)
+        assert (stored.score_a, stored.score_b, stored.score_meh) == expected
@@ -0,0 +1,112 @@
+# stemmer fra mobilen. publikum skanner qr-koden på skjermen, får opp vote.html og stemmer derfra.
+# hver enhet får stemme én gang per poll. det sjekkes mot et bloom-filter per poll (ca. 180 kB for
+# 100 000 enheter), så minnebruken er fast uansett hvor mange som stemmer. prisen er at en liten andel
+# (ca. 0,1 %) av nye enheter feilaktig blir sett på som allerede stemt.
+# stemmene samles opp og hentes ut i klumper, så hundrevis av stemmer i sekundet blir til én oppdatering
+# av tellerne per frame i stedet for én skriving per stemme.
+
+import hashlib
+import math
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from poll_record import CHOICE_FIELDS
+
+
+class BloomFilter:
+    """Fixed-size set membership with a bounded false-positive rate and no false negatives."""
+
+    __slots__ = ("size", "hashes", "bits")
+
+    def __init__(self, capacity: int = 100_000, error_rate: float = 0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        # to hasher holder for å lage alle k posisjonene (kirsch-mitzenmacher)
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key: str) -> bool:
+        """Add ``key`` and return True if it was (probably) not present before."""
+        added = False
+        for position in self._positions(key):
+            byte, mask = position >> 3, 1 << (position & 7)
+            if not self.bits[byte] & mask:
+                self.bits[byte] |= mask
+                added = True
+        return added
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+
+class VoteIntake:
+    """Dedupes phone votes per device and poll and buffers them until the owner drains them."""
+
+    def __init__(self, capacity: int = 100_000, error_rate: float = 0.001, max_polls: int = 8,
+                 on_vote: Optional[Callable[[], None]] = None):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.max_polls = max_polls
+        # kalles når første stemme havner i en tom buffer, så skjermløkka kan vekkes
+        self.on_vote = on_vote
+        self._filters: "OrderedDict[str, BloomFilter]" = OrderedDict()
+        self._pending: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+        self.accepted = 0
+        self.duplicates = 0
+
+    def _filter_for(self, poll_id: str) -> BloomFilter:
+        bloom = self._filters.get(poll_id)
+        if bloom is None:
+            bloom = BloomFilter(self.capacity, self.error_rate)
+            self._filters[poll_id] = bloom
+            # bare de siste pollene huskes. en gammel poll som åpnes igjen starter med blanke ark
+            while len(self._filters) > self.max_polls:
+                self._filters.popitem(last=False)
+        else:
+            self._filters.move_to_end(poll_id)
+        return bloom
+
+    def check(self, poll_id: str, device_id: str, choice: str) -> bool:
+        """Record that ``device_id`` voted in ``poll_id``. Returns False for a repeat vote."""
+        if choice not in CHOICE_FIELDS:
+            raise ValueError(f"Ukjent valg '{choice}'. Bruk yes, no eller meh.")
+        with self._lock:
+            if not self._filter_for(poll_id).add(device_id):
+                self.duplicates += 1
+                return False
+            self.accepted += 1
+            return True
+
+    def submit(self, poll_id: str, device_id: str, choice: str) -> bool:
+        """Dedupe and buffer a vote for later draining. Returns False for a repeat vote."""
+        if not self.check(poll_id, device_id, choice):
+            return False
+        with self._lock:
+            was_empty = not self._pending
+            counts = self._pending.setdefault(poll_id, dict.fromkeys(CHOICE_FIELDS, 0))
+            counts[choice] += 1
+        if was_empty and self.on_vote:
+            self.on_vote()
+        return True
+
+    def drain(self) -> Dict[str, Dict[str, int]]:
+        """Take every buffered vote as {poll_id: {choice: count}}."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "accepted": self.accepted,
+                "duplicates": self.duplicates,
+                "pending": sum(sum(counts.values()) for counts in self._pending.values()),
+                "tracked_polls": len(self._filters),
+            }